@@ -1,9 +1,12 @@
 import sys
 import re
 import importlib.util
+from contextlib import asynccontextmanager
 from io import StringIO
 from pathlib import Path
+from typing import Optional
 from fastapi import FastAPI, Query, HTTPException, APIRouter
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import PlainTextResponse, JSONResponse, Response, StreamingResponse
 import httpx
 import requests
@@ -29,17 +32,26 @@ from app.modules.keepers.storage import (
 )
 
 # Import carver for file extraction
-from app.modules.keepers.carver import carve_file_to_bytes
+from app.modules.keepers.carver import carve_file_to_bytes_async
 
-# Import auth and formatters for layer streaming
-from app.modules.auth import RegistryAuth
-from app.modules.formatters import parse_image_ref, registry_base_url
+# Import auth, formatters and the async blob reader for layer streaming
+from app.modules.auth import AsyncRegistryAuth, get_rate_limiter, close_async_client
+from app.modules.formatters import parse_image_ref
+from app.modules.finders.async_peekers import AsyncBlobReader
 
 # Import fs-log-sqlite module using importlib (due to hyphen in filename)
 spec = importlib.util.spec_from_file_location("fs_log_sqlite", "app/modules/fs-log-sqlite.py")
 fs_log_sqlite = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(fs_log_sqlite)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close the shared registry AsyncClient when the server shuts down."""
+    yield
+    await close_async_client()
+
+
 app = FastAPI(
     title="Docker Dorker API", 
     docs_url=None,
@@ -48,7 +60,8 @@ app = FastAPI(
 * WIP
 * TBD    
     """,
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
     )
 
 # Create a router for the dark docs
@@ -333,7 +346,7 @@ async def repository_tag_images(
 
 
 @app.get("/repositories/{namespace}/{repo}/tags/{tag}/config")
-def get_tag_config(
+async def get_tag_config(
     namespace: str,
     repo: str,
     tag: str,
@@ -358,7 +371,8 @@ def get_tag_config(
         - and other image metadata
     """
     try:
-        config = get_image_config(
+        config = await run_in_threadpool(
+            get_image_config,
             namespace=namespace,
             repo=repo,
             tag=tag,
@@ -372,8 +386,64 @@ def get_tag_config(
         raise HTTPException(status_code=404, detail=str(e))
 
 
+# Blocking helpers (sqlite, registry requests, the CLI) for the async handlers'
+# threadpool calls
+
+def _load_layer_status(namespace: str, repo: str, tag: str, arch: str) -> Optional[dict]:
+    """
+    Layer peek status from the database, fetching (and caching) the image
+    config first if it is not cached yet.
+    
+    Raises:
+        Exception: the config could not be fetched
+    """
+    conn = init_database()
+    try:
+        status = get_layer_status(conn, namespace, repo, tag, arch)
+        if status is None:
+            # Config not cached - fetching it caches it, then query again
+            get_image_config(namespace=namespace, repo=repo, tag=tag, arch=arch)
+            status = get_layer_status(conn, namespace, repo, tag, arch)
+        return status
+    finally:
+        conn.close()
+
+
+def _run_peek(argv: list[str]) -> str:
+    """Run the CLI peek with argv and return what it printed."""
+    old_stdout = sys.stdout
+    sys.stdout = captured_output = StringIO()
+    try:
+        sys.argv = argv
+        main.main()
+    finally:
+        sys.stdout = old_stdout
+    return captured_output.getvalue()
+
+
+def _track_peeked(namespace: str, repo: str, tag: str, arch: str, layer: str):
+    """Mark the peeked layer (or every layer, for "all") as peeked."""
+    conn = init_database()
+    try:
+        if layer == "all":
+            # Get layer count from cached config
+            status = get_layer_status(conn, namespace, repo, tag, arch)
+            if status and "layer_count" in status:
+                for idx in range(status["layer_count"]):
+                    update_layer_peeked(conn, namespace, repo, tag, arch, idx)
+        else:
+            # Single layer was peeked
+            try:
+                layer_idx = int(layer)
+                update_layer_peeked(conn, namespace, repo, tag, arch, layer_idx)
+            except ValueError:
+                pass  # Invalid layer index, skip tracking
+    finally:
+        conn.close()
+
+
 @app.get("/peek/status")
-def peek_status(
+async def peek_status(
     image: str = Query(..., description="Image reference: namespace/repo:tag"),
     arch: str = Query(default="amd64", description="Target architecture: amd64, arm64, etc."),
 ):
@@ -401,57 +471,61 @@ def peek_status(
     # Parse image reference
     namespace, repo, tag = parse_image_ref(image)
     
-    # Query database for layer status
-    conn = init_database()
+    # Query database for layer status (sqlite and the config fetch block)
     try:
-        status = get_layer_status(conn, namespace, repo, tag, arch)
-        
-        if status is None:
-            # Config not cached - need to fetch it first
-            # Try to get config (which will cache it)
-            try:
-                get_image_config(
-                    namespace=namespace,
-                    repo=repo,
-                    tag=tag,
-                    arch=arch,
-                )
-                # Now query again
-                status = get_layer_status(conn, namespace, repo, tag, arch)
-            except Exception as e:
-                return JSONResponse(
-                    content={
-                        "image": image,
-                        "config_cached": False,
-                        "error": str(e),
-                        "message": "Failed to fetch config from registry",
-                    },
-                    status_code=200,
-                )
+        status = await run_in_threadpool(_load_layer_status, namespace, repo, tag, arch)
+    except Exception as e:
+        return JSONResponse(
+            content={
+                "image": image,
+                "config_cached": False,
+                "error": str(e),
+                "message": "Failed to fetch config from registry",
+            },
+            status_code=200,
+        )
         
-        if status:
-            return JSONResponse(
-                content={
-                    "image": image,
-                    **status,
-                },
-                status_code=200,
-            )
-        else:
-            return JSONResponse(
-                content={
-                    "image": image,
-                    "config_cached": False,
-                    "message": "No cached config found",
-                },
-                status_code=200,
-            )
-    finally:
-        conn.close()
+    if status:
+        return JSONResponse(
+            content={
+                "image": image,
+                **status,
+            },
+            status_code=200,
+        )
+    else:
+        return JSONResponse(
+            content={
+                "image": image,
+                "config_cached": False,
+                "message": "No cached config found",
+            },
+            status_code=200,
+        )
+
+
+@app.get("/ratelimit/status")
+def ratelimit_status():
+    """
+    ## Rate Limit Status
+    
+    Current upstream request budget, without contacting the registry.
+    
+    Returns, per host seen so far:
+    - Configured rate and burst, and tokens currently available
+    - Requests sent, requests queued right now, and total time spent queued
+    - 429 responses seen and any pause still in effect
+    - Last Docker Hub pull quota reported (`ratelimit-limit` / `ratelimit-remaining`)
+    
+    Use this endpoint to:
+    - See how much pull quota is left before starting a bulk peek
+    - Check whether slow requests are being queued by the limiter
+    """
+    return JSONResponse(content=get_rate_limiter().status(), status_code=200)
 
 
 @app.get("/peek")
-def peek(
+async def peek(
     image: str,
     layer: str = Query(default="all"),
     arch: int = Query(default=0),
@@ -478,80 +552,34 @@ def peek(
     if not IMAGE_PATTERN.match(image):
         raise HTTPException(status_code=400, detail="Invalid image reference format")
     
-    # If status_only, redirect to peek_status logic
+    # If status_only, redirect to peek_status logic (default arch string for status lookup)
     if status_only:
-        namespace, repo, tag = parse_image_ref(image)
-        arch_str = "amd64"  # Default arch string for status lookup
-        conn = init_database()
-        try:
-            status = get_layer_status(conn, namespace, repo, tag, arch_str)
-            if status is None:
-                try:
-                    get_image_config(namespace=namespace, repo=repo, tag=tag, arch=arch_str)
-                    status = get_layer_status(conn, namespace, repo, tag, arch_str)
-                except Exception as e:
-                    return JSONResponse(
-                        content={"image": image, "config_cached": False, "error": str(e)},
-                        status_code=200,
-                    )
-            return JSONResponse(
-                content={"image": image, **(status or {"config_cached": False})},
-                status_code=200,
-            )
-        finally:
-            conn.close()
+        return await peek_status(image, arch="amd64")
     
     # Parse image reference for tracking
     namespace, repo, tag = parse_image_ref(image)
     arch_str = "amd64"  # Default architecture
     
-    # Capture stdout
-    old_stdout = sys.stdout
-    sys.stdout = captured_output = StringIO()
-    
-    try:
-        # Set argv as if called from CLI
-        sys.argv = [
-            "main.py",
-            "-t", image,
-            f"--peek-layer={layer}",
-            f"--arch={arch}",
-            "--force"
-        ]
-        if hide_build:
-            sys.argv.append("--hide-build")
+    # Set argv as if called from CLI
+    argv = [
+        "main.py",
+        "-t", image,
+        f"--peek-layer={layer}",
+        f"--arch={arch}",
+        "--force"
+    ]
+    if hide_build:
+        argv.append("--hide-build")
+    
+    # Call main directly, capturing stdout, then track which layers were peeked
+    output = await run_in_threadpool(_run_peek, argv)
+    await run_in_threadpool(_track_peeked, namespace, repo, tag, arch_str, layer)
         
-        # Call main directly
-        main.main()
-        
-    finally:
-        # Restore stdout
-        sys.stdout = old_stdout
-    
-    # Track which layers were peeked
-    conn = init_database()
-    try:
-        if layer == "all":
-            # Get layer count from cached config
-            status = get_layer_status(conn, namespace, repo, tag, arch_str)
-            if status and "layer_count" in status:
-                for idx in range(status["layer_count"]):
-                    update_layer_peeked(conn, namespace, repo, tag, arch_str, idx)
-        else:
-            # Single layer was peeked
-            try:
-                layer_idx = int(layer)
-                update_layer_peeked(conn, namespace, repo, tag, arch_str, layer_idx)
-            except ValueError:
-                pass  # Invalid layer index, skip tracking
-    finally:
-        conn.close()
-    
-    return PlainTextResponse(captured_output.getvalue())
+    return PlainTextResponse(output)
 
 
 @app.get("/carve")
-def carve(
+async def carve(
     image: str,
     path: str = Query(..., description="File path in container, e.g., /etc/passwd"),
     layer: int = Query(..., description="Layer index to extract from (REQUIRED). Use /peek/status to discover layer indices."),
@@ -585,7 +613,7 @@ def carve(
     if not IMAGE_PATTERN.match(image):
         raise HTTPException(status_code=400, detail="Invalid image reference format")
     
-    content, result = carve_file_to_bytes(image, path, layer_index=layer)
+    content, result = await carve_file_to_bytes_async(image, path, layer_index=layer)
     
     if not result.found:
         detail = result.error or f"File not found: {path}"
@@ -631,7 +659,7 @@ def carve(
 
 
 @app.get("/layer/download")
-def download_layer(
+async def download_layer(
     image: str,
     digest: str = Query(..., description="Layer digest, e.g., sha256:abc123..."),
 ):
@@ -664,43 +692,43 @@ def download_layer(
     
     # Parse image reference to get namespace and repo
     namespace, repo, _ = parse_image_ref(image)
-    url = f"{registry_base_url(namespace, repo)}/blobs/{digest}"
     
-    # Create authenticated session and fetch the layer
-    auth = RegistryAuth(namespace, repo)
+    # Create authenticated session; a whole layer is not worth a copy in the blob cache
+    auth = AsyncRegistryAuth(namespace, repo)
+    reader = AsyncBlobReader(auth, namespace, repo, digest, chunk_size=65536, use_cache=False)
     
-    try:
-        resp = auth.request_with_retry("GET", url, stream=True)
-        resp.raise_for_status()
-    except requests.RequestException as e:
+    # Read the first chunk up front so registry errors surface as a 502
+    first_chunk = await reader.fetch_chunk()
+    if reader.error or not first_chunk:
+        await reader.close()
         auth.invalidate()
-        raise HTTPException(status_code=502, detail=f"Registry request failed: {e}")
+        raise HTTPException(
+            status_code=502,
+            detail=f"Registry request failed: {reader.error or 'empty blob'}",
+        )
     
     # Generate a clean filename from the digest
     filename = digest.replace(":", "_") + ".tar.gz"
     
-    # Get content length if available
-    content_length = resp.headers.get("Content-Length", "")
-    
-    # Stream the response content directly to the browser
-    def generate():
+    # Stream the blob (cached bytes first, then the registry) to the browser
+    async def generate():
         try:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if chunk:
-                    yield chunk
+            chunk = first_chunk
+            while chunk:
+                yield chunk
+                chunk = await reader.fetch_chunk()
         finally:
-            resp.close()
+            await reader.close()
             auth.invalidate()
     
     headers = {
         "Content-Disposition": f'attachment; filename="{filename}"',
     }
-    if content_length:
-        headers["Content-Length"] = content_length
+    if reader.total_size:
+        headers["Content-Length"] = str(reader.total_size)
     
     return StreamingResponse(
         generate(),
         media_type="application/gzip",
         headers=headers,
     )
-
@@ -1 +1,11 @@
 from .auth import RegistryAuth, get_auth
+from .pool import ConnectionPoolManager, get_pool, configure_pool
+from .token_cache import TokenCache, get_token_cache
+from .retry import RetryBudget
+from .ratelimit import RateLimiter, get_rate_limiter, configure_rate_limiter
+from .async_auth import (
+    AsyncRegistryAuth,
+    get_async_client,
+    configure_async_client,
+    close_async_client,
+)
\ No newline at end of file
@@ -0,0 +1,369 @@
+"""
+Asyncio counterpart of RegistryAuth, built on httpx.AsyncClient.
+
+Lets the API run many layer operations on one event loop instead of
+parking a threadpool worker on each blocking requests call. Everything
+that is not I/O is shared with the sync client: bearer tokens come from
+the same TokenCache, resolved CDN locations from the same
+BlobLocationCache, and requests are paced by the same RateLimiter, so
+sync and async callers draw from one budget.
+
+One AsyncClient is kept per event loop (clients cannot cross loops).
+HTTP/2 is optional (configure_async_client(http2=True), needs h2): it
+multiplexes concurrent requests to one host, e.g. Range streams for all
+layers of an image, over a single connection instead of one each.
+"""
+
+import asyncio
+import importlib.util
+import weakref
+from typing import Optional
+from urllib.parse import urljoin
+
+import httpx
+
+from app.config import DOCKERHUB_IDENTIFIER, DOCKERHUB_SECRET
+from app.modules.auth.auth import RegistryAuth
+from app.modules.auth.token_cache import TokenCache, get_token_cache
+from app.modules.auth.blob_locations import (
+    BlobLocationCache,
+    get_blob_locations,
+    EXPIRED_STATUSES,
+)
+from app.modules.auth.ratelimit import get_rate_limiter
+from app.modules.auth.retry import (
+    RetryBudget,
+    RETRY_STATUSES,
+    IDEMPOTENT_METHODS,
+    is_retryable,
+    retry_after_seconds,
+)
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+DEFAULT_ASYNC_MAX_CONNECTIONS = 100     # Open connections across all hosts
+DEFAULT_ASYNC_KEEPALIVE = 32            # Idle connections kept alive
+DEFAULT_ASYNC_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+DEFAULT_ASYNC_HTTP2 = False             # Negotiate HTTP/2 via ALPN (needs h2)
+
+ACCEPT_MANIFESTS = (
+    "application/vnd.docker.distribution.manifest.v2+json, "
+    "application/vnd.oci.image.manifest.v1+json"
+)
+
+
+# =============================================================================
+# Per-loop Client
+# =============================================================================
+
+async def _pace_request(request: httpx.Request):
+    await get_rate_limiter().acquire_async(str(request.url))
+
+
+async def _observe_response(response: httpx.Response):
+    get_rate_limiter().observe(str(response.request.url), response)
+
+
+def http2_available() -> bool:
+    """True if the h2 package httpx needs for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def new_async_client(
+    max_connections: int = DEFAULT_ASYNC_MAX_CONNECTIONS,
+    max_keepalive: int = DEFAULT_ASYNC_KEEPALIVE,
+    http2: bool = DEFAULT_ASYNC_HTTP2,
+    **client_kwargs
+) -> httpx.AsyncClient:
+    """
+    Create an AsyncClient whose requests go through the rate limiter.
+    
+    Args:
+        max_connections: Open connections across all hosts
+        max_keepalive: Idle connections kept alive
+        http2: Offer HTTP/2; hosts that only speak HTTP/1.1 still work
+        **client_kwargs: Extra httpx.AsyncClient arguments (e.g. verify)
+    
+    Raises:
+        ImportError: http2=True but h2 is not installed
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        ),
+        timeout=DEFAULT_ASYNC_TIMEOUT,
+        http2=http2,
+        event_hooks={"request": [_pace_request], "response": [_observe_response]},
+        **client_kwargs,
+    )
+
+
+_client_settings = {
+    "max_connections": DEFAULT_ASYNC_MAX_CONNECTIONS,
+    "max_keepalive": DEFAULT_ASYNC_KEEPALIVE,
+    "http2": DEFAULT_ASYNC_HTTP2,
+}
+
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_token_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = new_async_client(**_client_settings)
+    return client
+
+
+def configure_async_client(
+    max_connections: int = DEFAULT_ASYNC_MAX_CONNECTIONS,
+    max_keepalive: int = DEFAULT_ASYNC_KEEPALIVE,
+    http2: bool = DEFAULT_ASYNC_HTTP2,
+) -> None:
+    """
+    Set how the shared per-loop AsyncClients are built.
+    
+    Applies to clients created afterwards; a loop that already has one
+    keeps it until close_async_client().
+    
+    Raises:
+        ImportError: http2=True but h2 is not installed
+    """
+    if http2 and not http2_available():
+        raise ImportError("HTTP/2 needs the h2 package: pip install 'httpx[http2]'")
+    _client_settings.update(
+        max_connections=max_connections,
+        max_keepalive=max_keepalive,
+        http2=http2,
+    )
+
+
+async def close_async_client():
+    """Close the running loop's shared AsyncClient (e.g. on app shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _token_lock(key: tuple) -> asyncio.Lock:
+    """Per-loop, per-key lock so concurrent tasks make one token request."""
+    locks = _token_locks.setdefault(asyncio.get_running_loop(), {})
+    lock = locks.get(key)
+    if lock is None:
+        lock = locks[key] = asyncio.Lock()
+    return lock
+
+
+# =============================================================================
+# Async Registry Auth
+# =============================================================================
+
+class AsyncRegistryAuth:
+    """
+    Asyncio registry authentication, mirroring RegistryAuth.
+    
+    Usage:
+        auth = AsyncRegistryAuth("library", "nginx")
+        resp = await auth.request_with_retry("GET", url)
+        # ... do work ...
+        auth.invalidate()  # cleanup when done
+    """
+    
+    AUTH_URL = RegistryAuth.AUTH_URL
+    SERVICE = RegistryAuth.SERVICE
+    
+    def __init__(
+        self,
+        namespace: str,
+        repo: str,
+        client: Optional[httpx.AsyncClient] = None,
+        token_cache: Optional[TokenCache] = None,
+        blob_locations: Optional[BlobLocationCache] = None,
+        retry_budget: Optional[RetryBudget] = None,
+    ):
+        """
+        Initialize auth for a specific repository.
+        
+        Args:
+            namespace: Docker Hub namespace (e.g., "library", "nginx")
+            repo: Repository name (e.g., "nginx", "alpine")
+            client: AsyncClient to send through (default: the running loop's shared client)
+            token_cache: Token cache to share tokens through (default: process-wide cache)
+            blob_locations: Cache of resolved blob redirects (default: process-wide cache)
+            retry_budget: Retry allowance for this operation (default: a fresh RetryBudget)
+        """
+        self.namespace = namespace
+        self.repo = repo
+        self._client = client
+        self._token_cache = token_cache or get_token_cache()
+        self._blob_locations = blob_locations or get_blob_locations()
+        self.retry_budget = retry_budget or RetryBudget()
+        self._token: Optional[str] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_async_client()
+    
+    @property
+    def scope(self) -> str:
+        """Repository scope this instance's tokens are issued for."""
+        return f"repository:{self.namespace}/{self.repo}:pull"
+    
+    def _token_key(self) -> tuple[str, str, str, str]:
+        """Token cache key, identical to RegistryAuth's so both share tokens."""
+        identity = DOCKERHUB_IDENTIFIER if DOCKERHUB_IDENTIFIER and DOCKERHUB_SECRET else ""
+        return (self.AUTH_URL, self.SERVICE, self.scope, identity)
+    
+    async def _request_token(self) -> dict:
+        """Request a pull token from the auth endpoint (JSON response)."""
+        auth = None
+        if DOCKERHUB_IDENTIFIER and DOCKERHUB_SECRET:
+            auth = (DOCKERHUB_IDENTIFIER, DOCKERHUB_SECRET)
+        
+        resp = await self.client.get(
+            self.AUTH_URL,
+            params={
+                "service": self.SERVICE,
+                "scope": self.scope,
+            },
+            auth=auth,
+            timeout=10,
+        )
+        resp.raise_for_status()
+        return resp.json()
+    
+    async def _ensure_valid_token(self) -> str:
+        """Get a token from the shared cache, fetching it once on a miss."""
+        key = self._token_key()
+        token = self._token_cache.lookup(key)
+        if not token:
+            async with _token_lock(key):
+                # Another task may have fetched it while we waited
+                token = self._token_cache.lookup(key)
+                if not token:
+                    token = self._token_cache.store(key, await self._request_token())
+        self._token = token
+        return token
+    
+    def refresh_token(self):
+        """Discard the current token after the registry rejected it (401)."""
+        if self._token:
+            self._token_cache.discard(self._token_key(), self._token)
+        self._token = None
+    
+    async def _send_once(
+        self,
+        method: str,
+        url: str,
+        stream: bool = False,
+        follow_redirects: bool = True,
+        headers: Optional[dict] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """Send one authenticated request, refreshing the token and resending once on 401."""
+        for attempt in range(2):
+            token = await self._ensure_valid_token()
+            request = self.client.build_request(
+                method,
+                url,
+                headers={
+                    "Accept": ACCEPT_MANIFESTS,
+                    "Authorization": f"Bearer {token}",
+                    **(headers or {}),
+                },
+                **kwargs,
+            )
+            resp = await self.client.send(request, stream=stream, follow_redirects=follow_redirects)
+            if resp.status_code != 401 or attempt:
+                return resp
+            # Token expired or invalid, refresh and retry once
+            await resp.aclose()
+            self.refresh_token()
+        return resp
+    
+    async def request_with_retry(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Make an HTTP request with automatic 401 retry and transient-failure backoff.
+        
+        Same policy as RegistryAuth.request_with_retry(). Redirects are
+        followed unless follow_redirects=False is passed.
+        
+        Args:
+            method: HTTP method ("GET", "HEAD", etc.)
+            url: Full URL to request
+            **kwargs: stream, follow_redirects, headers, params, timeout
+        
+        Returns:
+            httpx.Response (body already read unless stream=True)
+        """
+        retry = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                resp = await self._send_once(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                if not (retry and is_retryable(e) and await self.retry_budget.wait_async(attempt)):
+                    raise
+                attempt += 1
+                continue
+            
+            if (retry and resp.status_code in RETRY_STATUSES
+                    and await self.retry_budget.wait_async(attempt, retry_after_seconds(resp))):
+                await resp.aclose()
+                attempt += 1
+                continue
+            return resp
+    
+    async def open_blob(self, url: str, headers: Optional[dict] = None) -> httpx.Response:
+        """
+        Open a streaming GET for a blob, via its cached CDN location if any.
+        
+        Same redirect handling as RegistryAuth.request_blob(): the CDN
+        location is resolved once, cached until its signed expiry, and
+        never sent the registry bearer token. The caller must aclose()
+        the response.
+        """
+        location = self._blob_locations.get(url)
+        if location:
+            resp = await self.client.send(
+                self.client.build_request("GET", location, headers=headers),
+                stream=True,
+            )
+            if resp.status_code not in EXPIRED_STATUSES:
+                return resp
+            await resp.aclose()
+            self._blob_locations.discard(url, location)
+        
+        resp = await self.request_with_retry(
+            "GET", url, stream=True, follow_redirects=False, headers=headers,
+        )
+        if not resp.is_redirect:
+            return resp
+        
+        location = urljoin(url, resp.headers["Location"])
+        await resp.aclose()
+        self._blob_locations.put(url, location)
+        return await self.client.send(
+            self.client.build_request("GET", location, headers=headers),
+            stream=True,
+        )
+    
+    def invalidate(self):
+        """
+        Drop this operation's token and restore its retry budget.
+        
+        The shared AsyncClient (and its connections) stays open.
+        """
+        self._token = None
+        self.retry_budget.reset()
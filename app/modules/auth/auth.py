@@ -3,14 +3,30 @@ Centralized Docker registry authentication.
 
 Provides RegistryAuth class for all registry API calls with:
 - Token auto-refresh on 401
-- Session management
+- Backoff-and-retry on transient failures (429/5xx, resets, timeouts)
+- Session management over the shared connection pool
 - Proper cleanup via invalidate()
 """
 
 import requests
 from typing import Optional
+from urllib.parse import urljoin
 
 from app.config import DOCKERHUB_IDENTIFIER, DOCKERHUB_SECRET
+from app.modules.auth.pool import ConnectionPoolManager, get_pool
+from app.modules.auth.token_cache import TokenCache, get_token_cache
+from app.modules.auth.blob_locations import (
+    BlobLocationCache,
+    get_blob_locations,
+    EXPIRED_STATUSES,
+)
+from app.modules.auth.retry import (
+    RetryBudget,
+    RETRY_STATUSES,
+    IDEMPOTENT_METHODS,
+    is_retryable,
+    retry_after_seconds,
+)
 
 
 class RegistryAuth:
@@ -25,61 +41,110 @@ class RegistryAuth:
     """
     
     AUTH_URL = "https://auth.docker.io/token"
+    SERVICE = "registry.docker.io"
     
-    def __init__(self, namespace: str, repo: str):
+    def __init__(
+        self,
+        namespace: str,
+        repo: str,
+        pool: Optional[ConnectionPoolManager] = None,
+        token_cache: Optional[TokenCache] = None,
+        blob_locations: Optional[BlobLocationCache] = None,
+        retry_budget: Optional[RetryBudget] = None,
+    ):
         """
         Initialize auth for a specific repository.
         
         Args:
             namespace: Docker Hub namespace (e.g., "library", "nginx")
             repo: Repository name (e.g., "nginx", "alpine")
+            pool: Connection pool to borrow from (default: process-wide pool)
+            token_cache: Token cache to share tokens through (default: process-wide cache)
+            blob_locations: Cache of resolved blob redirects (default: process-wide cache)
+            retry_budget: Retry allowance for this operation (default: a fresh RetryBudget)
         """
         self.namespace = namespace
         self.repo = repo
+        self._pool = pool or get_pool()
+        self._token_cache = token_cache or get_token_cache()
+        self._blob_locations = blob_locations or get_blob_locations()
+        self.retry_budget = retry_budget or RetryBudget()
         self._token: Optional[str] = None
         self._session: Optional[requests.Session] = None
     
-    def _fetch_token(self) -> str:
+    @property
+    def scope(self) -> str:
+        """Repository scope this instance's tokens are issued for."""
+        return f"repository:{self.namespace}/{self.repo}:pull"
+    
+    def _token_key(self) -> tuple[str, str, str, str]:
+        """Token cache key: (auth endpoint, service, scope, credential identity)."""
+        identity = DOCKERHUB_IDENTIFIER if DOCKERHUB_IDENTIFIER and DOCKERHUB_SECRET else ""
+        return (self.AUTH_URL, self.SERVICE, self.scope, identity)
+    
+    def _request_token(self) -> dict:
         """
-        Fetch a fresh pull token.
+        Request a pull token from the auth endpoint.
         
         Uses params dict approach (cleaner than f-string URL, handles encoding).
         If credentials are configured, uses authenticated request for higher rate limits.
+        
+        Returns:
+            The token endpoint's JSON response (token, expires_in, issued_at)
         """
         auth = None
         if DOCKERHUB_IDENTIFIER and DOCKERHUB_SECRET:
             auth = (DOCKERHUB_IDENTIFIER, DOCKERHUB_SECRET)
         
-        resp = requests.get(
+        resp = self._pool.request(
+            "GET",
             self.AUTH_URL,
             params={
-                "service": "registry.docker.io",
-                "scope": f"repository:{self.namespace}/{self.repo}:pull"
+                "service": self.SERVICE,
+                "scope": self.scope,
             },
             auth=auth,
             timeout=10
         )
         resp.raise_for_status()
-        token = resp.json().get("token")
-        if not token:
-            raise ValueError("Auth endpoint returned no token")
-        return token
+        return resp.json()
+    
+    def _fetch_token(self) -> str:
+        """
+        Get a pull token for this repository's scope.
+        
+        Served from the shared token cache while the cached token is still
+        fresh; otherwise a single request is made and cached for everyone
+        asking for the same scope and credentials.
+        """
+        return self._token_cache.get(self._token_key(), self._request_token)
     
     def _ensure_valid_token(self) -> str:
-        """Get token, fetching if not cached."""
-        if not self._token:
-            self._token = self._fetch_token()
+        """Get token, refreshing it shortly before it expires."""
+        self._token = self._fetch_token()
         return self._token
     
+    def refresh_token(self):
+        """
+        Discard the current token after the registry rejected it (401).
+        
+        The next get_session() fetches a new one.
+        """
+        if self._token:
+            self._token_cache.discard(self._token_key(), self._token)
+        self._token = None
+    
     def get_session(self) -> requests.Session:
         """
         Get authenticated session.
         
         Creates session on first call, reuses thereafter.
-        Token is injected into Authorization header.
+        The session borrows keep-alive connections from the shared pool,
+        while its headers (and so the bearer token) stay private to this
+        instance. Token is injected into Authorization header.
         """
         if not self._session:
-            self._session = requests.Session()
+            self._session = self._pool.session()
             self._session.headers.update({
                 "Accept": "application/vnd.docker.distribution.manifest.v2+json, "
                           "application/vnd.oci.image.manifest.v1+json"
@@ -98,7 +163,10 @@ class RegistryAuth:
         """
         Make HTTP request with automatic 401 retry.
         
-        On 401 response, refreshes token and retries once.
+        On 401 response, refreshes token and retries once. Idempotent
+        requests that fail transiently (connection reset, timeout, 429/5xx)
+        are retried with backoff, honoring Retry-After, until this
+        operation's retry budget is spent.
         
         Args:
             method: HTTP method ("GET", "HEAD", etc.)
@@ -106,30 +174,111 @@ class RegistryAuth:
             **kwargs: Passed to requests (e.g., stream=True, timeout=30)
             
         Returns:
-            requests.Response object
+            requests.Response object (the last one, if retries ran out)
         """
+        retry = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                resp = self._request_once(method, url, **kwargs)
+            except requests.RequestException as e:
+                if not (retry and is_retryable(e) and self.retry_budget.wait(attempt)):
+                    raise
+                attempt += 1
+                continue
+            
+            if (retry and resp.status_code in RETRY_STATUSES
+                    and self.retry_budget.wait(attempt, retry_after_seconds(resp))):
+                resp.close()
+                attempt += 1
+                continue
+            return resp
+    
+    def _request_once(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send one request, refreshing the token and resending once on 401."""
         session = self.get_session()
         resp = session.request(method, url, **kwargs)
         
         if resp.status_code == 401:
             # Token expired or invalid, refresh and retry once
-            self._token = None
+            self.refresh_token()
             session = self.get_session()
             resp = session.request(method, url, **kwargs)
         
         return resp
     
+    def request_blob(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET a blob, going straight to its CDN location when already resolved.
+        
+        The first request for a blob URL goes to the registry without
+        following redirects; a redirect Location is remembered (until its
+        signed expiry) and fetched directly. Later requests for the same
+        blob skip the registry hop. If the CDN rejects a cached location
+        (expired/revoked signature), it is dropped and the registry is
+        asked again.
+        
+        CDN requests never carry the registry bearer token.
+        
+        Args:
+            url: Registry blob URL (.../v2/<ns>/<repo>/blobs/<digest>)
+            **kwargs: Passed to requests (e.g., headers, stream=True, timeout=30)
+            
+        Returns:
+            requests.Response object
+        """
+        kwargs.pop("allow_redirects", None)
+        
+        location = self._blob_locations.get(url)
+        if location:
+            resp = self._pool.request("GET", location, **kwargs)
+            if resp.status_code not in EXPIRED_STATUSES:
+                return resp
+            resp.close()
+            self._blob_locations.discard(url, location)
+        
+        resp = self.request_with_retry("GET", url, allow_redirects=False, **kwargs)
+        if not resp.is_redirect:
+            return resp
+        
+        location = urljoin(url, resp.headers["Location"])
+        resp.close()
+        self._blob_locations.put(url, location)
+        return self._pool.request("GET", location, **kwargs)
+    
+    def fork(self) -> "RegistryAuth":
+        """
+        A new instance for the same repository, for use on another thread.
+        
+        Shares this instance's connection pool, caches and retry budget,
+        but gets its own session and token (a requests.Session must not
+        be used from several threads at once).
+        """
+        return type(self)(
+            self.namespace,
+            self.repo,
+            pool=self._pool,
+            token_cache=self._token_cache,
+            blob_locations=self._blob_locations,
+            retry_budget=self.retry_budget,
+        )
+    
     def invalidate(self):
         """
         Kill session after peek/carve operation.
         
         Call this at operation boundaries to ensure tokens scoped
         to one repository are not accidentally reused for another.
+        Cached tokens are keyed by repository scope, so the token cache
+        never hands one repository's token to another either.
+        
+        Only the per-operation session and token are dropped; the
+        underlying connections go back to the shared pool for reuse.
+        The retry budget is restored for the next operation.
         """
-        if self._session:
-            self._session.close()
         self._session = None
         self._token = None
+        self.retry_budget.reset()
 
 
 # Convenience function for simple one-off requests
@@ -0,0 +1,121 @@
+"""
+Cache of resolved blob redirect locations.
+
+Docker Hub answers GET /v2/<ns>/<repo>/blobs/<digest> with a redirect to a
+signed CDN URL. Remembering that URL lets later Range requests for the same
+blob go straight to the CDN instead of taking a registry hop each time.
+
+Entries are keyed by the registry blob URL (repository + digest), so a
+location resolved with one repository's token is never handed to another.
+They expire with the signed URL, or after DEFAULT_LOCATION_TTL when the
+expiry cannot be read from the URL.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import urlsplit, parse_qs
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+DEFAULT_LOCATION_TTL = 60       # Seconds to trust a location with unknown expiry
+MAX_LOCATION_TTL = 600          # Never trust a location longer than this
+EXPIRY_MARGIN = 10              # Seconds before signed expiry to stop using it
+
+# CDN answers meaning the signed URL is no longer usable
+EXPIRED_STATUSES = (401, 403, 404, 410)
+
+
+def signed_url_expiry(url: str) -> Optional[float]:
+    """
+    Read the expiry (Unix time) encoded in a signed CDN URL.
+    
+    Understands:
+    - S3 presigned URLs: X-Amz-Date + X-Amz-Expires
+    - CloudFront signed URLs: Expires=<unix>
+    - Cloudflare signed URLs (Docker Hub): verify=<unix>-<signature>
+    
+    Returns None if no expiry could be found.
+    """
+    params = {k.lower(): v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+    
+    try:
+        if "x-amz-date" in params and "x-amz-expires" in params:
+            signed = datetime.strptime(params["x-amz-date"], "%Y%m%dT%H%M%SZ")
+            signed = signed.replace(tzinfo=timezone.utc).timestamp()
+            return signed + int(params["x-amz-expires"])
+        if "expires" in params:
+            return float(params["expires"])
+        if "verify" in params:
+            return float(params["verify"].split("-", 1)[0])
+    except ValueError:
+        return None
+    return None
+
+
+class BlobLocationCache:
+    """
+    Thread-safe TTL cache mapping registry blob URLs to CDN locations.
+    
+    Usage:
+        locations = get_blob_locations()
+        locations.put(blob_url, cdn_url)
+        cdn_url = locations.get(blob_url)  # None once expired
+    """
+    
+    def __init__(self, default_ttl: float = DEFAULT_LOCATION_TTL):
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._locations: dict[str, tuple[str, float]] = {}
+    
+    def get(self, blob_url: str) -> Optional[str]:
+        """Return the cached location for blob_url, or None if missing/expired."""
+        with self._lock:
+            cached = self._locations.get(blob_url)
+            if not cached:
+                return None
+            location, expires_at = cached
+            if time.time() >= expires_at:
+                del self._locations[blob_url]
+                return None
+            return location
+    
+    def put(self, blob_url: str, location: str) -> None:
+        """Remember location for blob_url until its signed expiry."""
+        now = time.time()
+        expires_at = now + self.default_ttl
+        signed_expiry = signed_url_expiry(location)
+        if signed_expiry is not None:
+            expires_at = min(signed_expiry - EXPIRY_MARGIN, now + MAX_LOCATION_TTL)
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._locations[blob_url] = (location, expires_at)
+    
+    def discard(self, blob_url: str, location: Optional[str] = None) -> None:
+        """Forget blob_url's location (only if it still matches location, when given)."""
+        with self._lock:
+            cached = self._locations.get(blob_url)
+            if cached and (location is None or cached[0] == location):
+                del self._locations[blob_url]
+    
+    def clear(self) -> None:
+        """Forget every cached location."""
+        with self._lock:
+            self._locations.clear()
+
+
+# =============================================================================
+# Process-wide Cache
+# =============================================================================
+
+_blob_locations = BlobLocationCache()
+
+
+def get_blob_locations() -> BlobLocationCache:
+    """Return the process-wide blob location cache."""
+    return _blob_locations
@@ -0,0 +1,210 @@
+"""
+Process-wide HTTP connection pooling for registry traffic.
+
+Every RegistryAuth borrows its transport from one shared pool manager so
+TCP+TLS connections to auth.docker.io, registry-1.docker.io and the blob
+CDN stay alive across peeks, carves, config fetches and downloads.
+
+Only the transport is shared. Each operation still gets its own
+requests.Session carrying its own repository-scoped bearer token, so
+tokens are never reused across repositories.
+
+The pool's adapters also pace every request through the upstream
+RateLimiter (see ratelimit.py), so all registry traffic shares one
+per-host budget.
+"""
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.modules.auth.ratelimit import RateLimiter, get_rate_limiter
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+DEFAULT_POOL_CONNECTIONS = 8    # Number of distinct hosts kept warm
+DEFAULT_MAX_CONNECTIONS = 32    # Keep-alive connections per host
+DEFAULT_HOST_POOL_SIZES = {
+    "auth.docker.io": 4,        # Token requests are small and infrequent
+}
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that waits for the rate limiter before every send."""
+    
+    def __init__(self, manager: "ConnectionPoolManager", **kwargs):
+        self.manager = manager
+        super().__init__(**kwargs)
+    
+    def send(self, request, **kwargs):
+        limiter = self.manager.limiter
+        limiter.acquire(request.url)
+        resp = super().send(request, **kwargs)
+        limiter.observe(request.url, resp)
+        return resp
+
+
+class ConnectionPoolManager:
+    """
+    Shared keep-alive connection pools for registry requests.
+    
+    Usage:
+        pool = get_pool()
+        session = pool.session()   # new Session, shared connections
+        session.headers["Authorization"] = f"Bearer {token}"
+        resp = session.get(url)
+    """
+    
+    def __init__(
+        self,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        host_pool_sizes: Optional[dict[str, int]] = None,
+        block: bool = False,
+        limiter: Optional[RateLimiter] = None,
+    ):
+        """
+        Args:
+            pool_connections: Number of per-host pools to cache
+            max_connections: Keep-alive connections kept per host
+            host_pool_sizes: Per-host overrides of max_connections
+            block: If True, max_connections is a hard cap and extra requests
+                   wait for a free connection instead of opening a new one
+            limiter: Rate limiter to pace requests through (default: process-wide limiter)
+        """
+        self._lock = threading.RLock()
+        self.pool_connections = pool_connections
+        self.max_connections = max_connections
+        self.host_pool_sizes = dict(
+            DEFAULT_HOST_POOL_SIZES if host_pool_sizes is None else host_pool_sizes
+        )
+        self.block = block
+        self._limiter = limiter
+        self._default_adapter: Optional[HTTPAdapter] = None
+        self._host_adapters: dict[str, HTTPAdapter] = {}
+        # One unauthenticated session per thread (see request())
+        self._local = threading.local()
+    
+    @property
+    def limiter(self) -> RateLimiter:
+        return self._limiter or get_rate_limiter()
+    
+    def _new_adapter(self, maxsize: int) -> HTTPAdapter:
+        return RateLimitedAdapter(
+            self,
+            pool_connections=self.pool_connections,
+            pool_maxsize=maxsize,
+            pool_block=self.block,
+        )
+    
+    def _ensure_adapters(self) -> None:
+        """Create the shared adapters on first use."""
+        with self._lock:
+            if self._default_adapter is not None:
+                return
+            self._default_adapter = self._new_adapter(self.max_connections)
+            self._host_adapters = {
+                host: self._new_adapter(size)
+                for host, size in self.host_pool_sizes.items()
+            }
+    
+    def mount(self, session: requests.Session) -> requests.Session:
+        """Mount the shared adapters on an existing session."""
+        self._ensure_adapters()
+        session.mount("https://", self._default_adapter)
+        session.mount("http://", self._default_adapter)
+        for host, adapter in self._host_adapters.items():
+            session.mount(f"https://{host}/", adapter)
+        return session
+    
+    def session(self) -> requests.Session:
+        """
+        Create a new session backed by the shared connection pools.
+        
+        The session's headers are private to the caller; closing it is
+        not required (and does not tear down the shared pools).
+        """
+        return self.mount(requests.Session())
+    
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Make an unauthenticated request over the shared pools.
+        
+        Used for calls that carry no per-operation headers, such as
+        fetching bearer tokens. Each thread gets its own session (a
+        requests.Session is not thread-safe); all of them are mounted on
+        the shared adapters, so the connections are still pooled.
+        """
+        local = self._local
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = self.session()
+        return session.request(method, url, **kwargs)
+    
+    def stats(self) -> dict:
+        """Return the pool configuration and the hosts currently pooled."""
+        hosts = []
+        adapters = [self._default_adapter, *self._host_adapters.values()]
+        for adapter in adapters:
+            if adapter is None:
+                continue
+            for key in adapter.poolmanager.pools.keys():
+                hosts.append(f"{key.key_scheme}://{key.key_host}:{key.key_port}")
+        return {
+            "pool_connections": self.pool_connections,
+            "max_connections": self.max_connections,
+            "host_pool_sizes": dict(self.host_pool_sizes),
+            "block": self.block,
+            "pooled_hosts": sorted(set(hosts)),
+        }
+    
+    def close(self) -> None:
+        """Close every pooled connection. The pools are rebuilt on next use."""
+        with self._lock:
+            adapters = [self._default_adapter, *self._host_adapters.values()]
+            for adapter in adapters:
+                if adapter is not None:
+                    adapter.close()
+            self._default_adapter = None
+            self._host_adapters = {}
+            self._local = threading.local()
+
+
+# =============================================================================
+# Process-wide Pool
+# =============================================================================
+
+_pool = ConnectionPoolManager()
+
+
+def get_pool() -> ConnectionPoolManager:
+    """Return the process-wide connection pool manager."""
+    return _pool
+
+
+def configure_pool(
+    pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    host_pool_sizes: Optional[dict[str, int]] = None,
+    block: bool = False,
+) -> ConnectionPoolManager:
+    """
+    Replace the process-wide pool with one using the given sizing.
+    
+    Idle connections in the previous pool are closed.
+    """
+    global _pool
+    previous = _pool
+    _pool = ConnectionPoolManager(
+        pool_connections=pool_connections,
+        max_connections=max_connections,
+        host_pool_sizes=host_pool_sizes,
+        block=block,
+    )
+    previous.close()
+    return _pool
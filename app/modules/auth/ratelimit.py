@@ -0,0 +1,295 @@
+"""
+Upstream rate limiting for registry traffic.
+
+Bulk peeks and concurrent API calls can burn through Docker Hub's pull
+quota and then fail all at once. Every request sent over the shared
+connection pool first takes a token from its host's bucket, so bursts
+are queued and paced instead of rejected upstream.
+
+Responses feed back into the limiter:
+- ratelimit-limit / ratelimit-remaining headers (e.g. "100;w=21600") are
+  recorded per host and reported by status()
+- a 429 pauses the whole host for its Retry-After
+- an exhausted pull quota (remaining 0) pauses manifest requests, which
+  are what the quota counts; blob reads carry on
+
+Hosts without a configured rate (e.g. the blob CDN) are not throttled.
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from app.modules.auth.retry import retry_after_seconds
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+# Host -> (requests per second, burst)
+DEFAULT_HOST_RATES = {
+    "registry-1.docker.io": (10.0, 20),
+    "auth.docker.io": (2.0, 5),
+}
+
+QUOTA_PAUSE = 60.0              # Seconds to hold manifest requests once the quota is spent
+MAX_PAUSE = 300.0               # Longest pause a single 429 can impose
+
+
+def parse_ratelimit_header(value: Optional[str]) -> tuple[Optional[int], Optional[int]]:
+    """
+    Parse a Docker Hub ratelimit header.
+    
+    "100;w=21600" -> (100, 21600). Returns (None, None) if unreadable.
+    """
+    if not value:
+        return None, None
+    parts = value.split(";")
+    try:
+        count = int(parts[0].strip())
+    except ValueError:
+        return None, None
+    window = None
+    for part in parts[1:]:
+        key, _, val = part.strip().partition("=")
+        if key == "w" and val.isdigit():
+            window = int(val)
+    return count, window
+
+
+class TokenBucket:
+    """
+    Token bucket with reservations: callers queue in arrival order.
+    
+    Each reserve() takes a token immediately, possibly driving the balance
+    negative, and returns how long to wait until that token is refilled.
+    """
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def reserve(self) -> float:
+        """Take one token and return the seconds to wait before using it."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+    
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens
+
+
+@dataclass
+class HostQuota:
+    """Last pull quota a registry host reported."""
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    window: Optional[int] = None       # Seconds
+    source: Optional[str] = None       # docker-ratelimit-source (IP or account)
+    updated_at: Optional[float] = None  # Unix time
+    
+    def to_dict(self) -> dict:
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "window": self.window,
+            "source": self.source,
+            "updated_at": self.updated_at,
+        }
+
+
+class _HostState:
+    """Bucket, quota and pause deadlines for one host."""
+    
+    def __init__(self, bucket: Optional[TokenBucket]):
+        self.bucket = bucket
+        self.quota = HostQuota()
+        self.paused_until = 0.0         # Monotonic; all requests wait
+        self.quota_paused_until = 0.0   # Monotonic; manifest requests wait
+        self.requests = 0
+        self.waiting = 0
+        self.waited = 0.0               # Total seconds spent queued
+        self.throttled = 0              # 429 responses seen
+
+
+class RateLimiter:
+    """
+    Per-host request scheduler shared by all registry traffic.
+    
+    Usage:
+        limiter = get_rate_limiter()
+        limiter.acquire(url)          # blocks until the host allows a request
+        resp = send(url)
+        limiter.observe(url, resp)    # learn quota / back off on 429
+    """
+    
+    def __init__(
+        self,
+        host_rates: Optional[dict[str, tuple[float, int]]] = None,
+        default_rate: Optional[tuple[float, int]] = None,
+    ):
+        """
+        Args:
+            host_rates: Host -> (requests per second, burst)
+            default_rate: (requests per second, burst) for other hosts;
+                          None leaves them unthrottled
+        """
+        self.host_rates = dict(DEFAULT_HOST_RATES if host_rates is None else host_rates)
+        self.default_rate = default_rate
+        self._lock = threading.Lock()
+        self._hosts: dict[str, _HostState] = {}
+    
+    def _host(self, url: str) -> _HostState:
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                rate = self.host_rates.get(host, self.default_rate)
+                state = self._hosts[host] = _HostState(TokenBucket(*rate) if rate else None)
+            return state
+    
+    def _reserve(self, url: str) -> tuple[_HostState, float]:
+        """Count a request to url's host and return (host state, seconds to wait)."""
+        state = self._host(url)
+        now = time.monotonic()
+        with self._lock:
+            state.requests += 1
+            pause_end = state.paused_until
+            if "/manifests/" in url:
+                pause_end = max(pause_end, state.quota_paused_until)
+        
+        wait = max(pause_end - now, 0.0)
+        if state.bucket is not None:
+            wait = max(wait, state.bucket.reserve())
+        return state, wait
+    
+    def _queued(self, state: _HostState, delta: int, waited: float = 0.0) -> None:
+        with self._lock:
+            state.waiting += delta
+            state.waited += waited
+    
+    def acquire(self, url: str) -> float:
+        """
+        Wait until a request to url's host may be sent.
+        
+        Returns:
+            Seconds spent waiting
+        """
+        state, wait = self._reserve(url)
+        if wait <= 0:
+            return 0.0
+        self._queued(state, 1)
+        try:
+            time.sleep(wait)
+        finally:
+            self._queued(state, -1, wait)
+        return wait
+    
+    async def acquire_async(self, url: str) -> float:
+        """acquire() for the event loop: queue without blocking other tasks."""
+        state, wait = self._reserve(url)
+        if wait <= 0:
+            return 0.0
+        self._queued(state, 1)
+        try:
+            await asyncio.sleep(wait)
+        finally:
+            self._queued(state, -1, wait)
+        return wait
+    
+    def observe(self, url: str, resp: requests.Response) -> None:
+        """
+        Record quota headers from resp and back off if it was throttled.
+        
+        resp may be a requests or an httpx response.
+        """
+        state = self._host(url)
+        limit, window = parse_ratelimit_header(resp.headers.get("ratelimit-limit"))
+        remaining, _ = parse_ratelimit_header(resp.headers.get("ratelimit-remaining"))
+        now = time.monotonic()
+        
+        with self._lock:
+            if limit is not None or remaining is not None:
+                state.quota = HostQuota(
+                    limit=limit,
+                    remaining=remaining,
+                    window=window,
+                    source=resp.headers.get("docker-ratelimit-source"),
+                    updated_at=time.time(),
+                )
+                if remaining == 0:
+                    state.quota_paused_until = now + QUOTA_PAUSE
+            
+            if resp.status_code == 429:
+                state.throttled += 1
+                pause = retry_after_seconds(resp)
+                pause = min(pause if pause is not None else QUOTA_PAUSE, MAX_PAUSE)
+                state.paused_until = max(state.paused_until, now + pause)
+    
+    def status(self) -> dict:
+        """Current budget, queue and quota per host."""
+        now = time.monotonic()
+        hosts = {}
+        with self._lock:
+            states = list(self._hosts.items())
+        for host, state in states:
+            bucket = state.bucket
+            hosts[host] = {
+                "rate": bucket.rate if bucket else None,
+                "burst": bucket.burst if bucket else None,
+                "tokens": round(bucket.available(), 2) if bucket else None,
+                "requests": state.requests,
+                "waiting": state.waiting,
+                "waited_seconds": round(state.waited, 3),
+                "throttled": state.throttled,
+                "paused_for": round(max(state.paused_until - now, 0.0), 1),
+                "manifests_paused_for": round(max(state.quota_paused_until - now, 0.0), 1),
+                "quota": state.quota.to_dict(),
+            }
+        return {
+            "host_rates": {host: list(rate) for host, rate in self.host_rates.items()},
+            "default_rate": list(self.default_rate) if self.default_rate else None,
+            "hosts": hosts,
+        }
+
+
+# =============================================================================
+# Process-wide Limiter
+# =============================================================================
+
+_rate_limiter = RateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter."""
+    return _rate_limiter
+
+
+def configure_rate_limiter(
+    host_rates: Optional[dict[str, tuple[float, int]]] = None,
+    default_rate: Optional[tuple[float, int]] = None,
+) -> RateLimiter:
+    """
+    Replace the process-wide rate limiter with one using the given rates.
+    
+    Observed quotas and pauses start over.
+    """
+    global _rate_limiter
+    _rate_limiter = RateLimiter(host_rates=host_rates, default_rate=default_rate)
+    return _rate_limiter
@@ -0,0 +1,171 @@
+"""
+Retry policy for registry requests.
+
+Connection resets, read timeouts and 429/5xx answers are usually
+transient. Each operation (one RegistryAuth, i.e. one peek, carve or bulk
+peek) gets a RetryBudget: retries back off exponentially with full jitter,
+honor Retry-After, and stop once the budget is spent, so a registry that
+is really down fails the operation instead of stalling it.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+import requests
+import urllib3
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+DEFAULT_MAX_RETRIES = 8         # Retries per operation, across all its requests
+DEFAULT_BACKOFF_BASE = 0.5      # Seconds; backoff cap doubles per consecutive failure
+DEFAULT_BACKOFF_MAX = 30.0      # Longest backoff between two attempts
+MAX_RETRY_AFTER = 60.0          # Give up instead of honoring a longer Retry-After
+
+# Answers worth retrying (rate limited / temporarily unavailable)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Methods safe to resend
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def retry_after_seconds(resp) -> Optional[float]:
+    """
+    Seconds to wait according to a response's Retry-After header.
+    
+    Works with requests and httpx responses. Accepts both forms
+    (delta-seconds and HTTP-date). Returns None if the header is absent
+    or unreadable.
+    """
+    if resp is None:
+        return None
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True if exc is a transient failure worth retrying (requests or httpx)."""
+    if isinstance(exc, (requests.HTTPError, httpx.HTTPStatusError)):
+        return exc.response is not None and exc.response.status_code in RETRY_STATUSES
+    return isinstance(exc, (
+        requests.ConnectionError,
+        requests.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+        urllib3.exceptions.ProtocolError,
+        urllib3.exceptions.ReadTimeoutError,
+        httpx.TransportError,
+    ))
+
+
+class RetryBudget:
+    """
+    Per-operation retry allowance with exponential backoff and full jitter.
+    
+    Usage:
+        budget = RetryBudget()
+        attempt = 0
+        while True:
+            try:
+                return do_request()
+            except requests.RequestException as e:
+                if not is_retryable(e) or not budget.wait(attempt, retry_after_seconds(e.response)):
+                    raise
+                attempt += 1
+    """
+    
+    def __init__(
+        self,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries_used = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def remaining(self) -> int:
+        return max(self.max_retries - self.retries_used, 0)
+    
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Backoff before retry number attempt (0-based).
+        
+        Full jitter: uniform in [0, min(backoff_max, base * 2**attempt)],
+        but never shorter than the server's Retry-After.
+        """
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = random.uniform(0, cap)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+    
+    def wait(
+        self,
+        attempt: int,
+        retry_after: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> bool:
+        """
+        Spend one retry and sleep the backoff.
+        
+        Args:
+            attempt: Consecutive failures so far for this request (0-based)
+            retry_after: Server-requested wait in seconds, if any
+            cancel: Event that cuts the sleep short (e.g. reader closed)
+        
+        Returns:
+            True if the caller should retry, False if the budget is spent,
+            the server asked for a longer wait than MAX_RETRY_AFTER, or
+            the wait was cancelled
+        """
+        if not self._spend(retry_after):
+            return False
+        delay = self.delay(attempt, retry_after)
+        if cancel is not None:
+            return not cancel.wait(delay)
+        time.sleep(delay)
+        return True
+    
+    async def wait_async(self, attempt: int, retry_after: Optional[float] = None) -> bool:
+        """Async wait(): spend one retry and sleep the backoff on the event loop."""
+        if not self._spend(retry_after):
+            return False
+        await asyncio.sleep(self.delay(attempt, retry_after))
+        return True
+    
+    def _spend(self, retry_after: Optional[float]) -> bool:
+        """Take one retry from the budget, unless it is spent or the wait is too long."""
+        if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+            return False
+        with self._lock:
+            if self.retries_used >= self.max_retries:
+                return False
+            self.retries_used += 1
+        return True
+    
+    def reset(self) -> None:
+        """Restore the full allowance (at an operation boundary)."""
+        with self._lock:
+            self.retries_used = 0
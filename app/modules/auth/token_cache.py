@@ -0,0 +1,180 @@
+"""
+Process-wide bearer token cache.
+
+Pull tokens are cached per (auth endpoint, service, scope, credential
+identity) and honor the expires_in/issued_at fields of the token response,
+so a burst of operations on one repository makes one token request.
+Tokens are only ever shared between callers asking for the exact same
+repository scope.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+DEFAULT_EXPIRES_IN = 60     # Registry token spec default when expires_in is absent
+REFRESH_MARGIN = 15         # Seconds before expiry at which a token is refreshed
+
+TokenKey = tuple[str, str, str, str]  # (auth_url, service, scope, identity)
+
+
+@dataclass
+class CachedToken:
+    """A bearer token and the monotonic time at which it should be refreshed."""
+    token: str
+    refresh_at: float
+    
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.refresh_at
+
+
+def _parse_issued_at(value: Optional[str]) -> Optional[float]:
+    """Parse an RFC 3339 issued_at timestamp into a Unix time, or None."""
+    if not value:
+        return None
+    try:
+        # fromisoformat() does not accept a trailing "Z" before Python 3.11
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def token_lifetime(payload: dict) -> float:
+    """
+    Seconds a token response remains valid from now.
+    
+    Uses expires_in, reduced by the token's age when issued_at is present.
+    An issued_at in the future or older than the token's lifetime is
+    treated as clock skew and ignored.
+    """
+    try:
+        expires_in = float(payload.get("expires_in") or DEFAULT_EXPIRES_IN)
+    except (TypeError, ValueError):
+        expires_in = DEFAULT_EXPIRES_IN
+    
+    issued_at = _parse_issued_at(payload.get("issued_at"))
+    if issued_at is not None:
+        age = time.time() - issued_at
+        if 0 < age < expires_in:
+            return expires_in - age
+    return expires_in
+
+
+class TokenCache:
+    """
+    Thread-safe cache of bearer tokens with expiry awareness.
+    
+    Concurrent callers asking for the same key wait for a single fetch
+    instead of each requesting their own token.
+    
+    Usage:
+        cache = get_token_cache()
+        token = cache.get(key, fetch=lambda: {"token": ..., "expires_in": 300})
+    """
+    
+    def __init__(self, refresh_margin: float = REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._tokens: dict[TokenKey, CachedToken] = {}
+        self._key_locks: dict[TokenKey, threading.Lock] = {}
+        self.fetches = 0
+        self.hits = 0
+    
+    def _key_lock(self, key: TokenKey) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+    
+    def lookup(self, key: TokenKey) -> Optional[str]:
+        """Return the cached token for key if still fresh, else None."""
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached and cached.is_fresh():
+                self.hits += 1
+                return cached.token
+            return None
+    
+    def store(self, key: TokenKey, payload: dict) -> str:
+        """
+        Cache the token from a token endpoint response and return it.
+        
+        Raises:
+            ValueError: If the token response carries no token
+        """
+        token = payload.get("token") or payload.get("access_token")
+        if not token:
+            raise ValueError("Auth endpoint returned no token")
+        
+        lifetime = token_lifetime(payload)
+        # Never let the margin eat more than half of a short-lived token
+        margin = min(self.refresh_margin, lifetime / 2)
+        with self._lock:
+            self.fetches += 1
+            self._tokens[key] = CachedToken(
+                token=token,
+                refresh_at=time.monotonic() + lifetime - margin,
+            )
+        return token
+    
+    def get(self, key: TokenKey, fetch: Callable[[], dict]) -> str:
+        """
+        Return a fresh token for key, calling fetch() only on a miss.
+        
+        Args:
+            key: (auth_url, service, scope, identity)
+            fetch: Callable returning the token endpoint's JSON response
+        
+        Raises:
+            ValueError: If the token response carries no token
+        """
+        token = self.lookup(key)
+        if token:
+            return token
+        
+        with self._key_lock(key):
+            # Another thread may have refreshed while we waited
+            token = self.lookup(key)
+            if token:
+                return token
+            return self.store(key, fetch())
+    
+    def discard(self, key: TokenKey, token: Optional[str] = None) -> None:
+        """
+        Drop a cached token, e.g. after the registry rejected it with 401.
+        
+        If token is given, only drop the entry if it still holds that token,
+        so a token another thread just refreshed is not thrown away.
+        """
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached and (token is None or cached.token == token):
+                del self._tokens[key]
+    
+    def clear(self) -> None:
+        """Drop every cached token."""
+        with self._lock:
+            self._tokens.clear()
+
+
+# =============================================================================
+# Process-wide Cache
+# =============================================================================
+
+_token_cache = TokenCache()
+
+
+def get_token_cache() -> TokenCache:
+    """Return the process-wide token cache."""
+    return _token_cache
@@ -82,11 +82,56 @@ def parse_args():
         action="store_true",
         help="Force overwrite of existing database entries without prompting, for non-interactive mode",
     )
+    p.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Peek layers even if their complete listing is already in the database "
+             "(by default they are linked to this image without being fetched)",
+    )
+    p.add_argument(
+        "--budget",
+        dest="budget",
+        type=int,
+        default=256,
+        help="KB of layer data read per layer by --peek-layer and interactive peeks "
+             "(default: 256, 0 = the whole layer). A layer cut short continues "
+             "where it stopped the next time it is peeked",
+    )
     p.add_argument(
         "--hide-build",
         action="store_true",
         help="Hide build steps output (only show summary line)",
     )
+    p.add_argument(
+        "--index-span",
+        dest="index_span",
+        type=int,
+        default=0,
+        help="While peeking, record a gzip seek checkpoint every N MB of layer data "
+             "so later carves can skip ahead (default: 0, no index)",
+    )
+    p.add_argument(
+        "--workers", "-w",
+        dest="workers",
+        type=int,
+        default=1,
+        help="Layers peeked in parallel by --bulk-peek and --peek-layer all "
+             "(default: 1, one after another)",
+    )
+    p.add_argument(
+        "--columnar",
+        action="store_true",
+        help="With --bulk-peek, keep listings as compact column arrays instead of "
+             "one object per file (for images with hundreds of thousands of files)",
+    )
+    p.add_argument(
+        "--inflate",
+        dest="inflate",
+        choices=["auto", "isal", "zlib-ng", "zlib"],
+        default="auto",
+        help="gzip inflate backend: isal / zlib-ng if installed, else zlib "
+             "(default: auto, the fastest installed)",
+    )
     p.add_argument(
         "--api", "-A",
         action="store_true",
@@ -1,3 +1,3 @@
-from .peekers import peek_layer_streaming
+from .peekers import peek_layer_streaming, continue_peek
 from .layerPeekResult import LayerPeekResult
 from .config_manifest import get_image_config
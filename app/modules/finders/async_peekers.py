@@ -0,0 +1,278 @@
+"""
+Asyncio blob reader and layer peek.
+
+Async counterparts of IncrementalBlobReader and peek_layer_streaming()
+for the event loop. Only the transport differs: cache handling, chunk
+schedule, limits and byte accounting come from BlobReaderBase, and tar
+parsing from LayerPeekParser, so both paths produce identical results.
+"""
+
+import asyncio
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from app.modules.formatters import parse_image_ref, registry_base_url
+from app.modules.auth.async_auth import AsyncRegistryAuth
+from app.modules.auth.retry import RetryBudget, is_retryable, retry_after_seconds
+from app.modules.finders.blob_cache import BlobCache
+from app.modules.finders.chunk_schedule import ChunkSchedule, ADAPTIVE_MAX_CHUNK
+from app.modules.finders.layerPeekResult import LayerPeekResult
+from app.modules.finders.peekers import BlobReaderBase, LayerPeekParser
+
+
+class AsyncBlobReader(BlobReaderBase):
+    """
+    Fetches blob data in chunks over httpx, without blocking the event loop.
+    
+    Same modes, caching, chunk schedule, limit and retry behavior as
+    IncrementalBlobReader. Blob cache reads and writes are disk I/O, so
+    they run on a worker thread.
+    
+    Usage:
+        reader = AsyncBlobReader(auth, namespace, repo, digest)
+        try:
+            while not reader.exhausted:
+                chunk = await reader.fetch_chunk()
+                # process chunk...
+        finally:
+            await reader.close()
+    """
+    
+    def __init__(
+        self,
+        auth: AsyncRegistryAuth,
+        namespace: str,
+        repo: str,
+        digest: str,
+        chunk_size: int = 65536,  # 64KB default
+        streaming: bool = True,
+        cache: Optional[BlobCache] = None,
+        use_cache: bool = True,
+        schedule: Optional[ChunkSchedule] = None,
+        limit: int = 0,
+        retry_budget: Optional[RetryBudget] = None,
+        offset: int = 0,
+    ):
+        super().__init__(
+            digest,
+            f"{registry_base_url(namespace, repo)}/blobs/{digest}",
+            chunk_size,
+            streaming,
+            cache,
+            use_cache,
+            schedule,
+            limit,
+            retry_budget or auth.retry_budget,
+            offset,
+        )
+        self.auth = auth
+        self._response: Optional[httpx.Response] = None
+        self._stream: Optional[AsyncIterator[bytes]] = None
+        self._pending = bytearray()  # Received past the last chunk handed out
+    
+    async def _open(self, range_header: str) -> Optional[httpx.Response]:
+        """
+        Issue a streaming Range GET for the blob.
+        
+        Returns the response, or None if the range is past the end of the
+        blob (416).
+        """
+        resp = await self.auth.open_blob(self.url, headers={"Range": range_header})
+        self.requests_made += 1
+        
+        # 416 means range not satisfiable (past end of file)
+        if resp.status_code == 416:
+            await resp.aclose()
+            return None
+        
+        try:
+            resp.raise_for_status()
+        except httpx.HTTPStatusError:
+            await resp.aclose()
+            raise
+        self._set_total_size(resp.headers.get("Content-Range", ""))
+        return resp
+    
+    async def _read_ranged(self, size: int) -> bytes:
+        """Fetch one chunk with its own bounded Range request."""
+        end_offset = self.current_offset + size - 1
+        resp = await self._open(f"bytes={self.current_offset}-{end_offset}")
+        if resp is None:
+            return b""
+        try:
+            data = bytearray()
+            async for piece in resp.aiter_raw():
+                data += piece
+                if len(data) >= size:
+                    break
+            return bytes(data[:size])
+        finally:
+            await resp.aclose()
+    
+    async def _read_streamed(self, size: int) -> bytes:
+        """Read the next chunk off the open-ended Range response."""
+        if self._response is None:
+            self._response = await self._open(f"bytes={self.current_offset}-")
+            if self._response is None:
+                return b""
+            self._stream = self._response.aiter_raw()
+        
+        while len(self._pending) < size:
+            try:
+                self._pending += await self._stream.__anext__()
+            except StopAsyncIteration:
+                break
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+    
+    async def _read_network(self, size: int) -> bytes:
+        """
+        Read the next chunk from the registry, retrying transient failures.
+        
+        A retry reopens the blob at current_offset, so nothing is skipped
+        or read twice.
+        
+        Raises:
+            httpx.HTTPError once retries are exhausted or the failure is
+            not transient
+        """
+        attempt = 0
+        while True:
+            try:
+                if self.streaming:
+                    data = await self._read_streamed(size)
+                else:
+                    data = await self._read_ranged(size)
+                if self._ended_early(data):
+                    raise httpx.RemoteProtocolError(
+                        f"Blob stream ended at byte {self.current_offset:,} of {self.total_size:,}"
+                    )
+                return data
+            except httpx.HTTPError as e:
+                await self._drop_response()
+                response = e.response if isinstance(e, httpx.HTTPStatusError) else None
+                if not is_retryable(e) or not await self.retry_budget.wait_async(
+                    attempt, retry_after_seconds(response),
+                ):
+                    raise
+                attempt += 1
+                self.retries += 1
+    
+    async def fetch_chunk(self) -> bytes:
+        """
+        Fetch the next chunk of blob data.
+        Returns empty bytes if exhausted or on error.
+        """
+        if self.exhausted:
+            return b""
+        
+        size = self._next_size()
+        if not size:
+            self.exhausted = True
+            await self.close()
+            return b""
+        
+        data = await self._off_loop(self._read_cached, size)
+        from_cache = bool(data)
+        if not from_cache:
+            try:
+                data = await self._read_network(size)
+            except httpx.HTTPError as e:
+                self.error = str(e)
+                self.exhausted = True
+                await self.close()
+                return b""
+        
+        data = await self._off_loop(self._advance, data, from_cache)
+        if self.exhausted:
+            await self.close()
+        return data
+    
+    async def _off_loop(self, func, *args):
+        """Run a step that touches the blob cache on a worker thread (directly if there is none)."""
+        if self.cache is None:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+    
+    async def _drop_response(self):
+        self._pending.clear()
+        self._stream = None
+        if self._response is not None:
+            response, self._response = self._response, None
+            await response.aclose()
+    
+    async def close(self):
+        """
+        Drop the streaming response, if any, and persist the cache's range map.
+        
+        Safe to call repeatedly.
+        """
+        await self._drop_response()
+        await self._off_loop(self._flush_cache)
+
+
+# =============================================================================
+# Layer Peek - Async Streaming
+# =============================================================================
+
+async def peek_layer_streaming_async(
+    auth: AsyncRegistryAuth,
+    image_ref: str,
+    digest: str,
+    layer_size: int = 0,
+    chunk_size: int = 65536,
+    max_bytes: int = 262144,
+    streaming: bool = True,
+    adaptive: bool = True,
+    checkpoint_span: int = 0,
+    columnar: bool = False,
+) -> LayerPeekResult:
+    """
+    Async peek_layer_streaming(): enumerate a layer's tar headers on the event loop.
+    
+    There is no read-ahead option: other tasks on the loop (e.g. peeks of
+    the other layers) keep the connection busy while one chunk inflates.
+    
+    Args:
+        auth: AsyncRegistryAuth instance for authenticated requests
+        image_ref: Image reference (e.g., "nginx:latest")
+        digest: Layer digest (e.g., "sha256:abc123...")
+        layer_size: Total layer size (for info only, not used in logic)
+        chunk_size: Bytes per chunk when adaptive=False (default 64KB)
+        max_bytes: Maximum compressed bytes to read (default 256KB, 0 = no limit)
+        streaming: Use one open-ended Range request instead of one per chunk
+        adaptive: Start with small chunks and grow them while the archive
+                  keeps going, instead of fixed chunk_size reads
+        checkpoint_span: Record a gzip checkpoint every this many
+                         decompressed bytes (0 = no index)
+        columnar: Collect entries in EntryColumns rather than a list
+    
+    Returns:
+        LayerPeekResult with file listing
+    """
+    user, repo, _ = parse_image_ref(image_ref)
+    
+    schedule = ChunkSchedule.adaptive(maximum=ADAPTIVE_MAX_CHUNK) if adaptive else None
+    reader = AsyncBlobReader(
+        auth, user, repo, digest, chunk_size,
+        streaming=streaming, schedule=schedule, limit=max_bytes,
+    )
+    parser = LayerPeekParser(digest, checkpoint_span, columnar)
+    
+    try:
+        while not reader.exhausted and not parser.done:
+            if max_bytes and reader.current_offset >= max_bytes:
+                break
+            
+            compressed = await reader.fetch_chunk()
+            if not compressed:
+                break
+            parser.feed(compressed)
+            # Inflate/parse is CPU work; let other transfers make progress
+            await asyncio.sleep(0)
+    finally:
+        await reader.close()
+    
+    return parser.result(reader)
@@ -0,0 +1,362 @@
+"""
+On-disk, content-addressed partial blob cache.
+
+Blobs are immutable by digest, so any byte range fetched once from the
+registry can be served locally forever after. Each digest gets a sparse
+data file plus a JSON range map listing which byte ranges are present:
+
+    app/data/blobs/sha256/<hex>.blob   sparse blob bytes
+    app/data/blobs/sha256/<hex>.json   {"total_size": N, "ranges": [[start, end], ...]}
+
+Ranges are half-open [start, end). The map is only written after the data
+it describes, so a crash can lose cached bytes but never serve bad ones.
+When the cache grows past its size cap, least recently used digests are
+evicted whole.
+
+The cache is safe to share between threads of one process.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+# Under app/data wherever the process is started from
+DEFAULT_BLOB_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "blobs",
+)
+DEFAULT_BLOB_CACHE_MAX_BYTES = 2 * 1024 ** 3  # 2GB
+
+DIGEST_PATTERN = re.compile(r"^sha256:[0-9a-f]{64}$")
+
+
+def _add_range(ranges: list[list[int]], start: int, end: int) -> list[list[int]]:
+    """Insert [start, end) into a sorted list of disjoint ranges, merging overlaps."""
+    merged = []
+    placed = False
+    for r_start, r_end in ranges:
+        if r_end < start:
+            merged.append([r_start, r_end])
+        elif end < r_start:
+            if not placed:
+                merged.append([start, end])
+                placed = True
+            merged.append([r_start, r_end])
+        else:
+            start = min(start, r_start)
+            end = max(end, r_end)
+    if not placed:
+        merged.append([start, end])
+    return merged
+
+
+class _BlobEntry:
+    """In-memory range map for one cached digest."""
+    
+    def __init__(self, total_size: int = 0, ranges: Optional[list[list[int]]] = None):
+        self.total_size = total_size
+        self.ranges = ranges or []
+        self.last_access = time.time()
+        self.dirty = False
+    
+    @property
+    def cached_bytes(self) -> int:
+        return sum(end - start for start, end in self.ranges)
+    
+    def contiguous_from(self, offset: int) -> int:
+        """Number of cached bytes available starting exactly at offset."""
+        for start, end in self.ranges:
+            if start <= offset < end:
+                return end - offset
+        return 0
+
+
+class BlobCache:
+    """
+    Sparse, content-addressed cache of blob byte ranges.
+    
+    Usage:
+        cache = get_blob_cache()
+        data = cache.read(digest, offset, 65536)   # b"" on miss
+        cache.write(digest, offset, data, total_size)
+        cache.flush(digest)                         # persist range map
+    """
+    
+    def __init__(
+        self,
+        root: str = DEFAULT_BLOB_CACHE_DIR,
+        max_bytes: int = DEFAULT_BLOB_CACHE_MAX_BYTES,
+    ):
+        """
+        Args:
+            root: Directory holding cached blobs
+            max_bytes: Size cap in bytes; 0 disables the cache
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._entries: dict[str, _BlobEntry] = {}
+        self._newest_access = 0.0  # Latest last_access of any entry (the head of the LRU order)
+        self._scanned = False
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+    
+    # -------------------------------------------------------------------------
+    # Paths and persistence
+    # -------------------------------------------------------------------------
+    
+    def _paths(self, digest: str) -> tuple[str, str]:
+        """Return (data_path, map_path) for a digest."""
+        if not DIGEST_PATTERN.match(digest):
+            raise ValueError(f"Invalid blob digest: {digest}")
+        algo, hexdigest = digest.split(":", 1)
+        base = os.path.join(self.root, algo, hexdigest)
+        return base + ".blob", base + ".json"
+    
+    def _scan(self) -> None:
+        """Load every persisted range map (once) so eviction sees the whole cache."""
+        if self._scanned:
+            return
+        self._scanned = True
+        directory = os.path.join(self.root, "sha256")
+        if not os.path.isdir(directory):
+            return
+        for name in os.listdir(directory):
+            digest = f"sha256:{name[:-5]}"
+            if name.endswith(".json") and DIGEST_PATTERN.match(digest):
+                self._entry(digest)
+    
+    def _entry(self, digest: str) -> Optional[_BlobEntry]:
+        """Return the range map for digest, loading it from disk if needed."""
+        entry = self._entries.get(digest)
+        if entry is not None:
+            return entry
+        if not DIGEST_PATTERN.match(digest):
+            return None
+        data_path, map_path = self._paths(digest)
+        if not (os.path.exists(map_path) and os.path.exists(data_path)):
+            return None
+        try:
+            with open(map_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            entry = _BlobEntry(saved.get("total_size", 0), saved.get("ranges", []))
+            entry.last_access = saved.get("last_access", os.path.getmtime(map_path))
+        except (OSError, ValueError):
+            return None
+        self._entries[digest] = entry
+        self._newest_access = max(self._newest_access, entry.last_access)
+        return entry
+    
+    def _touch(self, entry: _BlobEntry) -> None:
+        """
+        Make entry the most recently used.
+        
+        It only needs saving if that changes the LRU order: an entry that
+        already was the most recent one is not marked dirty.
+        """
+        if entry.last_access < self._newest_access:
+            entry.dirty = True
+        entry.last_access = self._newest_access = max(time.time(), self._newest_access)
+    
+    def _save_map(self, digest: str, entry: _BlobEntry) -> None:
+        _, map_path = self._paths(digest)
+        tmp_path = map_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "total_size": entry.total_size,
+                "ranges": entry.ranges,
+                "last_access": entry.last_access,
+            }, f)
+        os.replace(tmp_path, map_path)
+        entry.dirty = False
+    
+    # -------------------------------------------------------------------------
+    # Reads and writes
+    # -------------------------------------------------------------------------
+    
+    def total_size(self, digest: str) -> int:
+        """Full blob size if known, else 0."""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            entry = self._entry(digest)
+            return entry.total_size if entry else 0
+    
+    def available(self, digest: str, offset: int) -> int:
+        """Number of contiguous cached bytes starting at offset."""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            entry = self._entry(digest)
+            return entry.contiguous_from(offset) if entry else 0
+    
+    def is_complete(self, digest: str) -> bool:
+        """True if every byte of the blob is cached."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            entry = self._entry(digest)
+            return bool(entry and entry.total_size
+                        and entry.contiguous_from(0) >= entry.total_size)
+    
+    def read(self, digest: str, offset: int, length: int) -> bytes:
+        """
+        Read up to length cached bytes starting at offset.
+        
+        Returns only the contiguous cached run, so the result may be
+        shorter than length; b"" on a miss.
+        """
+        if not self.enabled:
+            return b""
+        with self._lock:
+            entry = self._entry(digest)
+            if entry is None:
+                return b""
+            length = min(length, entry.contiguous_from(offset))
+            if length <= 0:
+                return b""
+            self._touch(entry)
+            data_path, _ = self._paths(digest)
+            try:
+                with open(data_path, "rb") as f:
+                    f.seek(offset)
+                    return f.read(length)
+            except OSError:
+                self._forget(digest)
+                return b""
+    
+    def write(self, digest: str, offset: int, data: bytes, total_size: int = 0) -> None:
+        """
+        Store data at offset. The range map is persisted on flush().
+        
+        Args:
+            digest: Blob digest (sha256:...)
+            offset: Byte offset of data within the blob
+            data: Bytes fetched from the registry
+            total_size: Full blob size, if known
+        """
+        if not self.enabled or not data or not DIGEST_PATTERN.match(digest):
+            return
+        with self._lock:
+            entry = self._entry(digest)
+            if entry is None:
+                entry = self._entries[digest] = _BlobEntry()
+            data_path, _ = self._paths(digest)
+            try:
+                os.makedirs(os.path.dirname(data_path), exist_ok=True)
+                mode = "r+b" if os.path.exists(data_path) else "w+b"
+                with open(data_path, mode) as f:
+                    f.seek(offset)
+                    f.write(data)
+            except OSError:
+                return
+            if total_size:
+                entry.total_size = total_size
+            entry.ranges = _add_range(entry.ranges, offset, offset + len(data))
+            self._touch(entry)
+            entry.dirty = True
+    
+    def flush(self, digest: Optional[str] = None) -> None:
+        """
+        Persist pending range maps (one digest, or all), then enforce the size cap.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            digests = [digest] if digest else list(self._entries)
+            for d in digests:
+                entry = self._entries.get(d)
+                if entry is not None and entry.dirty:
+                    try:
+                        self._save_map(d, entry)
+                    except OSError:
+                        pass
+            self.evict(keep=digest)
+    
+    # -------------------------------------------------------------------------
+    # Eviction
+    # -------------------------------------------------------------------------
+    
+    def _forget(self, digest: str) -> None:
+        """Delete a digest's files and range map."""
+        self._entries.pop(digest, None)
+        for path in self._paths(digest):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def size(self) -> int:
+        """Total cached bytes across all digests."""
+        with self._lock:
+            self._scan()
+            return sum(e.cached_bytes for e in self._entries.values())
+    
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        Evict least recently used digests until the cache fits its cap.
+        
+        Args:
+            keep: Digest to never evict (e.g. the one just written)
+        
+        Returns:
+            Number of bytes freed
+        """
+        with self._lock:
+            self._scan()
+            total = sum(e.cached_bytes for e in self._entries.values())
+            freed = 0
+            by_age = sorted(self._entries.items(), key=lambda item: item[1].last_access)
+            for digest, entry in by_age:
+                if total - freed <= self.max_bytes:
+                    break
+                if digest == keep:
+                    continue
+                freed += entry.cached_bytes
+                self._forget(digest)
+            return freed
+    
+    def stats(self) -> dict:
+        """Return cache location, cap and usage."""
+        with self._lock:
+            self._scan()
+            return {
+                "root": self.root,
+                "max_bytes": self.max_bytes,
+                "cached_bytes": sum(e.cached_bytes for e in self._entries.values()),
+                "blobs": len(self._entries),
+            }
+
+
+# =============================================================================
+# Process-wide Cache
+# =============================================================================
+
+_blob_cache = BlobCache()
+
+
+def get_blob_cache() -> BlobCache:
+    """Return the process-wide blob cache."""
+    return _blob_cache
+
+
+def configure_blob_cache(
+    root: str = DEFAULT_BLOB_CACHE_DIR,
+    max_bytes: int = DEFAULT_BLOB_CACHE_MAX_BYTES,
+) -> BlobCache:
+    """
+    Replace the process-wide blob cache (max_bytes=0 disables caching).
+    """
+    global _blob_cache
+    _blob_cache.flush()
+    _blob_cache = BlobCache(root=root, max_bytes=max_bytes)
+    return _blob_cache
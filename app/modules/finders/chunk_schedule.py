@@ -0,0 +1,95 @@
+"""
+Chunk sizing for blob readers.
+
+A fixed 64KB chunk is a compromise: too many round trips on big layers,
+too much over-fetch on tiny ones whose whole file list fits in the first
+few KB. ChunkSchedule starts small and grows geometrically while the
+caller keeps asking for more, up to a cap. A caller that knows how many
+bytes it still needs (e.g. a carve that found its target) can hint that,
+and the next chunks shrink to fit.
+
+The sizes actually used are recorded so peek/carve results can report
+the schedule for tuning.
+"""
+
+from typing import Optional
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+ADAPTIVE_INITIAL_CHUNK = 8 * 1024       # First read: enough for small layers' headers
+ADAPTIVE_MAX_CHUNK = 1024 * 1024        # Largest read the schedule grows to
+ADAPTIVE_MIN_CHUNK = 4 * 1024           # Never shrink reads below this
+ADAPTIVE_GROWTH = 2.0                   # Size multiplier per chunk
+
+
+class ChunkSchedule:
+    """
+    Chunk size policy for IncrementalBlobReader.
+    
+    Usage:
+        schedule = ChunkSchedule.adaptive()          # 8KB, 16KB, 32KB ... 1MB
+        schedule = ChunkSchedule.fixed(65536)        # always 64KB
+        size = schedule.next_size()
+        schedule.record(len(data))
+        schedule.hint_remaining(bytes_still_needed)  # shrink the next reads
+    """
+    
+    def __init__(
+        self,
+        initial: int,
+        maximum: Optional[int] = None,
+        growth: float = ADAPTIVE_GROWTH,
+        minimum: int = ADAPTIVE_MIN_CHUNK,
+    ):
+        self.size = max(initial, 1)
+        self.maximum = max(maximum or initial, self.size)
+        self.growth = growth
+        self.minimum = min(minimum, self.size)
+        self.remaining_hint: Optional[int] = None
+        self._runs: list[list[int]] = []  # [[size, count], ...]
+    
+    @classmethod
+    def fixed(cls, size: int) -> "ChunkSchedule":
+        """A schedule that always returns size."""
+        return cls(initial=size, maximum=size, growth=1.0)
+    
+    @classmethod
+    def adaptive(
+        cls,
+        initial: int = ADAPTIVE_INITIAL_CHUNK,
+        maximum: int = ADAPTIVE_MAX_CHUNK,
+    ) -> "ChunkSchedule":
+        """A schedule that starts at initial and doubles up to maximum."""
+        return cls(initial=initial, maximum=maximum)
+    
+    def next_size(self) -> int:
+        """Size of the next read."""
+        size = self.size
+        if self.remaining_hint is not None:
+            size = min(size, max(self.remaining_hint, self.minimum))
+        return size
+    
+    def record(self, size: int) -> None:
+        """Record a completed read of size bytes and grow the next one."""
+        if self._runs and self._runs[-1][0] == size:
+            self._runs[-1][1] += 1
+        else:
+            self._runs.append([size, 1])
+        self.size = min(int(self.size * self.growth), self.maximum)
+        if self.remaining_hint is not None:
+            self.remaining_hint = max(self.remaining_hint - size, 0)
+    
+    def hint_remaining(self, remaining: Optional[int]) -> None:
+        """
+        Tell the schedule roughly how many more bytes are needed.
+        
+        Pass None to clear the hint.
+        """
+        self.remaining_hint = remaining
+    
+    def runs(self) -> list[list[int]]:
+        """Run-length encoded read sizes: [[size, count], ...]."""
+        return [list(run) for run in self._runs]
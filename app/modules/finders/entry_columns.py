@@ -0,0 +1,244 @@
+"""
+Columnar storage for large layer listings.
+
+A peek normally collects its entries in a list, one object per entry.
+For a fat image (a CUDA or TeX layer can hold 500k files) EntryColumns
+keeps the same listing as parallel arrays instead:
+
+    sizes, mode_ints, uids, gids, mtimes    array("q"), one value per entry
+    typeflags, dir_flags                    bytearray, one byte per entry
+    name_blob + name_ends                   every name's bytes back to back,
+                                            and where each one ends
+    linknames                               {index: bytes}, only for entries
+                                            that have a link target
+
+That is a few dozen bytes per entry plus the name. Entries are
+materialized as CompactTarEntry only when read: by index, by iterating,
+or with entries(). to_dicts() and sqlite_rows() read the arrays
+directly.
+
+entry_dicts() and entry_rows() accept either a list of entries or
+EntryColumns, so serialization and storage code need not care which
+one a result holds.
+"""
+
+from array import array
+from typing import Iterable, Iterator, Union
+
+from app.modules.finders.tar_entry import AnyTarEntry, CompactTarEntry, mode_string, mtime_string
+
+
+# =============================================================================
+# Columns
+# =============================================================================
+
+class EntryColumns:
+    """
+    A tar listing held as parallel arrays.
+    
+    Behaves like a read-only list of CompactTarEntry (len, indexing,
+    slicing, iteration), plus append()/extend() while it is built.
+    
+    Usage:
+        columns = EntryColumns()
+        columns.extend(walker.feed(piece))
+        for name in columns.names():
+            ...
+        cursor.executemany(sql, columns.sqlite_rows())
+    """
+    
+    def __init__(self):
+        self.sizes = array("q")
+        self.mode_ints = array("q")
+        self.uids = array("q")
+        self.gids = array("q")
+        self.mtimes = array("q")
+        self.typeflags = bytearray()
+        self.dir_flags = bytearray()
+        self.name_blob = bytearray()
+        self.name_ends = array("q")
+        self.linknames: dict[int, bytes] = {}
+    
+    @classmethod
+    def from_entries(cls, entries: Iterable[CompactTarEntry]) -> "EntryColumns":
+        columns = cls()
+        columns.extend(entries)
+        return columns
+    
+    def append(self, entry: CompactTarEntry):
+        """Add one entry (it must carry raw values, i.e. be a CompactTarEntry)."""
+        linkname = entry._linkname
+        if linkname:
+            self.linknames[len(self.sizes)] = linkname if type(linkname) is bytes else linkname.encode("utf-8")
+        self.sizes.append(entry.size)
+        self.mode_ints.append(entry.mode_int)
+        self.uids.append(entry.uid)
+        self.gids.append(entry.gid)
+        self.mtimes.append(entry.mtime_unix)
+        self.typeflags.append(ord(entry.typeflag))
+        self.dir_flags.append(entry.is_dir)
+        self.name_blob += entry.name_bytes
+        self.name_ends.append(len(self.name_blob))
+    
+    def extend(self, entries: Union["EntryColumns", Iterable[CompactTarEntry]]):
+        """Add entries; another EntryColumns is appended column by column."""
+        if not isinstance(entries, EntryColumns):
+            for entry in entries:
+                self.append(entry)
+            return
+        
+        count, blob_size = len(self.sizes), len(self.name_blob)
+        for index, linkname in entries.linknames.items():
+            self.linknames[count + index] = linkname
+        self.sizes += entries.sizes
+        self.mode_ints += entries.mode_ints
+        self.uids += entries.uids
+        self.gids += entries.gids
+        self.mtimes += entries.mtimes
+        self.typeflags += entries.typeflags
+        self.dir_flags += entries.dir_flags
+        self.name_blob += entries.name_blob
+        self.name_ends.extend(end + blob_size for end in entries.name_ends)
+    
+    def __len__(self) -> int:
+        return len(self.sizes)
+    
+    def name_bytes(self, index: int) -> bytes:
+        """The raw name of entry index (no object is built)."""
+        start = self.name_ends[index - 1] if index else 0
+        return bytes(self.name_blob[start:self.name_ends[index]])
+    
+    def names(self) -> Iterator[str]:
+        """Every entry's name, in order."""
+        start = 0
+        blob = self.name_blob
+        for end in self.name_ends:
+            yield blob[start:end].decode("utf-8", errors="replace")
+            start = end
+    
+    def _entry(self, index: int) -> CompactTarEntry:
+        return CompactTarEntry(
+            self.name_bytes(index),
+            self.sizes[index],
+            chr(self.typeflags[index]),
+            bool(self.dir_flags[index]),
+            self.mode_ints[index],
+            self.uids[index],
+            self.gids[index],
+            self.mtimes[index],
+            self.linknames.get(index, b""),
+        )
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[CompactTarEntry, "EntryColumns"]:
+        """One entry as a CompactTarEntry, or a slice as new EntryColumns."""
+        count = len(self.sizes)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(count)
+            if step != 1:
+                return EntryColumns.from_entries(self._entry(i) for i in range(start, stop, step))
+            return self._slice(start, max(start, stop))
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("EntryColumns index out of range")
+        return self._entry(index)
+    
+    def _slice(self, start: int, stop: int) -> "EntryColumns":
+        columns = EntryColumns()
+        blob_start = self.name_ends[start - 1] if start else 0
+        columns.sizes = self.sizes[start:stop]
+        columns.mode_ints = self.mode_ints[start:stop]
+        columns.uids = self.uids[start:stop]
+        columns.gids = self.gids[start:stop]
+        columns.mtimes = self.mtimes[start:stop]
+        columns.typeflags = self.typeflags[start:stop]
+        columns.dir_flags = self.dir_flags[start:stop]
+        columns.name_blob = self.name_blob[blob_start:self.name_ends[stop - 1] if stop > start else blob_start]
+        columns.name_ends = array("q", (end - blob_start for end in self.name_ends[start:stop]))
+        columns.linknames = {i - start: link for i, link in self.linknames.items() if start <= i < stop}
+        return columns
+    
+    def __iter__(self) -> Iterator[CompactTarEntry]:
+        for index in range(len(self.sizes)):
+            yield self._entry(index)
+    
+    def entries(self) -> list[CompactTarEntry]:
+        """Materialize the whole listing as a list of entries."""
+        return list(self)
+    
+    def sqlite_rows(self) -> Iterator[tuple]:
+        """
+        Per entry: (name, size, typeflag, is_dir, mode, uid, gid, mtime,
+        linkname, is_symlink), the layer_entries columns storage writes.
+        """
+        linknames = self.linknames
+        rows = zip(
+            self.names(), self.sizes, self.typeflags, self.dir_flags,
+            self.mode_ints, self.uids, self.gids, self.mtimes,
+        )
+        for index, (name, size, typeflag, is_dir, mode_int, uid, gid, mtime) in enumerate(rows):
+            typeflag = chr(typeflag)
+            linkname = linknames.get(index)
+            yield (
+                name,
+                size,
+                typeflag,
+                bool(is_dir),
+                mode_string(mode_int, typeflag),
+                uid,
+                gid,
+                mtime_string(mtime),
+                linkname.decode("utf-8", errors="replace") if linkname else "",
+                typeflag == "2",
+            )
+    
+    def to_dicts(self) -> list[dict]:
+        """Every entry's to_dict(), without building entry objects."""
+        return [
+            {
+                "name": name,
+                "size": size,
+                "typeflag": typeflag,
+                "is_dir": is_dir,
+                "mode": mode,
+                "uid": uid,
+                "gid": gid,
+                "mtime": mtime,
+                "linkname": linkname,
+                "is_symlink": is_symlink,
+            }
+            for name, size, typeflag, is_dir, mode, uid, gid, mtime, linkname, is_symlink in self.sqlite_rows()
+        ]
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (excluding link targets)."""
+        arrays = (self.sizes, self.mode_ints, self.uids, self.gids, self.mtimes, self.name_ends)
+        return sum(a.itemsize * len(a) for a in arrays) + len(self.typeflags) * 2 + len(self.name_blob)
+    
+    def __repr__(self) -> str:
+        return f"EntryColumns({len(self)} entries, {self.nbytes:,} bytes)"
+
+
+# =============================================================================
+# Either Container
+# =============================================================================
+
+Entries = Union[list[AnyTarEntry], EntryColumns]
+
+
+def entry_dicts(entries: Entries) -> list[dict]:
+    """to_dict() of every entry, from a list or EntryColumns."""
+    if isinstance(entries, EntryColumns):
+        return entries.to_dicts()
+    return [entry.to_dict() for entry in entries]
+
+
+def entry_rows(entries: Entries) -> Iterator[tuple]:
+    """EntryColumns.sqlite_rows() for a list or EntryColumns."""
+    if isinstance(entries, EntryColumns):
+        return entries.sqlite_rows()
+    return (
+        (e.name, e.size, e.typeflag, e.is_dir, e.mode, e.uid, e.gid, e.mtime, e.linkname, e.is_symlink)
+        for e in entries
+    )
@@ -0,0 +1,345 @@
+"""
+eStargz table-of-contents fast path.
+
+An eStargz layer (lazily pullable, see containerd/stargz-snapshotter) is
+an ordinary gzipped tar written as many gzip members, ending with:
+
+    ... | TOC member (tar entry "stargz.index.json") | footer member
+
+The footer is an empty gzip member of fixed size whose header Extra
+field holds the TOC's compressed offset as "%016xSTARGZ". The TOC JSON
+lists every entry, and for each regular file the compressed offset of
+the gzip member(s) holding its content.
+
+read_toc() fetches the blob's tail with a suffix Range request, finds the
+footer and the TOC, and returns an EstargzToc. A listing then takes two
+small requests instead of streaming the layer, and a carve reads only
+the target's own gzip members. The probe is only worth a request for
+layers whose descriptor carries the TOC-digest annotation (has_toc());
+an annotated layer without a readable footer costs TOC_PROBE_BYTES and
+is read the usual way.
+"""
+
+import json
+import re
+import zlib
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, Optional
+
+import requests
+
+from app.modules.auth import RegistryAuth
+from app.modules.finders.tar_parser import TarEntry, parse_tar_header
+from app.modules.finders.tar_entry import CompactTarEntry
+from app.modules.finders.inflate import get_inflate_backend
+from app.modules.formatters.formatters import _tarinfo_mode_to_string, _format_mtime
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+TOC_PROBE_BYTES = 4096          # Blob tail fetched to look for a footer (and a small TOC)
+FOOTER_SIZE = 51                # eStargz footer ("SG" Extra subfield)
+LEGACY_FOOTER_SIZE = 47         # Original stargz footer (bare Extra field)
+TOC_NAME = "stargz.index.json"
+TOC_DIGEST_ANNOTATION = "containerd.io/snapshot/stargz/toc.digest"
+
+# TOC entry type -> tar typeflag
+TOC_TYPEFLAGS = {
+    "reg": "0",
+    "hardlink": "1",
+    "symlink": "2",
+    "char": "3",
+    "block": "4",
+    "dir": "5",
+    "fifo": "6",
+}
+
+_FOOTER_PAYLOAD = re.compile(rb"^([0-9a-f]{16})STARGZ$")
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+# =============================================================================
+# Footer and TOC Parsing
+# =============================================================================
+
+def has_toc(descriptor: dict) -> bool:
+    """True if a manifest layer descriptor is annotated as eStargz (has a TOC digest)."""
+    return bool((descriptor.get("annotations") or {}).get(TOC_DIGEST_ANNOTATION))
+
+
+def parse_footer(tail: bytes) -> Optional[tuple[int, int]]:
+    """
+    Find an eStargz (or legacy stargz) footer at the end of tail.
+    
+    Returns:
+        (TOC compressed offset, footer size), or None if tail does not
+        end in a footer
+    """
+    for size in (FOOTER_SIZE, LEGACY_FOOTER_SIZE):
+        footer = tail[-size:]
+        # gzip magic, deflate, FLG.FEXTRA
+        if len(footer) < size or footer[:4] != b"\x1f\x8b\x08\x04":
+            continue
+        xlen = int.from_bytes(footer[10:12], "little")
+        extra = footer[12:12 + xlen]
+        if extra[:2] == b"SG":
+            extra = extra[4:4 + int.from_bytes(extra[2:4], "little")]
+        match = _FOOTER_PAYLOAD.match(extra)
+        if match:
+            return int(match.group(1), 16), size
+    return None
+
+
+def parse_toc_member(data: bytes) -> Optional[dict]:
+    """
+    Inflate the TOC gzip member and decode the JSON in its tar entry.
+    
+    Returns:
+        The TOC dict, or None if data does not hold a readable TOC
+    """
+    try:
+        raw = get_inflate_backend().decompressobj().decompress(data)
+    except zlib.error:
+        return None
+    entry, _ = parse_tar_header(raw, 0)
+    if entry is None or entry.name != TOC_NAME or len(raw) < 512 + entry.size:
+        return None
+    try:
+        toc = json.loads(raw[512:512 + entry.size])
+    except ValueError:
+        return None
+    return toc if isinstance(toc.get("entries"), list) else None
+
+
+def _normalize_path(path: str) -> str:
+    """Normalize an entry path for comparison (remove leading ./ or /)."""
+    path = path.strip()
+    if path.startswith("./"):
+        path = path[2:]
+    return path.lstrip("/")
+
+
+def _toc_timestamp(modtime: str) -> int:
+    """Unix time of a TOC modtime (RFC 3339), 0 if missing or unreadable."""
+    if not modtime:
+        return 0
+    try:
+        return int(datetime.fromisoformat(modtime.replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        return 0
+
+
+@dataclass
+class FileChunk:
+    """One piece of a regular file's content in an eStargz layer."""
+    offset: int         # Blob offset of the gzip member holding the piece
+    end: int            # Blob offset where the next member with content starts
+    inner_offset: int   # Bytes to skip in the inflated member before the piece
+    size: int           # Piece size (decompressed)
+
+
+@dataclass
+class EstargzToc:
+    """A parsed eStargz TOC and where it came from."""
+    toc_offset: int
+    total_size: int
+    entries: list[dict]
+    member_offsets: list[int]   # Sorted blob offsets of gzip members holding content
+    
+    def _records(self) -> Iterator[tuple]:
+        """(name, size, typeflag, is_dir, mode bits, uid, gid, mtime, linkname) per listed entry."""
+        for toc_entry in self.entries:
+            typeflag = TOC_TYPEFLAGS.get(toc_entry.get("type"))
+            if typeflag is None:
+                continue  # "chunk" continuation records
+            name = toc_entry.get("name", "")
+            is_dir = typeflag == "5"
+            yield (
+                name + "/" if is_dir and not name.endswith("/") else name,
+                toc_entry.get("size", 0),
+                typeflag,
+                is_dir,
+                toc_entry.get("mode", 0),
+                toc_entry.get("uid", 0),
+                toc_entry.get("gid", 0),
+                _toc_timestamp(toc_entry.get("modtime", "")),
+                toc_entry.get("linkName", ""),
+            )
+    
+    def tar_entries(self) -> list[TarEntry]:
+        """The layer's entries as TarEntry, in TOC order (chunk records folded in)."""
+        return [
+            TarEntry(
+                name=name,
+                size=size,
+                typeflag=typeflag,
+                is_dir=is_dir,
+                mode=_tarinfo_mode_to_string(mode, typeflag),
+                uid=uid,
+                gid=gid,
+                mtime=_format_mtime(mtime),
+                linkname=linkname,
+                is_symlink=typeflag == "2",
+            )
+            for name, size, typeflag, is_dir, mode, uid, gid, mtime, linkname in self._records()
+        ]
+    
+    def compact_entries(self) -> list[CompactTarEntry]:
+        """
+        The layer's entries as CompactTarEntry (for columnar listings).
+        
+        Their mode strings use tar_parser's type characters, as a listing
+        of the tar stream would show them.
+        """
+        return [CompactTarEntry(*record) for record in self._records()]
+    
+    def file_chunks(self, path: str) -> Optional[list[FileChunk]]:
+        """
+        Where a regular file's content lies in the blob.
+        
+        Returns:
+            FileChunks in content order (empty for an empty file), or None
+            if path is not a regular file in the TOC
+        """
+        target = _normalize_path(path)
+        chunks = None
+        size = 0
+        for toc_entry in self.entries:
+            if _normalize_path(toc_entry.get("name", "")) != target:
+                continue
+            kind = toc_entry.get("type")
+            if kind == "reg":
+                chunks, size = [], toc_entry.get("size", 0)
+            elif kind != "chunk" or chunks is None:
+                continue
+            if not size:
+                continue
+            offset = toc_entry.get("offset", 0)
+            chunk_offset = toc_entry.get("chunkOffset", 0)
+            chunk_size = toc_entry.get("chunkSize") or size - chunk_offset
+            chunks.append(FileChunk(
+                offset=offset,
+                end=self._next_offset(offset),
+                inner_offset=toc_entry.get("innerOffset", 0),
+                size=chunk_size,
+            ))
+        return chunks
+    
+    def _next_offset(self, offset: int) -> int:
+        """Where the member at offset ends: the next content member, or the TOC."""
+        i = bisect_right(self.member_offsets, offset)
+        return self.member_offsets[i] if i < len(self.member_offsets) else self.toc_offset
+
+
+# =============================================================================
+# Fetching
+# =============================================================================
+
+def _get_range(auth: RegistryAuth, url: str, byte_range: str) -> tuple[bytes, int]:
+    """
+    Fetch one Range of a blob.
+    
+    Returns:
+        (data, total blob size)
+    
+    Raises:
+        requests.RequestException: request failed, or the registry
+        ignored the Range (nothing is read from a full-blob answer)
+    """
+    resp = auth.request_blob(url, headers={"Range": f"bytes={byte_range}"}, stream=True, timeout=30)
+    try:
+        resp.raise_for_status()
+        match = _CONTENT_RANGE.match(resp.headers.get("Content-Range", ""))
+        if resp.status_code != 206 or not match:
+            raise requests.RequestException(f"Range {byte_range} not honored")
+        return resp.content, int(match.group(3))
+    finally:
+        resp.close()
+
+
+def read_toc(auth: RegistryAuth, url: str) -> tuple[Optional[EstargzToc], int]:
+    """
+    Fetch and parse an eStargz layer's TOC.
+    
+    Args:
+        auth: RegistryAuth for the layer's repository
+        url: Registry blob URL (.../v2/<ns>/<repo>/blobs/<digest>)
+    
+    Returns:
+        (EstargzToc, bytes downloaded). The TOC is None if the layer is
+        not eStargz (or its tail could not be read; callers then stream
+        the layer as usual), and the probe's bytes are counted either way
+    """
+    downloaded = 0
+    try:
+        tail, total_size = _get_range(auth, url, f"-{TOC_PROBE_BYTES}")
+        downloaded = len(tail)
+        footer = parse_footer(tail)
+        if footer is None or footer[0] >= total_size:
+            return None, downloaded
+        
+        # The TOC member ends where the footer begins
+        toc_offset, footer_size = footer
+        toc_end = total_size - footer_size
+        tail_start = total_size - len(tail)
+        if toc_offset >= tail_start:
+            member = tail[toc_offset - tail_start:toc_end - tail_start]
+        else:
+            member, _ = _get_range(auth, url, f"{toc_offset}-{toc_end - 1}")
+            downloaded += len(member)
+    except requests.RequestException:
+        return None, downloaded
+    
+    toc = parse_toc_member(member)
+    if toc is None:
+        return None, downloaded
+    entries = toc["entries"]
+    return EstargzToc(
+        toc_offset=toc_offset,
+        total_size=total_size,
+        entries=entries,
+        member_offsets=sorted({e["offset"] for e in entries if e.get("offset")}),
+    ), downloaded
+
+
+def read_file(auth: RegistryAuth, url: str, toc: EstargzToc, path: str) -> Optional[tuple[bytes, int]]:
+    """
+    Fetch one regular file's content using the TOC's chunk offsets.
+    
+    Only the file's own gzip members are requested.
+    
+    Returns:
+        (content, compressed bytes downloaded), or None if path is not a
+        regular file in the TOC or its members could not be read
+    
+    Raises:
+        zlib.error: a member is corrupt
+    """
+    chunks = toc.file_chunks(path)
+    if chunks is None:
+        return None
+    
+    content = bytearray()
+    downloaded = 0
+    try:
+        for chunk in chunks:
+            data, _ = _get_range(auth, url, f"{chunk.offset}-{chunk.end - 1}")
+            downloaded += len(data)
+            content += _inflate_members(data, chunk.inner_offset + chunk.size)[chunk.inner_offset:]
+    except requests.RequestException:
+        return None
+    return bytes(content), downloaded
+
+
+def _inflate_members(data: bytes, needed: int) -> bytes:
+    """Inflate consecutive gzip members until needed bytes are out (or data ends)."""
+    output = bytearray()
+    while data and len(output) < needed:
+        member = get_inflate_backend().decompressobj()
+        output += member.decompress(data)
+        data = member.unused_data
+    return bytes(output)
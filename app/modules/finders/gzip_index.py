@@ -0,0 +1,387 @@
+"""
+Seekable gzip: zran-style inflate checkpoints.
+
+A deflate stream normally has to be inflated from its first byte. zlib
+can resume at any block boundary, though, given the 32KB of output that
+preceded it and the bit position the block starts at (see zlib's
+examples/zran.c). While a peek inflates a layer anyway, GzipIndexBuilder
+records such a checkpoint every `span` bytes of output. A carve can then
+open its Range request at the checkpoint before its target and inflate
+only from there.
+
+Python's zlib module exposes neither block boundaries (Z_BLOCK) nor
+inflatePrime(), so this module drives libz itself through ctypes. Where
+libz cannot be loaded (e.g. CPython on Windows links zlib statically),
+index_supported() is False and callers fall back to inflating from the
+start.
+"""
+
+import ctypes
+import ctypes.util
+import zlib
+from dataclasses import dataclass
+from typing import Generator, Optional
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+DEFAULT_CHECKPOINT_SPAN = 4 * 1024 * 1024   # Output bytes between checkpoints
+WINDOW_SIZE = 32768                         # Deflate history a checkpoint carries
+OUTPUT_BUFFER = 256 * 1024                  # Largest piece one inflate call returns
+GZIP_MAGIC = b"\x1f\x8b"
+GZIP_TRAILER = 8                            # CRC32 + ISIZE after each member's deflate data
+
+Z_OK = 0
+Z_STREAM_END = 1
+Z_BUF_ERROR = -5
+Z_NO_FLUSH = 0
+Z_BLOCK = 5
+
+
+# =============================================================================
+# libz Binding
+# =============================================================================
+
+class _ZStream(ctypes.Structure):
+    """zlib's z_stream."""
+    _fields_ = [
+        ("next_in", ctypes.c_void_p),
+        ("avail_in", ctypes.c_uint),
+        ("total_in", ctypes.c_ulong),
+        ("next_out", ctypes.c_void_p),
+        ("avail_out", ctypes.c_uint),
+        ("total_out", ctypes.c_ulong),
+        ("msg", ctypes.c_char_p),
+        ("state", ctypes.c_void_p),
+        ("zalloc", ctypes.c_void_p),
+        ("zfree", ctypes.c_void_p),
+        ("opaque", ctypes.c_void_p),
+        ("data_type", ctypes.c_int),
+        ("adler", ctypes.c_ulong),
+        ("reserved", ctypes.c_ulong),
+    ]
+
+
+def _load_libz():
+    """Load libz and declare the functions used here, or None if unavailable."""
+    name = ctypes.util.find_library("z")
+    if not name:
+        return None
+    try:
+        lib = ctypes.CDLL(name)
+    except OSError:
+        return None
+
+    stream = ctypes.POINTER(_ZStream)
+    lib.zlibVersion.restype = ctypes.c_char_p
+    lib.zlibVersion.argtypes = []
+    lib.inflateInit2_.restype = ctypes.c_int
+    lib.inflateInit2_.argtypes = [stream, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+    lib.inflate.restype = ctypes.c_int
+    lib.inflate.argtypes = [stream, ctypes.c_int]
+    lib.inflateEnd.restype = ctypes.c_int
+    lib.inflateEnd.argtypes = [stream]
+    lib.inflateReset.restype = ctypes.c_int
+    lib.inflateReset.argtypes = [stream]
+    lib.inflatePrime.restype = ctypes.c_int
+    lib.inflatePrime.argtypes = [stream, ctypes.c_int, ctypes.c_int]
+    lib.inflateSetDictionary.restype = ctypes.c_int
+    lib.inflateSetDictionary.argtypes = [stream, ctypes.c_char_p, ctypes.c_uint]
+    return lib
+
+
+_libz = _load_libz()
+
+
+def index_supported() -> bool:
+    """True if checkpoints can be recorded and resumed on this platform."""
+    return _libz is not None
+
+
+def starts_member(data: bytes) -> bool:
+    """True if data could begin another gzip member (multi-member streams,
+    e.g. eStargz); anything else after a member is trailing junk."""
+    return bool(data) and GZIP_MAGIC.startswith(data[:2])
+
+
+class _InflateStream:
+    """One libz inflate stream and the buffers it points into."""
+
+    def __init__(self, wbits: int):
+        self.strm = _ZStream()
+        rc = _libz.inflateInit2_(
+            ctypes.byref(self.strm), wbits, _libz.zlibVersion(), ctypes.sizeof(_ZStream),
+        )
+        if rc != Z_OK:
+            raise zlib.error(f"inflateInit2 failed ({rc})")
+        self._input = None  # Keeps next_in's buffer alive
+        self._output = ctypes.create_string_buffer(OUTPUT_BUFFER)
+
+    def __del__(self):
+        if _libz is not None and self.strm.state:
+            _libz.inflateEnd(ctypes.byref(self.strm))
+
+    def reset(self):
+        """Start on a new stream; pending input is kept, counters restart."""
+        _libz.inflateReset(ctypes.byref(self.strm))
+
+    def set_input(self, data: bytes):
+        self._input = (ctypes.c_char * len(data)).from_buffer_copy(data) if data else None
+        self.strm.next_in = ctypes.addressof(self._input) if data else None
+        self.strm.avail_in = len(data)
+
+    def remaining_input(self) -> bytes:
+        if not self.strm.avail_in:
+            return b""
+        return ctypes.string_at(self.strm.next_in, self.strm.avail_in)
+
+    def step(self, room: int, flush: int) -> tuple[int, bytes]:
+        """Run inflate() with up to room bytes of output space."""
+        self.strm.next_out = ctypes.addressof(self._output)
+        self.strm.avail_out = room
+        rc = _libz.inflate(ctypes.byref(self.strm), flush)
+        produced = room - self.strm.avail_out
+        return rc, ctypes.string_at(self._output, produced) if produced else b""
+
+    def message(self, rc: int) -> str:
+        return self.strm.msg.decode(errors="replace") if self.strm.msg else f"inflate error {rc}"
+
+
+# =============================================================================
+# Checkpoints
+# =============================================================================
+
+@dataclass
+class GzipCheckpoint:
+    """A point a gzip layer can be inflated from without its prefix."""
+    out_offset: int     # Decompressed stream offset inflation resumes at
+    in_offset: int      # Blob offset of the first whole byte of the block
+    bits: int           # Bits of the block that sit in the byte before in_offset
+    window: bytes       # Up to 32KB of output preceding out_offset
+
+    @property
+    def read_from(self) -> int:
+        """Blob offset to start reading at (one byte early if the block starts mid-byte)."""
+        return self.in_offset - 1 if self.bits else self.in_offset
+
+
+class GzipIndexBuilder:
+    """
+    Inflates a gzip stream from its start, recording a checkpoint at the
+    first deflate block boundary after every span bytes of output.
+    Multi-member streams are followed from one member to the next.
+
+    Same streaming interface as IncrementalGzipDecompressor.inflate().
+    from_checkpoint() starts one mid-stream, to go on indexing from a
+    seek point recorded earlier. With keep, only the newest keep
+    checkpoints are held (enough to resume from, not an index).
+
+    Usage:
+        builder = GzipIndexBuilder(span=4 << 20)
+        for piece in builder.inflate(compressed_chunk):
+            # walk piece...
+        checkpoints = builder.checkpoints
+    """
+
+    def __init__(self, span: int = DEFAULT_CHECKPOINT_SPAN, keep: int = 0):
+        self.span = max(span, WINDOW_SIZE)
+        self.keep = keep    # Newest checkpoints held (0 = all)
+        self.checkpoints: list[GzipCheckpoint] = []
+        self.bytes_decompressed = 0
+        self.error: Optional[str] = None
+        self.eof = False
+        self._stream = _InflateStream(16 + zlib.MAX_WBITS)
+        self._window = bytearray()
+        self._last = 0  # out_offset of the last checkpoint
+        self._member_ended = False
+        self._in_base = 0   # Stream offsets the current member starts at
+        self._out_base = 0
+        self._resume: Optional[GzipCheckpoint] = None  # Checkpoint to prime the raw stream with
+        self._raw = False   # Inflating a member's deflate data without its gzip framing
+        self._trailer = 0   # Member trailer bytes still to drop (raw stream only)
+    
+    @classmethod
+    def from_checkpoint(
+        cls,
+        checkpoint: GzipCheckpoint,
+        span: int = DEFAULT_CHECKPOINT_SPAN,
+        keep: int = 0,
+    ) -> "GzipIndexBuilder":
+        """
+        Go on inflating and indexing a stream from a checkpoint.
+        
+        The compressed data fed must start at checkpoint.read_from.
+        Offsets (and new checkpoints) stay those of the whole stream.
+        """
+        builder = cls(span, keep)
+        builder._stream = _InflateStream(-zlib.MAX_WBITS)
+        builder._resume = checkpoint
+        builder._raw = True
+        builder._in_base = checkpoint.in_offset
+        builder._out_base = checkpoint.out_offset
+        builder._last = checkpoint.out_offset
+        builder._window = bytearray(checkpoint.window)
+        return builder
+
+    def inflate(self, compressed_data: bytes) -> Generator[bytes, None, None]:
+        """Feed compressed data and yield its output in pieces, recording checkpoints."""
+        if self.eof or self.error:
+            return
+        if self._resume is not None:
+            if not compressed_data:
+                return
+            compressed_data = self._prime(compressed_data)
+        if self._member_ended:
+            compressed_data = self._drop_trailer(compressed_data)
+            if not compressed_data:
+                return
+            if not starts_member(compressed_data):
+                self.eof = True
+                return
+            self._next_member()
+        stream = self._stream
+        stream.set_input(compressed_data)
+        while True:
+            rc, piece = stream.step(OUTPUT_BUFFER, Z_BLOCK)
+            if rc not in (Z_OK, Z_STREAM_END, Z_BUF_ERROR):
+                self.error = stream.message(rc)
+                return
+            if piece:
+                self.bytes_decompressed += len(piece)
+                self._window += piece[-WINDOW_SIZE:]
+                del self._window[:-WINDOW_SIZE]
+                yield piece
+            if rc == Z_STREAM_END:
+                self._member_ended = True
+                self._trailer = GZIP_TRAILER if self._raw else 0
+                rest = self._drop_trailer(stream.remaining_input())
+                if not rest:
+                    return  # The next member, if any, comes with the next data
+                if not starts_member(rest):
+                    self.eof = True
+                    return
+                self._next_member()
+                stream = self._stream
+                stream.set_input(rest)
+                continue
+
+            # Stopped at a block boundary (not inside the final block)?
+            data_type = stream.strm.data_type
+            out_offset = self._out_base + stream.strm.total_out
+            if data_type & 128 and not data_type & 64 and out_offset - self._last >= self.span:
+                self.checkpoints.append(GzipCheckpoint(
+                    out_offset=out_offset,
+                    in_offset=self._in_base + stream.strm.total_in,
+                    bits=data_type & 7,
+                    window=bytes(self._window),
+                ))
+                self._last = out_offset
+                if self.keep:
+                    del self.checkpoints[:-self.keep]
+
+            if rc == Z_BUF_ERROR or (not stream.strm.avail_in and stream.strm.avail_out):
+                return  # Needs more input
+
+    def _next_member(self):
+        """Carry the stream offsets over and start inflating the next member."""
+        self._in_base += self._stream.strm.total_in
+        self._out_base += self._stream.strm.total_out
+        if self._raw:
+            # The raw stream left the trailer unread; members after it are framed
+            self._in_base += GZIP_TRAILER
+            self._stream = _InflateStream(16 + zlib.MAX_WBITS)
+            self._raw = False
+        else:
+            self._stream.reset()
+        self._member_ended = False
+    
+    def _prime(self, data: bytes) -> bytes:
+        """Load the checkpoint's partial first byte and window; returns the rest of data."""
+        checkpoint, self._resume = self._resume, None
+        strm = ctypes.byref(self._stream.strm)
+        if checkpoint.bits:
+            _libz.inflatePrime(strm, checkpoint.bits, data[0] >> (8 - checkpoint.bits))
+            data = data[1:]
+        if checkpoint.window:
+            _libz.inflateSetDictionary(strm, checkpoint.window, len(checkpoint.window))
+        return data
+    
+    def _drop_trailer(self, data: bytes) -> bytes:
+        """Skip what is left of a member trailer the raw stream did not read."""
+        drop = min(self._trailer, len(data))
+        self._trailer -= drop
+        return data[drop:]
+
+
+class CheckpointInflater:
+    """
+    Raw inflate resuming at a GzipCheckpoint, shaped like zlib's
+    decompressobj() so IncrementalGzipDecompressor can drive it.
+
+    The first data fed must start at checkpoint.read_from. When the
+    member's deflate data ends its trailer is dropped, so unused_data
+    starts at the next member (if any).
+    """
+
+    def __init__(self, checkpoint: GzipCheckpoint):
+        self._stream = _InflateStream(-zlib.MAX_WBITS)
+        self._checkpoint = checkpoint
+        self._primed = False
+        self._trailer = GZIP_TRAILER  # Trailer bytes still to drop once inflate ends
+        self.unconsumed_tail = b""
+        self.unused_data = b""
+        self.eof = False
+
+    def _prime(self, data: bytes) -> bytes:
+        """Load the partial first byte and the window; returns the rest of data."""
+        checkpoint = self._checkpoint
+        strm = ctypes.byref(self._stream.strm)
+        if checkpoint.bits:
+            _libz.inflatePrime(strm, checkpoint.bits, data[0] >> (8 - checkpoint.bits))
+            data = data[1:]
+        if checkpoint.window:
+            _libz.inflateSetDictionary(strm, checkpoint.window, len(checkpoint.window))
+        self._primed = True
+        return data
+
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        """
+        Inflate data; like zlib.Decompress.decompress().
+
+        Raises:
+            zlib.error: the stream is corrupt (or the checkpoint does not
+            match this blob)
+        """
+        if self.eof:
+            self._keep_unused(data)
+            return b""
+        if not self._primed:
+            if not data:
+                return b""
+            data = self._prime(data)
+
+        stream = self._stream
+        stream.set_input(data)
+        output = bytearray()
+        while not max_length or len(output) < max_length:
+            room = OUTPUT_BUFFER if not max_length else min(OUTPUT_BUFFER, max_length - len(output))
+            rc, piece = stream.step(room, Z_NO_FLUSH)
+            output += piece
+            if rc == Z_STREAM_END:
+                self.eof = True
+                self._keep_unused(stream.remaining_input())
+                break
+            if rc not in (Z_OK, Z_BUF_ERROR):
+                raise zlib.error(stream.message(rc))
+            if rc == Z_BUF_ERROR or (not stream.strm.avail_in and stream.strm.avail_out):
+                break
+        self.unconsumed_tail = b"" if self.eof else stream.remaining_input()
+        return bytes(output)
+
+    def _keep_unused(self, data: bytes):
+        """Add input past the end to unused_data, less the member trailer."""
+        drop = min(self._trailer, len(data))
+        self._trailer -= drop
+        self.unused_data += data[drop:]
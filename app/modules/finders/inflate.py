@@ -0,0 +1,245 @@
+"""
+Pluggable inflate backends.
+
+Once blobs arrive quickly (a local mirror, the blob cache), inflating
+gzip is most of a peek's CPU time. The streaming decompressors get their
+decompressobj() from the process-wide backend here rather than from
+zlib directly, so a faster implementation can stand in:
+
+    isal      python-isal (Intel ISA-L), pip install isal
+    zlib-ng   python-zlib-ng, pip install zlib-ng
+    zlib      the standard library (always available)
+
+All three share zlib's decompressobj() interface. The fastest installed
+one is picked at import; configure_inflate_backend() (or the CLI's
+--inflate) overrides it. Errors from any backend surface as zlib.error.
+
+The libz-based seek index (gzip_index) needs inflate primitives these
+bindings do not expose, so indexed peeks and checkpoint carves keep
+using libz.
+
+Benchmark the installed backends on synthetic gzip layers with:
+
+    python -m app.modules.finders.inflate [--size MB] [--repeat N]
+"""
+
+import argparse
+import importlib
+import io
+import random
+import tarfile
+import time
+import zlib
+from typing import Optional
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+# Backend name -> module providing zlib's decompressobj() API
+INFLATE_BACKENDS = {
+    "isal": "isal.isal_zlib",
+    "zlib-ng": "zlib_ng.zlib_ng",
+    "zlib": "zlib",
+}
+DEFAULT_INFLATE_PREFERENCE = ("isal", "zlib-ng", "zlib")   # Tried in order by "auto"
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+BENCHMARK_LAYER_MB = 64         # Decompressed size of each synthetic layer
+BENCHMARK_CHUNK = 64 * 1024     # Compressed bytes fed per call, like a blob reader
+BENCHMARK_STEP = 1024 * 1024    # max_length per call, like IncrementalGzipDecompressor.inflate()
+
+
+# =============================================================================
+# Backends
+# =============================================================================
+
+class _ErrorTranslator:
+    """Wraps a backend's decompress object so its errors raise as zlib.error."""
+    
+    def __init__(self, inner, error: type):
+        self._inner = inner
+        self._error = error
+    
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        try:
+            return self._inner.decompress(data, max_length)
+        except self._error as e:
+            raise zlib.error(str(e)) from e
+    
+    @property
+    def eof(self) -> bool:
+        return self._inner.eof
+    
+    @property
+    def unused_data(self) -> bytes:
+        return self._inner.unused_data
+    
+    @property
+    def unconsumed_tail(self) -> bytes:
+        return self._inner.unconsumed_tail
+
+
+class InflateBackend:
+    """One inflate implementation, by name."""
+    
+    def __init__(self, name: str, module):
+        self.name = name
+        self._module = module
+    
+    def decompressobj(self, wbits: int = GZIP_WBITS):
+        """A new decompress object (gzip framing by default), like zlib.decompressobj()."""
+        obj = self._module.decompressobj(wbits)
+        if self._module.error is zlib.error:
+            return obj
+        return _ErrorTranslator(obj, self._module.error)
+
+
+def load_inflate_backend(name: str) -> InflateBackend:
+    """
+    Import a backend by name.
+    
+    Raises:
+        ValueError: unknown backend name
+        ImportError: the backend's package is not installed
+    """
+    if name not in INFLATE_BACKENDS:
+        raise ValueError(f"Unknown inflate backend {name!r} (choose from {', '.join(INFLATE_BACKENDS)})")
+    return InflateBackend(name, importlib.import_module(INFLATE_BACKENDS[name]))
+
+
+def available_inflate_backends() -> list[str]:
+    """Names of the backends that can be loaded here, fastest first."""
+    names = []
+    for name in DEFAULT_INFLATE_PREFERENCE:
+        try:
+            load_inflate_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def _auto_backend() -> InflateBackend:
+    return load_inflate_backend(available_inflate_backends()[0])
+
+
+_inflate_backend = _auto_backend()
+
+
+def get_inflate_backend() -> InflateBackend:
+    """Return the process-wide inflate backend."""
+    return _inflate_backend
+
+
+def configure_inflate_backend(name: str = "auto") -> InflateBackend:
+    """
+    Replace the process-wide inflate backend ("auto" = fastest installed).
+    
+    Raises:
+        ValueError / ImportError: as load_inflate_backend()
+    """
+    global _inflate_backend
+    _inflate_backend = _auto_backend() if name == "auto" else load_inflate_backend(name)
+    return _inflate_backend
+
+
+# =============================================================================
+# Micro-benchmark
+# =============================================================================
+
+def synthetic_layers(size_mb: int = BENCHMARK_LAYER_MB, seed: int = 0) -> dict[str, bytes]:
+    """
+    Build gzip layers that inflate to about size_mb each: text-like files
+    (typical of package trees), incompressible binaries, and sparse files
+    of zeros. The same seed gives the same layers.
+    """
+    rng = random.Random(seed)
+    words = [bytes(rng.choices(b"abcdefghijklmnopqrstuvwxyz_/.", k=rng.randint(2, 12))) for _ in range(4000)]
+    makers = {
+        "text": lambda n: b" ".join(rng.choices(words, k=n // 7))[:n],
+        "binary": lambda n: rng.randbytes(n),
+        "sparse": lambda n: bytes(n),
+    }
+    layers = {}
+    for kind, make in makers.items():
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tf:
+            written, i = 0, 0
+            while written < size_mb * 1024 * 1024:
+                data = make(rng.randint(1024, 256 * 1024))
+                info = tarfile.TarInfo(f"{kind}/{i}")
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+                written += len(data)
+                i += 1
+        compressor = zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS)
+        layers[kind] = compressor.compress(buf.getvalue()) + compressor.flush()
+    return layers
+
+
+def _inflate_all(backend: InflateBackend, blob: bytes) -> int:
+    """Inflate blob the way a streaming peek does; returns output size."""
+    decompressor = backend.decompressobj()
+    total = 0
+    for pos in range(0, len(blob), BENCHMARK_CHUNK):
+        data = blob[pos:pos + BENCHMARK_CHUNK]
+        while True:
+            out = decompressor.decompress(data, BENCHMARK_STEP)
+            total += len(out)
+            data = decompressor.unconsumed_tail
+            if not data and len(out) < BENCHMARK_STEP:
+                break
+    return total
+
+
+def benchmark_inflate_backends(
+    size_mb: int = BENCHMARK_LAYER_MB,
+    repeat: int = 3,
+    backends: Optional[list[str]] = None,
+) -> list[dict]:
+    """
+    Time each backend on the same synthetic layers.
+    
+    Returns:
+        One dict per (backend, layer): backend, layer, compressed and
+        decompressed bytes, and mb_per_s (decompressed output, best of
+        repeat runs)
+    """
+    layers = synthetic_layers(size_mb)
+    results = []
+    for name in backends or available_inflate_backends():
+        backend = load_inflate_backend(name)
+        for kind, blob in layers.items():
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                size = _inflate_all(backend, blob)
+                best = min(best, time.perf_counter() - start)
+            results.append({
+                "backend": name,
+                "layer": kind,
+                "compressed": len(blob),
+                "decompressed": size,
+                "mb_per_s": size / best / 1e6,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the installed inflate backends.")
+    parser.add_argument("--size", type=int, default=BENCHMARK_LAYER_MB,
+                        help=f"Decompressed MB per synthetic layer (default: {BENCHMARK_LAYER_MB})")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per backend, best kept (default: 3)")
+    args = parser.parse_args()
+    
+    print(f"Backends: {', '.join(available_inflate_backends())} (auto: {get_inflate_backend().name})")
+    print(f"{'backend':<10} {'layer':<8} {'compressed':>12} {'ratio':>6} {'MB/s':>9}")
+    for row in benchmark_inflate_backends(args.size, args.repeat):
+        ratio = row["decompressed"] / row["compressed"]
+        print(f"{row['backend']:<10} {row['layer']:<8} {row['compressed']:>12,} {ratio:>6.1f} {row['mb_per_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,25 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
-from app.modules.finders.tar_parser import TarEntry
+from app.modules.finders.entry_columns import Entries, entry_dicts
+from app.modules.finders.gzip_index import GzipCheckpoint
 
 # =============================================================================
 # Data Classes for Streaming Peek Results
 # =============================================================================
 
+@dataclass
+class PeekContinuation:
+    """Where a partial peek can be picked up again (see peekers.continue_peek())."""
+    digest: str
+    compression: str                # "gzip", "zstd" or "none"
+    checkpoint: GzipCheckpoint      # Inflate state to resume from; out_offset is the tar stream offset
+    pending_header: bytes = b""     # Start of a header the resume point falls in
+    body_remaining: int = 0         # Body bytes (with padding) from the resume point to the next header
+    entries_before: int = 0         # Entries whose headers lie wholly before the resume point
+    entries: Optional[Entries] = None   # The listing those entries start (it may run on past them)
+    header_offsets: list[int] = field(default_factory=list)  # Header offset of each of those entries
+
+
 @dataclass
 class LayerPeekResult:
     """Result of peeking into a layer blob."""
@@ -14,8 +28,16 @@ class LayerPeekResult:
     bytes_downloaded: int
     bytes_decompressed: int
     entries_found: int
-    entries: list[TarEntry]
+    entries: Entries            # A list, or EntryColumns for a columnar peek
     error: Optional[str] = None
+    bytes_from_cache: int = 0   # Blob bytes served from the local blob cache
+    chunk_schedule: list[list[int]] = field(default_factory=list)  # [[chunk size, count], ...]
+    truncated: bool = False     # Blob reads failed before the listing was complete
+    header_offsets: list[int] = field(default_factory=list)  # Decompressed offset of each entry's header
+    checkpoints: list[GzipCheckpoint] = field(default_factory=list)  # Seek points, if an index was recorded
+    from_toc: bool = False      # Listed from an eStargz table of contents, not the tar stream
+    from_index: bool = False    # Loaded from a listing already in the database, nothing fetched
+    continuation: Optional[PeekContinuation] = None  # Set if a partial peek can be resumed
     
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization."""
@@ -25,6 +47,12 @@ class LayerPeekResult:
             "bytes_downloaded": self.bytes_downloaded,
             "bytes_decompressed": self.bytes_decompressed,
             "entries_found": self.entries_found,
-            "entries": [e.to_dict() for e in self.entries],
+            "entries": entry_dicts(self.entries),
             "error": self.error,
+            "bytes_from_cache": self.bytes_from_cache,
+            "chunk_schedule": self.chunk_schedule,
+            "truncated": self.truncated,
+            "from_toc": self.from_toc,
+            "from_index": self.from_index,
+            "resumable": self.continuation is not None,
         }
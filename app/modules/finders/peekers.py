@@ -1,13 +1,34 @@
 import io
 import tarfile
+import threading
 import zlib
 import requests
-from typing import Optional, List, Generator
+import urllib3
+from array import array
+from bisect import bisect_left
+from typing import Optional, Generator
 
 from app.modules.formatters import parse_image_ref, registry_base_url, human_readable_size
-from app.modules.finders.tar_parser import TarEntry, parse_tar_header
+from app.modules.finders.tar_entry import AnyTarEntry
+from app.modules.finders.entry_columns import Entries, EntryColumns
+from app.modules.finders.tar_walker import TAR_BLOCK, TarHeaderWalker, is_tar_header
+from app.modules.finders.gzip_index import (
+    GzipCheckpoint,
+    GzipIndexBuilder,
+    CheckpointInflater,
+    GZIP_MAGIC,
+    index_supported,
+    starts_member,
+)
+from app.modules.finders.zstd_stream import ZSTD_MAGIC, ZstdFrameDecompressor, zstd_available
+from app.modules.finders.estargz import read_toc
+from app.modules.finders.inflate import get_inflate_backend
 from app.modules.auth import RegistryAuth
-from app.modules.finders.layerPeekResult import LayerPeekResult
+from app.modules.auth.retry import RetryBudget, is_retryable, retry_after_seconds
+from app.modules.finders.layerPeekResult import LayerPeekResult, PeekContinuation
+from app.modules.finders.blob_cache import BlobCache, get_blob_cache
+from app.modules.finders.prefetch import PrefetchingBlobReader, DEFAULT_READAHEAD_BYTES
+from app.modules.finders.chunk_schedule import ChunkSchedule, ADAPTIVE_MAX_CHUNK
 from app.modules.formatters.formatters import _tarinfo_mode_to_string, _format_mtime
 
 
@@ -15,25 +36,68 @@ from app.modules.formatters.formatters import _tarinfo_mode_to_string, _format_m
 # Incremental Streaming Components
 # =============================================================================
 
+INFLATE_STEP = 1024 * 1024      # Largest piece inflate() yields
+HOP_READ = TAR_BLOCK            # Uncompressed tar: read past the next header after a jump (just it)
+HOP_MAX_READ = 32 * 1024        # Uncompressed tar: most read past it while bodies stay short
+HOP_MAX_GAP = 4 * 1024          # Uncompressed tar: longest body read through rather than jumped
+RESUME_SPAN = 128 * 1024        # Resumable peeks: decompressed bytes between resume points
+RESUME_KEEP = 2                 # Resumable peeks: newest resume points held (only one is stored)
+
+
 class IncrementalGzipDecompressor:
     """
     Decompresses gzip data incrementally, maintaining state across chunk feeds.
     
+    Only the unconsumed tail of the decompressed stream is kept. Offsets
+    are positions in the whole decompressed stream: the buffer holds
+    [window_start, end_offset), and callers release what they are done
+    with via consume(). Consuming past end_offset (e.g. skipping file
+    content that has not been inflated yet) drops that data on arrival,
+    so memory stays around one inflated chunk plus the headers in flight.
+    
+    feed() inflates a whole chunk into the buffer. inflate() instead
+    yields the output in bounded pieces and keeps none of it, for
+    consumers that stream (e.g. TarHeaderWalker); a stream is read with
+    one or the other. Multi-member gzip (e.g. eStargz layers) is inflated
+    as one stream.
+    
     Usage:
         decompressor = IncrementalGzipDecompressor()
         while has_more_data:
             decompressor.feed(compressed_chunk)
-            buffer = decompressor.get_buffer()
+            buffer = decompressor.get_buffer()  # buffer[0] is at window_start
             # parse buffer...
+            decompressor.consume(parsed_up_to)
     """
     
     def __init__(self):
-        # 16 + MAX_WBITS tells zlib to expect gzip format
-        self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
-        self.buffer = b""
+        # gzip framing, from the configured inflate backend (see inflate.py)
+        self.decompressor = get_inflate_backend().decompressobj()
+        self.buffer = bytearray()
+        self.window_start = 0   # Stream offset of buffer[0]
+        self._skip = 0          # Consumed bytes not yet inflated, dropped on arrival
         self.bytes_decompressed = 0
         self.error: Optional[str] = None
     
+    @classmethod
+    def from_checkpoint(cls, checkpoint: GzipCheckpoint) -> "IncrementalGzipDecompressor":
+        """
+        Resume a layer's stream at a checkpoint recorded by a peek.
+        
+        The compressed data fed must start at checkpoint.read_from; stream
+        offsets (window_start, end_offset) stay those of the whole layer.
+        """
+        decompressor = cls()
+        decompressor.decompressor = CheckpointInflater(checkpoint)
+        decompressor.window_start = checkpoint.out_offset
+        return decompressor
+    
+    @property
+    def end_offset(self) -> int:
+        """Stream offset just past the last decompressed byte."""
+        # While consumed data is still being skipped, the buffer is empty
+        return self.window_start - self._skip + len(self.buffer)
+    
     def feed(self, compressed_data: bytes) -> bytes:
         """
         Feed compressed data and return newly decompressed bytes.
@@ -43,28 +107,351 @@ class IncrementalGzipDecompressor:
             return b""
         
         try:
-            decompressed = self.decompressor.decompress(compressed_data)
-            self.buffer += decompressed
-            self.bytes_decompressed += len(decompressed)
+            decompressed = self._decompress(compressed_data)
+            self._append(decompressed)
             return decompressed
         except zlib.error as e:
             self.error = str(e)
             return b""
     
-    def get_buffer(self) -> bytes:
-        """Return the full decompressed buffer."""
+    def inflate(self, compressed_data: bytes) -> Generator[bytes, None, None]:
+        """
+        Feed compressed data and yield the output in pieces of at most
+        INFLATE_STEP bytes, without appending it to the buffer.
+        
+        A chunk that inflates to far more than its size (e.g. a large
+        file of zeros) therefore never sits in memory all at once.
+        """
+        data = compressed_data
+        while True:
+            try:
+                decompressed = self._decompress(data, INFLATE_STEP)
+            except zlib.error as e:
+                self.error = str(e)
+                return
+            data = self.decompressor.unconsumed_tail
+            self.bytes_decompressed += len(decompressed)
+            if decompressed:
+                yield decompressed
+            # A full step can leave output pending even once the input is used up
+            if not data and len(decompressed) < INFLATE_STEP:
+                return
+    
+    def _decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        """decompress() that carries on into the next gzip member when one ends."""
+        output = self.decompressor.decompress(data, max_length)
+        while self.decompressor.eof and starts_member(self.decompressor.unused_data):
+            if max_length and len(output) >= max_length:
+                break
+            data = self.decompressor.unused_data
+            self.decompressor = get_inflate_backend().decompressobj()
+            output += self.decompressor.decompress(data, max_length - len(output) if max_length else 0)
+        return output
+    
+    def _append(self, decompressed: bytes) -> None:
+        self.bytes_decompressed += len(decompressed)
+        if self._skip:
+            dropped = min(self._skip, len(decompressed))
+            self._skip -= dropped
+            decompressed = memoryview(decompressed)[dropped:]
+        self.buffer += decompressed
+    
+    def consume(self, offset: int) -> None:
+        """Release everything before stream offset offset."""
+        drop = offset - self.window_start
+        if drop <= 0:
+            return
+        if drop >= len(self.buffer):
+            self._skip += drop - len(self.buffer)
+            self.buffer.clear()
+        else:
+            del self.buffer[:drop]
+        self.window_start = offset
+    
+    def get_buffer(self) -> bytearray:
+        """Return the retained window; buffer[0] is at stream offset window_start."""
         return self.buffer
+    
+    def get_range(self, start: int, end: int) -> bytes:
+        """Return stream bytes [start, end), which must not be consumed yet."""
+        return bytes(self.buffer[start - self.window_start:end - self.window_start])
+
+
+class IncrementalZstdDecompressor(IncrementalGzipDecompressor):
+    """
+    IncrementalGzipDecompressor for zstd layers: same buffering, offsets
+    and streaming interface, decoding with ZstdFrameDecompressor.
+    
+    With a checkpoint_span, frame starts at least that far apart are
+    kept in checkpoints as seek points.
+    """
+    
+    def __init__(self, checkpoint_span: int = 0):
+        super().__init__()
+        self.decompressor = ZstdFrameDecompressor(checkpoint_span=checkpoint_span)
+    
+    @classmethod
+    def from_checkpoint(cls, checkpoint: GzipCheckpoint, checkpoint_span: int = 0) -> "IncrementalZstdDecompressor":
+        """Resume at a frame start; the data fed must start at checkpoint.in_offset."""
+        decompressor = cls()
+        decompressor.decompressor = ZstdFrameDecompressor(
+            checkpoint.in_offset, checkpoint.out_offset, checkpoint_span,
+        )
+        decompressor.window_start = checkpoint.out_offset
+        return decompressor
+    
+    @property
+    def checkpoints(self) -> list[GzipCheckpoint]:
+        return self.decompressor.checkpoints
+
 
+class PassthroughDecompressor:
+    """zlib.Decompress look-alike for uncompressed layers: output is the input."""
+    
+    def __init__(self):
+        self.unconsumed_tail = b""
+        self.unused_data = b""
+        self.eof = False
+    
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        if max_length and len(data) > max_length:
+            self.unconsumed_tail = data[max_length:]
+            return data[:max_length]
+        self.unconsumed_tail = b""
+        return data
 
-class IncrementalBlobReader:
+
+class IncrementalTarStream(IncrementalGzipDecompressor):
+    """
+    IncrementalGzipDecompressor for uncompressed tar layers, so they go
+    through the same buffering and offsets. Stream offsets are blob offsets.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.decompressor = PassthroughDecompressor()
+    
+    @classmethod
+    def from_checkpoint(cls, checkpoint: GzipCheckpoint) -> "IncrementalTarStream":
+        """Start at checkpoint.in_offset (which equals its out_offset)."""
+        stream = cls()
+        stream.window_start = checkpoint.out_offset
+        return stream
+
+
+def layer_compression(media_type: str = "", head: bytes = b"") -> Optional[str]:
+    """
+    Tell how a layer is compressed: "gzip", "zstd", "none" (plain tar), or
+    None if it is none of these.
+    
+    Args:
+        media_type: Layer mediaType from the manifest, if known
+        head: First bytes of the blob, checked for magic bytes (or a tar
+              header) when the media type does not say
+    """
+    if "zstd" in media_type:
+        return "zstd"
+    if "gzip" in media_type:
+        return "gzip"
+    if media_type.endswith(".tar"):
+        return "none"
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(ZSTD_MAGIC):
+        return "zstd"
+    if is_tar_header(head):
+        return "none"
+    return None
+
+
+def new_decompressor(
+    compression: str,
+    checkpoint: Optional[GzipCheckpoint] = None,
+    checkpoint_span: int = 0,
+    keep_checkpoints: int = 0,
+) -> IncrementalGzipDecompressor:
+    """
+    Build the streaming decompressor for a layer.
+    
+    Args:
+        compression: "gzip", "zstd" or "none" (see layer_compression())
+        checkpoint: Resume at this seek point instead of the layer start
+        checkpoint_span: Record seek points this many decompressed bytes
+                         apart (gzip needs libz, see index_supported()),
+                         also when resuming
+        keep_checkpoints: Hold only this many of the newest gzip seek
+                          points (0 = all)
+    
+    Raises:
+        ImportError: compression is "zstd" but zstandard is not installed
+    """
+    if compression == "zstd":
+        if not zstd_available():
+            raise ImportError("zstd layers need the zstandard package: pip install zstandard")
+        if checkpoint is not None:
+            return IncrementalZstdDecompressor.from_checkpoint(checkpoint, checkpoint_span)
+        return IncrementalZstdDecompressor(checkpoint_span)
+    if compression == "none":
+        if checkpoint is not None:
+            return IncrementalTarStream.from_checkpoint(checkpoint)
+        return IncrementalTarStream()
+    if checkpoint is not None:
+        if checkpoint_span and index_supported():
+            return GzipIndexBuilder.from_checkpoint(checkpoint, checkpoint_span, keep_checkpoints)
+        return IncrementalGzipDecompressor.from_checkpoint(checkpoint)
+    if checkpoint_span and index_supported():
+        return GzipIndexBuilder(checkpoint_span, keep_checkpoints)
+    return IncrementalGzipDecompressor()
+
+
+class BlobReaderBase:
+    """
+    Transport-independent state shared by the sync and async blob readers.
+    
+    Tracks the read position and byte counters, serves chunks from the
+    blob cache, applies the chunk schedule and limit, and writes network
+    data back to the cache. Subclasses supply the network reads.
+    """
+    
+    def __init__(
+        self,
+        digest: str,
+        url: str,
+        chunk_size: int,
+        streaming: bool,
+        cache: Optional[BlobCache],
+        use_cache: bool,
+        schedule: Optional[ChunkSchedule],
+        limit: int,
+        retry_budget: RetryBudget,
+        offset: int = 0,
+    ):
+        self.digest = digest
+        self.url = url
+        self.chunk_size = chunk_size
+        self.schedule = schedule or ChunkSchedule.fixed(chunk_size)
+        self.limit = limit  # Stop after this many blob bytes (0 = whole blob)
+        self.streaming = streaming
+        self.cache = (cache or get_blob_cache()) if use_cache else None
+        self.start_offset = offset  # Blob offset reading started at
+        self.current_offset = offset
+        self.bytes_downloaded = 0
+        self.bytes_from_cache = 0
+        self.requests_made = 0
+        self.total_size = 0  # Set after first request from Content-Range
+        self.retry_budget = retry_budget
+        self.retries = 0
+        self.exhausted = False
+        self.error: Optional[str] = None
+        self._response = None  # Open streaming response, if any
+    
+    @property
+    def limit_reached(self) -> bool:
+        """True if reading stopped at the limit rather than the end of the blob."""
+        return bool(self.limit) and self.current_offset >= self.limit
+    
+    def hint_remaining(self, remaining: Optional[int]):
+        """Shrink upcoming chunks to roughly the bytes the caller still needs."""
+        self.schedule.hint_remaining(remaining)
+    
+    def _next_size(self) -> int:
+        """Size of the next read, or 0 once the limit is reached."""
+        size = self.schedule.next_size()
+        if self.limit:
+            size = max(min(size, self.limit - self.current_offset), 0)
+        return size
+    
+    def _set_total_size(self, content_range: str):
+        """Take the blob size from a Content-Range header ("bytes 0-65535/12345678")."""
+        if "/" in content_range:
+            self.total_size = int(content_range.split("/")[-1])
+    
+    def _read_cached(self, size: int) -> bytes:
+        """
+        Serve the next chunk from the blob cache, if present.
+        
+        Only used while no network stream is open, so a stream never
+        has to skip over bytes that were served locally.
+        """
+        if self.cache is None or self._response is not None:
+            return b""
+        data = self.cache.read(self.digest, self.current_offset, size)
+        if data and not self.total_size:
+            self.total_size = self.cache.total_size(self.digest)
+        return data
+    
+    def _ended_early(self, data: bytes) -> bool:
+        """True if a network read came back empty before the end of the blob."""
+        return not data and bool(self.total_size) and self.current_offset < self.total_size
+    
+    def _advance(self, data: bytes, from_cache: bool) -> bytes:
+        """
+        Account for a chunk that was just read and move past it.
+        
+        Network data is written back to the cache. Sets exhausted at the
+        end of the blob (or the limit); the caller then closes the reader.
+        """
+        if from_cache:
+            self.bytes_from_cache += len(data)
+        else:
+            if data and self.cache is not None:
+                self.cache.write(self.digest, self.current_offset, data, self.total_size)
+            self.bytes_downloaded += len(data)
+        
+        if not data:
+            self.exhausted = True
+            return b""
+        
+        self.current_offset += len(data)
+        self.schedule.record(len(data))
+        
+        # Check if we've reached the end (of the blob, or of the limit)
+        if self.limit_reached or (self.total_size and self.current_offset >= self.total_size):
+            self.exhausted = True
+        
+        return data
+    
+    def _flush_cache(self):
+        if self.cache is not None:
+            self.cache.flush(self.digest)
+
+
+class IncrementalBlobReader(BlobReaderBase):
     """
     Fetches blob data in chunks using HTTP Range requests.
     
+    Two modes are supported:
+    - streaming (default): a single open-ended ``Range: bytes=N-`` request is
+      issued and chunks are pulled off the same response body. Call close()
+      as soon as the caller has what it needs to drop the connection.
+    - ranged: one bounded ``Range: bytes=N-M`` request per chunk.
+    
+    Both modes keep bytes_downloaded in sync with what was actually read,
+    so the "tar.gz hack" efficiency stats stay accurate.
+    
+    Reads go through the on-disk blob cache: bytes already cached for this
+    digest are served locally (counted in bytes_from_cache, not
+    bytes_downloaded) and bytes fetched from the registry are written back.
+    
+    Chunk sizes come from a ChunkSchedule: fixed at chunk_size by default,
+    or adaptive (start small, grow while the caller keeps reading). A
+    limit caps how far into the blob the reader will go; offset starts
+    reading part-way in (e.g. at a gzip checkpoint), and seek() jumps
+    ahead between reads.
+    
+    Transient failures (connection reset, timeout, 429/5xx, a stream that
+    ends before the blob does) are retried with backoff, resuming from
+    current_offset, until the operation's retry budget is spent. Only
+    then does the reader give up and set error.
+    
     Usage:
         reader = IncrementalBlobReader(auth, namespace, repo, digest)
-        while not reader.exhausted:
-            chunk = reader.fetch_chunk()
-            # process chunk...
+        try:
+            while not reader.exhausted:
+                chunk = reader.fetch_chunk()
+                # process chunk...
+        finally:
+            reader.close()
     """
     
     def __init__(
@@ -74,75 +461,387 @@ class IncrementalBlobReader:
         repo: str,
         digest: str,
         chunk_size: int = 65536,  # 64KB default
+        streaming: bool = True,
+        cache: Optional[BlobCache] = None,
+        use_cache: bool = True,
+        schedule: Optional[ChunkSchedule] = None,
+        limit: int = 0,
+        retry_budget: Optional[RetryBudget] = None,
+        offset: int = 0,
     ):
+        super().__init__(
+            digest,
+            f"{registry_base_url(namespace, repo)}/blobs/{digest}",
+            chunk_size,
+            streaming,
+            cache,
+            use_cache,
+            schedule,
+            limit,
+            retry_budget or auth.retry_budget,
+            offset,
+        )
         self.auth = auth
-        self.url = f"{registry_base_url(namespace, repo)}/blobs/{digest}"
-        self.chunk_size = chunk_size
-        self.current_offset = 0
-        self.bytes_downloaded = 0
-        self.total_size = 0  # Set after first request from Content-Range
-        self.exhausted = False
+        self._response: Optional[requests.Response] = None
+        self._closed = threading.Event()  # Cuts a pending retry backoff short
+    
+    def _open(self, range_header: str) -> Optional[requests.Response]:
+        """
+        Issue a Range GET for the blob.
+        
+        Goes through RegistryAuth.request_blob(), so the registry redirect
+        is resolved once and later ranges go straight to the CDN.
+        
+        Returns the streaming response, or None if the range is past the
+        end of the blob (416).
+        """
+        headers = {"Range": range_header}
+        resp = self.auth.request_blob(self.url, headers=headers, stream=True, timeout=30)
+        self.requests_made += 1
+        
+        # 416 means range not satisfiable (past end of file)
+        if resp.status_code == 416:
+            resp.close()
+            return None
+        
+        resp.raise_for_status()
+        self._set_total_size(resp.headers.get("Content-Range", ""))
+        return resp
+    
+    def _read_ranged(self, size: int) -> bytes:
+        """Fetch one chunk with its own bounded Range request."""
+        end_offset = self.current_offset + size - 1
+        resp = self._open(f"bytes={self.current_offset}-{end_offset}")
+        if resp is None:
+            return b""
+        try:
+            return resp.raw.read(size)
+        finally:
+            resp.close()
+    
+    def _read_streamed(self, size: int) -> bytes:
+        """Read the next chunk off the open-ended Range response."""
+        if self._response is None:
+            self._response = self._open(f"bytes={self.current_offset}-")
+            if self._response is None:
+                return b""
+        return self._response.raw.read(size)
+    
+    def _read_network(self, size: int) -> bytes:
+        """
+        Read the next chunk from the registry, retrying transient failures.
+        
+        A retry reopens the blob at current_offset, so nothing is skipped
+        or read twice.
+        
+        Raises:
+            requests.RequestException / urllib3 HTTPError once retries are
+            exhausted or the failure is not transient
+        """
+        attempt = 0
+        while True:
+            try:
+                if self.streaming:
+                    data = self._read_streamed(size)
+                else:
+                    data = self._read_ranged(size)
+                if self._ended_early(data):
+                    raise requests.ConnectionError(
+                        f"Blob stream ended at byte {self.current_offset:,} of {self.total_size:,}"
+                    )
+                return data
+            except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+                self._drop_response()
+                response = getattr(e, "response", None)
+                if not is_retryable(e) or not self.retry_budget.wait(
+                    attempt, retry_after_seconds(response), cancel=self._closed,
+                ):
+                    raise
+                attempt += 1
+                self.retries += 1
     
     def fetch_chunk(self) -> bytes:
         """
-        Fetch the next chunk of data using HTTP Range request.
+        Fetch the next chunk of blob data.
         Returns empty bytes if exhausted or on error.
         """
         if self.exhausted:
             return b""
         
-        end_offset = self.current_offset + self.chunk_size - 1
-        
-        # Get session and add Range header
-        session = self.auth.get_session()
-        headers = {"Range": f"bytes={self.current_offset}-{end_offset}"}
+        size = self._next_size()
+        if not size:
+            self.exhausted = True
+            self.close()
+            return b""
         
-        try:
-            resp = session.get(self.url, headers=headers, stream=True, timeout=30)
-            
-            # 416 means range not satisfiable (past end of file)
-            if resp.status_code == 416:
-                self.exhausted = True
-                return b""
-            
-            # Handle 401 by refreshing token and retrying
-            if resp.status_code == 401:
-                self.auth._token = None
-                session = self.auth.get_session()
-                resp = session.get(self.url, headers=headers, stream=True, timeout=30)
-            
-            resp.raise_for_status()
-            
-            # Get total size from Content-Range header (format: "bytes 0-65535/12345678")
-            content_range = resp.headers.get("Content-Range", "")
-            if "/" in content_range:
-                self.total_size = int(content_range.split("/")[-1])
-            
-            data = resp.raw.read(self.chunk_size)
-            resp.close()
-            
-            if not data:
+        data = self._read_cached(size)
+        from_cache = bool(data)
+        if not from_cache:
+            try:
+                data = self._read_network(size)
+            except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+                self.error = str(e)
                 self.exhausted = True
+                self.close()
                 return b""
             
-            self.bytes_downloaded += len(data)
-            self.current_offset += len(data)
-            
-            # Check if we've reached the end
-            if self.total_size and self.current_offset >= self.total_size:
-                self.exhausted = True
-            
-            return data
-            
-        except requests.RequestException:
-            self.exhausted = True
-            return b""
+        data = self._advance(data, from_cache)
+        if self.exhausted:
+            self.close()
+        return data
+    
+    def seek(self, offset: int):
+        """
+        Continue reading at blob offset offset (e.g. past a file body that
+        is not needed). An open stream is dropped; the next read opens
+        a new Range there.
+        """
+        self._drop_response()
+        self.current_offset = offset
+        self.exhausted = bool(self.total_size) and offset >= self.total_size
+    
+    def _drop_response(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+    
+    def close(self):
+        """
+        Drop the streaming response, if any, and persist the cache's range map.
+        
+        Safe to call repeatedly. Closing mid-body discards the connection
+        rather than draining the rest of the layer.
+        """
+        self._closed.set()
+        self._drop_response()
+        self._flush_cache()
 
 
 # =============================================================================
 # Layer Peek - Incremental Streaming
 # =============================================================================
 
+class LayerPeekParser:
+    """
+    I/O-free core of a streaming peek: inflate compressed chunks and
+    collect tar headers until the end-of-archive marker.
+    
+    Shared by peek_layer_streaming() and its async counterpart, which
+    only differ in how chunks are fetched.
+    
+    The layer may be gzip, zstd or an uncompressed tar, told apart by its
+    first bytes. With a
+    checkpoint_span, inflation also records seek points (see gzip_index
+    and zstd_stream) that later carves can start from. With columnar,
+    entries are collected in EntryColumns instead of a list.
+    
+    A peek that stops early can be resumed from the newest seek point the
+    walk has passed (see continuation() and resume()). With resume_only,
+    seek points are recorded for that alone: only the newest are held,
+    and the result carries none as an index.
+    
+    Usage:
+        parser = LayerPeekParser(digest)
+        while not parser.done:
+            parser.feed(reader.fetch_chunk())
+        result = parser.result(reader)
+    """
+    
+    def __init__(self, digest: str, checkpoint_span: int = 0, columnar: bool = False, resume_only: bool = False):
+        self.digest = digest
+        self.checkpoint_span = checkpoint_span
+        self.resume_only = resume_only
+        self.compression: Optional[str] = None
+        self.decompressor = None  # Chosen from the first chunk's magic bytes
+        self.walker = TarHeaderWalker()
+        self.entries: Entries = EntryColumns() if columnar else []
+        if columnar:
+            self.walker.header_offsets = array("q")
+        self.first_chunk = True
+        self.error: Optional[str] = None
+        self.resumed_from: Optional[GzipCheckpoint] = None
+    
+    @classmethod
+    def resume(
+        cls,
+        continuation: PeekContinuation,
+        checkpoint_span: int = 0,
+        resume_only: bool = False,
+    ) -> "LayerPeekParser":
+        """
+        A parser picking up where a partial peek can be resumed.
+        
+        The data fed must start at continuation.checkpoint.read_from. The
+        entries before the resume point are kept (in the continuation's
+        container type) and the new ones follow them.
+        
+        Args:
+            continuation: From a partial LayerPeekResult (or storage)
+            checkpoint_span: Record seek points this many decompressed
+                             bytes apart from here on
+            resume_only: The seek points are only to resume from
+        """
+        prefix = continuation.entries[:continuation.entries_before]
+        parser = cls(continuation.digest, checkpoint_span, isinstance(prefix, EntryColumns), resume_only)
+        parser.entries = prefix
+        parser.first_chunk = False
+        parser.compression = continuation.compression
+        parser.resumed_from = continuation.checkpoint
+        
+        header_offsets = continuation.header_offsets[:continuation.entries_before]
+        parser.walker = TarHeaderWalker.resume_at(
+            continuation.checkpoint.out_offset,
+            continuation.pending_header,
+            continuation.body_remaining,
+        )
+        parser.walker.header_offsets = array("q", header_offsets) if isinstance(prefix, EntryColumns) else list(header_offsets)
+        parser.walker.entries_found = len(prefix)
+        try:
+            parser.decompressor = new_decompressor(
+                continuation.compression, continuation.checkpoint, checkpoint_span, parser._keep_checkpoints,
+            )
+        except ImportError as e:
+            parser.error = str(e)
+        return parser
+    
+    @property
+    def _keep_checkpoints(self) -> int:
+        return RESUME_KEEP if self.resume_only else 0
+    
+    @property
+    def archive_complete(self) -> bool:
+        return self.walker.complete
+    
+    @property
+    def done(self) -> bool:
+        """True once the archive ended or the layer turned out unreadable."""
+        return self.archive_complete or self.error is not None
+    
+    def feed(self, compressed: bytes):
+        """Inflate one chunk of the blob and collect every header completed in it."""
+        # First chunk: pick the decompressor from the magic bytes
+        if self.first_chunk:
+            self.first_chunk = False
+            self.compression = layer_compression(head=compressed)
+            if self.compression is None:
+                self.error = "Not a gzip, zstd or tar layer (missing magic bytes)"
+                return
+            try:
+                self.decompressor = new_decompressor(
+                    self.compression,
+                    checkpoint_span=self.checkpoint_span,
+                    keep_checkpoints=self._keep_checkpoints,
+                )
+            except ImportError as e:
+                self.error = str(e)
+                return
+        
+        # File bodies stream through the walker without being kept
+        for piece in self.decompressor.inflate(compressed):
+            self.entries.extend(self.walker.feed(piece))
+            if self.walker.complete:
+                break
+        
+        if self.decompressor.error:
+            self.error = f"Decompression error: {self.decompressor.error}"
+    
+    def result(self, reader) -> LayerPeekResult:
+        """
+        Build the LayerPeekResult, taking byte counters from reader.
+        
+        If the reader failed (after retries) before the archive ended,
+        the result keeps the entries parsed so far and is marked truncated.
+        If reading stopped early without failing (a byte budget), it is
+        marked partial, with a continuation if it can be resumed.
+        """
+        error = self.error
+        truncated = error is None and bool(reader.error) and not self.archive_complete
+        if truncated:
+            error = f"Blob read failed: {reader.error}"
+        partial = not self.done and (reader.limit_reached or not reader.exhausted)
+        return LayerPeekResult(
+            digest=self.digest,
+            partial=partial,
+            bytes_downloaded=reader.bytes_downloaded,
+            bytes_from_cache=reader.bytes_from_cache,
+            chunk_schedule=reader.schedule.runs(),
+            bytes_decompressed=self.decompressor.bytes_decompressed if self.decompressor else 0,
+            entries_found=len(self.entries),
+            entries=self.entries,
+            error=error,
+            truncated=truncated,
+            header_offsets=self.walker.header_offsets,
+            checkpoints=[] if self.resume_only else getattr(self.decompressor, "checkpoints", []),
+            continuation=self.continuation() if partial else None,
+        )
+    
+    def continuation(self) -> Optional[PeekContinuation]:
+        """
+        Where this walk can be resumed, or None if it has passed no resume point.
+        
+        An uncompressed tar resumes exactly where the walker is. A
+        compressed stream can only be re-entered at a seek point, so it
+        resumes at the newest checkpoint the walker has passed (or the one
+        this parser resumed from); the walker's state there follows from
+        the header offsets, and a header split by it from the window.
+        """
+        walker = self.walker
+        if self.compression == "none":
+            return PeekContinuation(
+                digest=self.digest,
+                compression="none",
+                checkpoint=GzipCheckpoint(walker.offset, walker.offset, 0, b""),
+                pending_header=walker.pending_header,
+                body_remaining=walker.body_remaining,
+                entries_before=len(self.entries),
+                entries=self.entries,
+                header_offsets=walker.header_offsets,
+            )
+        
+        candidates = list(getattr(self.decompressor, "checkpoints", []))
+        if self.resumed_from is not None:
+            candidates.insert(0, self.resumed_from)
+        for checkpoint in reversed(candidates):
+            if checkpoint.out_offset > walker.offset:
+                continue
+            state = self._walker_state_at(checkpoint)
+            if state is not None:
+                pending_header, body_remaining, entries_before = state
+                return PeekContinuation(
+                    digest=self.digest,
+                    compression=self.compression,
+                    checkpoint=checkpoint,
+                    pending_header=pending_header,
+                    body_remaining=body_remaining,
+                    entries_before=entries_before,
+                    entries=self.entries,
+                    header_offsets=walker.header_offsets,
+                )
+        return None
+    
+    def _walker_state_at(self, checkpoint: GzipCheckpoint) -> Optional[tuple[bytes, int, int]]:
+        """(pending header, body remaining, entries before) at the checkpoint, if it can be told."""
+        offset = checkpoint.out_offset
+        header_offsets = self.walker.header_offsets
+        before = bisect_left(header_offsets, offset)
+        if not before:
+            return (b"", 0, 0) if offset == 0 else None
+        
+        header = header_offsets[before - 1]
+        if header + TAR_BLOCK > offset:
+            # The checkpoint splits this header: its start is the end of the window
+            split = offset - header
+            if len(checkpoint.window) < split:
+                return None
+            return checkpoint.window[len(checkpoint.window) - split:], 0, before - 1
+        
+        size = self.entries[before - 1].size
+        next_header = header + TAR_BLOCK + (size + TAR_BLOCK - 1) // TAR_BLOCK * TAR_BLOCK
+        if next_header < offset:
+            return None
+        return b"", next_header - offset, before
+
+
 def peek_layer_streaming(
     auth: RegistryAuth,
     image_ref: str,
@@ -150,6 +849,14 @@ def peek_layer_streaming(
     layer_size: int = 0,
     chunk_size: int = 65536,
     max_bytes: int = 262144,
+    streaming: bool = True,
+    readahead_bytes: int = DEFAULT_READAHEAD_BYTES,
+    adaptive: bool = True,
+    checkpoint_span: int = 0,
+    use_toc: bool = False,
+    media_type: str = "",
+    columnar: bool = False,
+    resumable: bool = False,
 ) -> LayerPeekResult:
     """
     Stream and parse layer tar headers incrementally using HTTP Range requests.
@@ -165,83 +872,230 @@ def peek_layer_streaming(
         image_ref: Image reference (e.g., "nginx:latest")
         digest: Layer digest (e.g., "sha256:abc123...")
         layer_size: Total layer size (for info only, not used in logic)
-        chunk_size: Bytes to fetch per HTTP Range request (default 64KB)
-        max_bytes: Maximum compressed bytes to download (default 256KB)
+        chunk_size: Bytes per chunk when adaptive=False (default 64KB)
+        max_bytes: Maximum compressed bytes to read (default 256KB, 0 = no limit)
+        streaming: Use one open-ended Range request instead of one per chunk
+        readahead_bytes: Bytes to prefetch on a background thread while
+                         the current chunk is inflated (0 = no read-ahead).
+                         Only used without max_bytes: a budgeted peek
+                         fetches just the chunks it parses
+        adaptive: Start with small chunks and grow them while the archive
+                  keeps going, instead of fixed chunk_size reads
+        checkpoint_span: Record a gzip checkpoint every this many
+                         decompressed bytes, for carves to seek to
+                         (0 = no index)
+        use_toc: First look for an eStargz table of contents at the end
+                 of the blob, and list the layer from it if present.
+                 The probe is an extra request: pass
+                 estargz.has_toc(descriptor) so only annotated layers
+                 pay for it. Its bytes count even when no TOC is found
+        media_type: Layer mediaType from the manifest, if known. An
+                    uncompressed tar layer (by media type or by its first
+                    header) is listed with peek_tar_layer() instead
+        columnar: Collect entries in EntryColumns rather than a list of
+                  objects (for layers with very many files)
+        resumable: With max_bytes, record resume points (every RESUME_SPAN
+                   decompressed bytes, unless checkpoint_span is set), so
+                   a peek cut short by the budget can go on with
+                   continue_peek(). Without checkpoint_span they are not
+                   an index: only the newest is kept, in the continuation
         
     Returns:
-        LayerPeekResult with file listing
+        LayerPeekResult with file listing. If blob reads still failed after
+        retries, the entries parsed so far are kept and the result is
+        marked truncated (with error set). If max_bytes ran out first, the
+        result is partial and, where it can be resumed, has a continuation.
     """
     user, repo, _ = parse_image_ref(image_ref)
+    resume_only = bool(resumable and max_bytes and not checkpoint_span)
+    if resume_only:
+        checkpoint_span = RESUME_SPAN
     
-    reader = IncrementalBlobReader(auth, user, repo, digest, chunk_size)
-    decompressor = IncrementalGzipDecompressor()
-    entries: List[TarEntry] = []
-    parse_offset = 0
-    first_chunk = True
-    archive_complete = False
+    if layer_compression(media_type) == "none":
+        return peek_tar_layer(auth, image_ref, digest, max_bytes, columnar=columnar)
     
-    while not reader.exhausted and not archive_complete:
-        # Early termination based on byte budget (the "tar.gz hack")
-        if reader.bytes_downloaded >= max_bytes:
-            break
-        
-        compressed = reader.fetch_chunk()
-        if not compressed:
-            break
-        
-        # First chunk: verify gzip magic bytes (0x1f 0x8b)
-        if first_chunk:
-            first_chunk = False
-            if len(compressed) < 2 or compressed[0:2] != b'\x1f\x8b':
-                return LayerPeekResult(
-                    digest=digest,
-                    partial=False,
-                    bytes_downloaded=reader.bytes_downloaded,
-                    bytes_decompressed=0,
-                    entries_found=0,
-                    entries=[],
-                    error="Not a gzip file (missing magic bytes)",
-                )
-        
-        decompressor.feed(compressed)
-        
-        if decompressor.error:
+    # eStargz: the TOC lists every entry, so the tar stream need not be read
+    probe_bytes = 0
+    if use_toc:
+        toc, probe_bytes = read_toc(auth, f"{registry_base_url(user, repo)}/blobs/{digest}")
+        if toc is not None:
+            entries = EntryColumns.from_entries(toc.compact_entries()) if columnar else toc.tar_entries()
             return LayerPeekResult(
                 digest=digest,
                 partial=False,
-                bytes_downloaded=reader.bytes_downloaded,
-                bytes_decompressed=decompressor.bytes_decompressed,
+                bytes_downloaded=probe_bytes,
+                bytes_decompressed=0,
                 entries_found=len(entries),
                 entries=entries,
-                error=f"Decompression error: {decompressor.error}",
+                from_toc=True,
             )
-        
-        buffer = decompressor.get_buffer()
-        
-        # Parse all available tar headers from current buffer
-        while parse_offset + 512 <= len(buffer):
-            # Check for null block BEFORE calling parse_tar_header
-            if buffer[parse_offset:parse_offset + 512] == b'\x00' * 512:
-                archive_complete = True
+    
+    schedule = ChunkSchedule.adaptive(maximum=ADAPTIVE_MAX_CHUNK) if adaptive else None
+    reader = IncrementalBlobReader(
+        auth, user, repo, digest, chunk_size,
+        streaming=streaming, schedule=schedule, limit=max_bytes,
+    )
+    if readahead_bytes and not max_bytes:
+        reader = PrefetchingBlobReader(reader, depth=readahead_bytes)
+    parser = LayerPeekParser(digest, checkpoint_span, columnar, resume_only)
+    
+    try:
+        while not reader.exhausted and not parser.done:
+            # Early termination based on byte budget (the "tar.gz hack").
+            # Cached bytes count too, so the listing doesn't depend on cache state.
+            if max_bytes and reader.current_offset >= max_bytes:
                 break
             
-            entry, next_offset = parse_tar_header(buffer, parse_offset)
-            if entry is None:
-                # Not enough data or parse error - need more chunks
+            compressed = reader.fetch_chunk()
+            if not compressed:
                 break
-            entries.append(entry)
-            if next_offset <= parse_offset:
+            parser.feed(compressed)
+            if parser.compression == "none":
+                break  # Uncompressed after all: hop the rest
+    finally:
+        reader.close()
+    
+    # Uncompressed: hop the rest, within what is left of the byte budget
+    spent = reader.bytes_downloaded + reader.bytes_from_cache
+    if parser.compression == "none" and not parser.done and (not max_bytes or spent < max_bytes):
+        result = peek_tar_layer(auth, image_ref, digest, max_bytes and max_bytes - spent, parser)
+        result.bytes_downloaded += reader.bytes_downloaded
+        result.bytes_from_cache += reader.bytes_from_cache
+    else:
+        result = parser.result(reader)
+    result.bytes_downloaded += probe_bytes
+    return result
+
+
+def peek_tar_layer(
+    auth: RegistryAuth,
+    image_ref: str,
+    digest: str,
+    max_bytes: int = 0,
+    parser: Optional[LayerPeekParser] = None,
+    columnar: bool = False,
+) -> LayerPeekResult:
+    """
+    Enumerate an uncompressed tar layer by hopping from header to header.
+    
+    Every header's position follows from the previous header's size, so
+    whether to jump is decided from the distance to the next header: a
+    body longer than HOP_MAX_GAP is jumped over with a new Range request
+    at the following header, and a shorter one is read through (one
+    request instead of two). Each read ends some way past the next
+    header: HOP_READ after a jump, doubling up to HOP_MAX_READ while
+    bodies keep being read through, so runs of small files are fetched
+    in a few coalesced reads.
+    
+    Args:
+        auth: RegistryAuth instance for authenticated requests
+        image_ref: Image reference (e.g., "nginx:latest")
+        digest: Layer digest (e.g., "sha256:abc123...")
+        max_bytes: Stop after this many bytes were transferred (0 = no limit)
+        parser: Continue a peek that already parsed the start of the layer
+                (reading resumes at parser.walker.offset)
+        columnar: Collect entries in EntryColumns (ignored with parser)
+    
+    Returns:
+        LayerPeekResult, as from peek_layer_streaming()
+    """
+    user, repo, _ = parse_image_ref(image_ref)
+    parser = parser or LayerPeekParser(digest, columnar=columnar)
+    walker = parser.walker
+    
+    # Reads are sized by hint_remaining(): the gap to the next header plus lookahead
+    schedule = ChunkSchedule(initial=HOP_MAX_GAP + HOP_MAX_READ, growth=1.0, minimum=HOP_READ)
+    reader = IncrementalBlobReader(
+        auth, user, repo, digest, HOP_READ,
+        streaming=False, schedule=schedule, offset=walker.offset,
+    )
+    lookahead = HOP_READ
+    
+    try:
+        while not reader.exhausted and not parser.done:
+            if max_bytes and reader.bytes_downloaded + reader.bytes_from_cache >= max_bytes:
+                break
+            
+            # Jump over a long body; read through a short one up to the next header
+            gap = walker.body_remaining
+            if gap > HOP_MAX_GAP:
+                reader.seek(walker.skip_body())
+                gap = 0
+                lookahead = HOP_READ
+                if reader.exhausted:
+                    break
+            elif gap:
+                lookahead = min(lookahead * 2, HOP_MAX_READ)
+            reader.hint_remaining(gap + lookahead)
+            
+            data = reader.fetch_chunk()
+            if not data:
                 break
-            parse_offset = next_offset
+            parser.feed(data)
+    finally:
+        reader.close()
     
-    return LayerPeekResult(
-        digest=digest,
-        partial=False,
-        bytes_downloaded=reader.bytes_downloaded,
-        bytes_decompressed=decompressor.bytes_decompressed,
-        entries_found=len(entries),
-        entries=entries,
+    return parser.result(reader)
+
+
+def continue_peek(
+    auth: RegistryAuth,
+    image_ref: str,
+    continuation: PeekContinuation,
+    chunk_size: int = 65536,
+    max_bytes: int = 262144,
+    streaming: bool = True,
+    adaptive: bool = True,
+    checkpoint_span: int = 0,
+) -> LayerPeekResult:
+    """
+    Go on with a partial peek from its continuation.
+    
+    Reading starts at the continuation's resume point, so at most the
+    data since its last checkpoint (RESUME_SPAN of output, by default) is
+    read and inflated again. The listing continues the one the
+    continuation came from, in the same container type.
+    
+    Args:
+        auth: RegistryAuth instance for authenticated requests
+        image_ref: Image reference (e.g., "nginx:latest")
+        continuation: LayerPeekResult.continuation, or one loaded from storage
+        chunk_size: Bytes per chunk when adaptive=False (default 64KB)
+        max_bytes: Maximum compressed bytes to read this time (0 = to the end)
+        streaming: Use one open-ended Range request instead of one per chunk
+        adaptive: Grow chunk sizes while the archive keeps going
+        checkpoint_span: Seek points to record from here on, as an index
+                         (default: with max_bytes, resume points only,
+                         so the peek stays resumable)
+    
+    Returns:
+        LayerPeekResult with the whole listing so far; bytes counts cover
+        this call only
+    """
+    user, repo, _ = parse_image_ref(image_ref)
+    resume_only = bool(max_bytes and not checkpoint_span)
+    parser = LayerPeekParser.resume(continuation, RESUME_SPAN if resume_only else checkpoint_span, resume_only)
+    if continuation.compression == "none":
+        return peek_tar_layer(auth, image_ref, continuation.digest, max_bytes, parser)
+    
+    start = continuation.checkpoint.read_from
+    schedule = ChunkSchedule.adaptive(maximum=ADAPTIVE_MAX_CHUNK) if adaptive else None
+    reader = IncrementalBlobReader(
+        auth, user, repo, continuation.digest, chunk_size,
+        streaming=streaming, schedule=schedule, offset=start,
+        limit=start + max_bytes if max_bytes else 0,
     )
+    
+    try:
+        while not reader.exhausted and not parser.done:
+            compressed = reader.fetch_chunk()
+            if not compressed:
+                break
+            parser.feed(compressed)
+    finally:
+        reader.close()
+    
+    return parser.result(reader)
 
 
 # KEEP ME
@@ -250,7 +1104,7 @@ def peek_layer_blob_streaming(
     image_ref: str,
     digest: str,
     initial_bytes: int = 262144,
-) -> Generator[TarEntry, None, LayerPeekResult]:
+) -> Generator[AnyTarEntry, None, LayerPeekResult]:
     """
     Generator version that yields entries as they are parsed.
     
@@ -263,7 +1117,7 @@ def peek_layer_blob_streaming(
         initial_bytes: How many bytes to fetch (default 256KB)
     
     Yields:
-        TarEntry objects as they are parsed
+        Entries (CompactTarEntry) as they are parsed
         
     Returns:
         LayerPeekResult with final stats (accessible via generator.value)
@@ -271,24 +1125,14 @@ def peek_layer_blob_streaming(
     user, repo, _ = parse_image_ref(image_ref)
     url = f"{registry_base_url(user, repo)}/blobs/{digest}"
     
-    # Get session and add Range header
-    session = auth.get_session()
     headers = {"Range": f"bytes=0-{initial_bytes - 1}"}
     
     error_msg = None
     compressed_data = b""
-    decompressed = b""
     entries = []
     
     try:
-        resp = session.get(url, headers=headers, stream=True, timeout=30)
-        
-        # Handle auth retry
-        if resp.status_code == 401:
-            auth._token = None
-            session = auth.get_session()
-            resp = session.get(url, headers=headers, stream=True, timeout=30)
-        
+        resp = auth.request_blob(url, headers=headers, stream=True, timeout=30)
         resp.raise_for_status()
         
         # Read the partial data
@@ -307,23 +1151,13 @@ def peek_layer_blob_streaming(
             error=error_msg,
         )
     
-    # Verify gzip magic (0x1f 0x8b)
-    if len(compressed_data) < 2 or compressed_data[0:2] != b'\x1f\x8b':
-        return LayerPeekResult(
-            digest=digest,
-            partial=True,
-            bytes_downloaded=len(compressed_data),
-            bytes_decompressed=0,
-            entries_found=0,
-            entries=[],
-            error="Not a gzip file (missing magic bytes)",
-        )
-    
-    # Decompress with zlib (handles partial streams)
+    # Verify gzip (0x1f 0x8b) or zstd magic
+    compression = layer_compression(head=compressed_data)
     try:
-        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
-        decompressed = decompressor.decompress(compressed_data)
-    except zlib.error as e:
+        if compression is None:
+            raise ValueError("Not a gzip, zstd or tar layer (missing magic bytes)")
+        decompressor = new_decompressor(compression)
+    except (ValueError, ImportError) as e:
         return LayerPeekResult(
             digest=digest,
             partial=True,
@@ -331,40 +1165,31 @@ def peek_layer_blob_streaming(
             bytes_decompressed=0,
             entries_found=0,
             entries=[],
-            error=f"Decompression error: {e}",
-        )
-    
-    if len(decompressed) < 512:
-        return LayerPeekResult(
-            digest=digest,
-            partial=True,
-            bytes_downloaded=len(compressed_data),
-            bytes_decompressed=len(decompressed),
-            entries_found=0,
-            entries=[],
-            error="Not enough decompressed data for tar header",
+            error=str(e),
         )
     
-    # Parse tar headers and yield entries as we go
-    offset = 0
-    
-    while offset + 512 <= len(decompressed):
-        entry, next_offset = parse_tar_header(decompressed, offset)
-        if entry is None:
-            break
-        entries.append(entry)
-        yield entry  # Stream the entry to caller
-        
-        if next_offset <= offset or next_offset > len(decompressed):
+    # Decompress (handles partial streams) and walk the headers as they inflate,
+    # streaming each entry to the caller; file bodies are skipped, not kept
+    walker = TarHeaderWalker()
+    for piece in decompressor.inflate(compressed_data):
+        for entry in walker.feed(piece):
+            entries.append(entry)
+            yield entry
+        if walker.complete:
             break
-        offset = next_offset
+    
+    if decompressor.error:
+        error_msg = f"Decompression error: {decompressor.error}"
+    elif decompressor.bytes_decompressed < 512:
+        error_msg = "Not enough decompressed data for tar header"
     
     # Return final stats
     return LayerPeekResult(
         digest=digest,
         partial=True,
         bytes_downloaded=len(compressed_data),
-        bytes_decompressed=len(decompressed),
+        bytes_decompressed=decompressor.bytes_decompressed,
         entries_found=len(entries),
         entries=entries,
+        error=error_msg,
     )
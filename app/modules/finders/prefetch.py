@@ -0,0 +1,173 @@
+"""
+Read-ahead prefetch pipeline for blob readers.
+
+peek and carve alternate between fetching a chunk and inflating/parsing
+it, so the socket sits idle while zlib runs and vice versa. Wrapping the
+reader in a PrefetchingBlobReader moves fetching onto a background thread
+that keeps up to `depth` bytes queued ahead of the consumer.
+
+That pays off when the whole blob is read. A carve or a budgeted peek
+stops early, and whatever was queued past that point was downloaded for
+nothing, so those leave read-ahead off by default. Byte counters include
+queued bytes; read them after close(), once the fetch thread has stopped.
+"""
+
+import threading
+from collections import deque
+from typing import Optional
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+DEFAULT_READAHEAD_BYTES = 1024 * 1024  # 1MB queued ahead of the consumer
+
+
+class PrefetchingBlobReader:
+    """
+    Wraps an IncrementalBlobReader with a bounded read-ahead queue.
+    
+    Exposes the same interface as the wrapped reader (fetch_chunk(),
+    exhausted, close(), byte counters), so peek/carve loops don't change.
+    Only the fetch thread touches the wrapped reader until close().
+    
+    Usage:
+        reader = PrefetchingBlobReader(IncrementalBlobReader(...), depth=1 << 20)
+        try:
+            while not reader.exhausted:
+                chunk = reader.fetch_chunk()
+                # inflate/parse while the next chunks download...
+        finally:
+            reader.close()
+    """
+    
+    def __init__(self, reader, depth: int = DEFAULT_READAHEAD_BYTES):
+        """
+        Args:
+            reader: IncrementalBlobReader to fetch from (its limit, if any,
+                    also bounds the read-ahead)
+            depth: Maximum bytes queued ahead of the consumer
+        """
+        self.reader = reader
+        self.depth = max(depth, 1)
+        self.current_offset = reader.current_offset  # Bytes handed to the consumer
+        self.error: Optional[str] = None
+        self._queue: deque[bytes] = deque()
+        self._queued_bytes = 0
+        self._done = False
+        self._stop = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+    
+    # -------------------------------------------------------------------------
+    # Stats passthrough
+    # -------------------------------------------------------------------------
+    
+    @property
+    def start_offset(self) -> int:
+        return self.reader.start_offset
+    
+    @property
+    def bytes_downloaded(self) -> int:
+        return self.reader.bytes_downloaded
+    
+    @property
+    def bytes_from_cache(self) -> int:
+        return self.reader.bytes_from_cache
+    
+    @property
+    def total_size(self) -> int:
+        return self.reader.total_size
+    
+    @property
+    def retries(self) -> int:
+        return self.reader.retries
+    
+    @property
+    def schedule(self):
+        return self.reader.schedule
+    
+    @property
+    def limit_reached(self) -> bool:
+        return self.exhausted and self.reader.limit_reached
+    
+    @property
+    def exhausted(self) -> bool:
+        with self._cond:
+            return self._done and not self._queue
+    
+    # -------------------------------------------------------------------------
+    # Producer / consumer
+    # -------------------------------------------------------------------------
+    
+    def _produce(self):
+        """Fetch thread: keep the queue filled up to depth bytes."""
+        try:
+            while True:
+                with self._cond:
+                    while self._queued_bytes >= self.depth and not self._stop:
+                        self._cond.wait()
+                    if self._stop:
+                        return
+                if self.reader.exhausted:
+                    break
+                chunk = self.reader.fetch_chunk()
+                if not chunk:
+                    break
+                with self._cond:
+                    self._queue.append(chunk)
+                    self._queued_bytes += len(chunk)
+                    self._cond.notify_all()
+        except Exception as e:  # Surface unexpected failures to the consumer
+            if not self._stop:
+                self.error = str(e)
+        finally:
+            with self._cond:
+                if not self._stop and self.error is None:
+                    self.error = self.reader.error
+                self._done = True
+                self._cond.notify_all()
+    
+    def fetch_chunk(self) -> bytes:
+        """
+        Return the next queued chunk, waiting for the fetch thread if needed.
+        Returns empty bytes once the blob (or the limit) is exhausted.
+        """
+        with self._cond:
+            while not self._queue and not self._done:
+                self._cond.wait()
+            if not self._queue:
+                return b""
+            chunk = self._queue.popleft()
+            self._queued_bytes -= len(chunk)
+            self._cond.notify_all()
+        self.current_offset += len(chunk)
+        return chunk
+    
+    def hint_remaining(self, remaining: Optional[int]):
+        """
+        Pass a remaining-bytes hint to the wrapped reader, less what is
+        already queued.
+        """
+        if remaining is not None:
+            with self._cond:
+                remaining = max(remaining - self._queued_bytes, 0)
+        self.reader.hint_remaining(remaining)
+    
+    def close(self):
+        """
+        Stop the fetch thread and close the wrapped reader.
+        
+        Safe to call repeatedly. Bytes still queued are discarded.
+        """
+        with self._cond:
+            self._stop = True
+            self._queue.clear()
+            self._queued_bytes = 0
+            self._cond.notify_all()
+        # Closing the reader unblocks a fetch thread stuck in a socket read
+        self.reader.close()
+        self._thread.join()
+        self.reader.close()
@@ -0,0 +1,138 @@
+"""
+Zero-copy tar header decoding.
+
+tar_parser.parse_tar_header() (kept unchanged for compatibility) copies
+each 512-byte header out of its buffer and slices it again per field,
+and end-of-archive checks compare whole blocks against a new
+b"\\x00" * 512. The decoder here reads only the fields it needs, straight
+from a memoryview, with one precompiled struct layout. It looks for the
+end marker only when a block starts with NUL, which a real header never
+does. Entries come back as CompactTarEntry, which keeps the raw values
+and formats names, mode and mtime only when they are read; the values
+read are the same as parse_tar_header()'s TarEntry.
+
+decode_headers() decodes a run of consecutive headers (each one followed
+by its body) in a single call, which is how TarHeaderWalker and the
+carver's TarScanner walk a buffer.
+"""
+
+import struct
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+from app.modules.finders.tar_entry import CompactTarEntry
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+TAR_BLOCK = 512
+ZERO_BLOCK = bytes(TAR_BLOCK)
+
+# name, mode, uid, gid, size, mtime, [chksum], typeflag, linkname,
+# [magic version uname gname devmajor devminor], prefix, [pad]
+HEADER_LAYOUT = struct.Struct("100s8s8s8s12s12s8xB100s88x155s12x")
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+# =============================================================================
+# Field Decoding
+# =============================================================================
+
+def _octal(field_bytes: bytes) -> int:
+    """Octal field to int (0 if empty or malformed), as tar_parser reads it."""
+    try:
+        # int() itself skips the surrounding whitespace tar_parser strips
+        return int(field_bytes.rstrip(b"\x00"), 8)
+    except ValueError:
+        return 0
+
+
+def _is_end_block(view: Buffer, offset: int) -> bool:
+    """True if the block at offset is all zeros (end of archive)."""
+    return view[offset] == 0 and view[offset:offset + TAR_BLOCK] == ZERO_BLOCK
+
+
+def _decode(view: Buffer, offset: int) -> tuple[CompactTarEntry, int]:
+    """Decode the (non-zero) header at offset; returns (entry, next header offset)."""
+    (name, mode, uid, gid, size, mtime, typeflag, linkname, prefix) = HEADER_LAYOUT.unpack_from(view, offset)
+    
+    name = name.rstrip(b"\x00")
+    prefix = prefix.rstrip(b"\x00")
+    if prefix:
+        name = prefix + b"/" + name
+    typeflag = chr(typeflag) if typeflag else "0"
+    size = _octal(size)
+    
+    entry = CompactTarEntry(
+        name,
+        size,
+        typeflag,
+        typeflag == "5" or name.endswith(b"/"),
+        _octal(mode),
+        _octal(uid),
+        _octal(gid),
+        _octal(mtime),
+        linkname.rstrip(b"\x00"),
+    )
+    return entry, offset + TAR_BLOCK + (size + TAR_BLOCK - 1) // TAR_BLOCK * TAR_BLOCK
+
+
+# =============================================================================
+# Public API
+# =============================================================================
+
+def decode_header(data: Buffer, offset: int = 0) -> tuple[Optional[CompactTarEntry], int]:
+    """
+    Decode the 512-byte tar header at offset, without copying it.
+    
+    Drop-in for tar_parser.parse_tar_header().
+    
+    Returns:
+        (entry, next_offset), or (None, -1) at the end-of-archive marker
+        or if fewer than 512 bytes remain
+    """
+    if offset + TAR_BLOCK > len(data) or _is_end_block(data, offset):
+        return None, -1
+    return _decode(data, offset)
+
+
+@dataclass
+class HeaderRun:
+    """Headers decoded by one decode_headers() call."""
+    entries: list[CompactTarEntry] = field(default_factory=list)
+    offsets: list[int] = field(default_factory=list)  # Offset of each entry's header
+    next_offset: int = 0    # Where the next header starts (may lie past the data)
+    complete: bool = False  # Stopped at the end-of-archive marker (at next_offset)
+
+
+def decode_headers(data: Buffer, offset: int = 0, end: Optional[int] = None) -> HeaderRun:
+    """
+    Decode consecutive headers from offset on, stepping over each body.
+    
+    Stops at the end-of-archive marker or at the first header that does
+    not lie whole within data[:end].
+    
+    Args:
+        data: Buffer holding the tar stream (a memoryview is not copied)
+        offset: Offset of the first header in data
+        end: Treat data as ending here (default: len(data))
+    
+    Returns:
+        HeaderRun with the entries, their offsets, and where to go on
+    """
+    end = len(data) if end is None else end
+    run = HeaderRun(next_offset=offset)
+    entries, offsets = run.entries, run.offsets
+    while offset + TAR_BLOCK <= end:
+        if _is_end_block(data, offset):
+            run.complete = True
+            break
+        entry, next_offset = _decode(data, offset)
+        entries.append(entry)
+        offsets.append(offset)
+        offset = next_offset
+    run.next_offset = offset
+    return run
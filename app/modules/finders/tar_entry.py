@@ -0,0 +1,215 @@
+"""
+Compact tar entry.
+
+A layer listing can hold hundreds of thousands of entries, most of which
+are only counted, filtered by name, or written to SQLite. TarEntry (in
+tar_parser, kept unchanged) is a plain dataclass whose mode and mtime
+display strings are built for every header as it is parsed.
+
+CompactTarEntry keeps what the header holds, as raw values in __slots__:
+the name and link target as bytes, mode bits, uid, gid and mtime as ints.
+The display fields are properties with the same names and values as
+TarEntry's:
+
+    name, linkname  decoded on first access, then kept in place of the bytes
+    mode            looked up in a table of the 512 permission strings per
+                    entry type, built once
+    mtime           formatted once per distinct timestamp (LRU cache)
+
+It also has to_dict() and as_tar_entry(), so it can stand in wherever a
+TarEntry is read, and from_dict() to rebuild one from a stored listing.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from typing import Union
+
+from app.modules.finders.tar_parser import TarEntry, _format_mtime
+
+
+# =============================================================================
+# Lookup Tables
+# =============================================================================
+
+# Typeflag -> ls type character (as tar_parser._mode_to_string maps them)
+TYPE_CHARS = {
+    "0": "-",
+    "\x00": "-",
+    "5": "d",
+    "2": "l",
+    "1": "h",
+    "3": "c",
+    "4": "b",
+    "6": "p",
+    "7": "-",
+}
+
+# rwx string for each 3-bit permission group
+_TRIADS = tuple(
+    ("r" if bits & 4 else "-") + ("w" if bits & 2 else "-") + ("x" if bits & 1 else "-")
+    for bits in range(8)
+)
+
+# Permission string for each value of the low 9 mode bits
+PERMISSION_STRINGS = tuple(
+    _TRIADS[bits >> 6] + _TRIADS[(bits >> 3) & 7] + _TRIADS[bits & 7]
+    for bits in range(0o1000)
+)
+
+# Type character -> the 512 full mode strings starting with it
+_MODE_STRINGS = {
+    type_char: tuple(type_char + perms for perms in PERMISSION_STRINGS)
+    for type_char in set(TYPE_CHARS.values())
+}
+
+# Permission string -> low 9 mode bits (the reverse of PERMISSION_STRINGS)
+_PERMISSION_BITS = {perms: bits for bits, perms in enumerate(PERMISSION_STRINGS)}
+
+
+def mode_string(mode_int: int, typeflag: str) -> str:
+    """ls-style permission string, e.g. 'drwxr-xr-x' (same as tar_parser._mode_to_string)."""
+    return _MODE_STRINGS[TYPE_CHARS.get(typeflag, "-")][mode_int & 0o777]
+
+
+@lru_cache(maxsize=16384)
+def mtime_string(mtime_unix: int) -> str:
+    """'YYYY-MM-DD HH:MM' (same as tar_parser._format_mtime), one format per timestamp."""
+    return _format_mtime(mtime_unix)
+
+
+def parse_mode_string(mode: str) -> int:
+    """Permission bits of an ls-style mode string (0 if unreadable); mode_string() reversed."""
+    return _PERMISSION_BITS.get((mode or "")[1:], 0)
+
+
+def parse_mtime_string(mtime: str) -> int:
+    """
+    Unix time of a 'YYYY-MM-DD HH:MM' string (0 if unreadable); mtime_string() reversed.
+    
+    Seconds are lost in the string, so this is the start of the minute,
+    which formats back to the same string.
+    """
+    try:
+        return int(datetime.strptime(mtime, "%Y-%m-%d %H:%M").timestamp())
+    except (TypeError, ValueError, OverflowError, OSError):
+        return 0
+
+
+# =============================================================================
+# Entry
+# =============================================================================
+
+class CompactTarEntry:
+    """A tar entry holding raw header values; reads like TarEntry."""
+    
+    __slots__ = ("_name", "size", "typeflag", "is_dir", "mode_int", "uid", "gid", "mtime_unix", "_linkname")
+    
+    def __init__(
+        self,
+        name: Union[bytes, str],
+        size: int,
+        typeflag: str,
+        is_dir: bool,
+        mode_int: int,
+        uid: int,
+        gid: int,
+        mtime_unix: int,
+        linkname: Union[bytes, str] = b"",
+    ):
+        self._name = name
+        self.size = size
+        self.typeflag = typeflag
+        self.is_dir = is_dir
+        self.mode_int = mode_int
+        self.uid = uid
+        self.gid = gid
+        self.mtime_unix = mtime_unix
+        self._linkname = linkname
+    
+    @classmethod
+    def from_dict(cls, fields) -> "CompactTarEntry":
+        """
+        Rebuild an entry from to_dict() output or a stored layer_entries row.
+        
+        mode and mtime are parsed back from their display strings, so only
+        what those show survives (permission bits, the minute).
+        """
+        return cls(
+            fields["name"],
+            fields["size"],
+            fields["typeflag"],
+            bool(fields["is_dir"]),
+            parse_mode_string(fields["mode"]),
+            fields["uid"],
+            fields["gid"],
+            parse_mtime_string(fields["mtime"]),
+            fields["linkname"] or "",
+        )
+    
+    @property
+    def name(self) -> str:
+        name = self._name
+        if type(name) is bytes:
+            name = self._name = name.decode("utf-8", errors="replace")
+        return name
+    
+    @property
+    def linkname(self) -> str:
+        linkname = self._linkname
+        if type(linkname) is bytes:
+            linkname = self._linkname = linkname.decode("utf-8", errors="replace")
+        return linkname
+    
+    @property
+    def name_bytes(self) -> bytes:
+        """The name as stored in the header (encoded again if already decoded)."""
+        name = self._name
+        return name if type(name) is bytes else name.encode("utf-8")
+    
+    @property
+    def mode(self) -> str:
+        return mode_string(self.mode_int, self.typeflag)
+    
+    @property
+    def mtime(self) -> str:
+        return mtime_string(self.mtime_unix)
+    
+    @property
+    def is_symlink(self) -> bool:
+        return self.typeflag == "2"
+    
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization (same keys as TarEntry.to_dict())."""
+        return {
+            "name": self.name,
+            "size": self.size,
+            "typeflag": self.typeflag,
+            "is_dir": self.is_dir,
+            "mode": self.mode,
+            "uid": self.uid,
+            "gid": self.gid,
+            "mtime": self.mtime,
+            "linkname": self.linkname,
+            "is_symlink": self.is_symlink,
+        }
+    
+    def as_tar_entry(self) -> TarEntry:
+        """Materialize an equivalent TarEntry."""
+        return TarEntry(**self.to_dict())
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (CompactTarEntry, TarEntry)):
+            return self.to_dict() == other.to_dict()
+        return NotImplemented
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return (
+            f"CompactTarEntry(name={self.name!r}, size={self.size}, typeflag={self.typeflag!r}, "
+            f"mode={self.mode!r}, uid={self.uid}, gid={self.gid}, mtime={self.mtime!r})"
+        )
+
+
+# Either entry type, for annotations of listings that may hold both
+AnyTarEntry = Union[TarEntry, CompactTarEntry]
@@ -0,0 +1,168 @@
+"""
+Header-only streaming tar walker.
+
+Listing a layer needs every 512-byte header but none of the file bodies.
+TarHeaderWalker is fed the decompressed stream in pieces of any size: it
+collects one header at a time, parses it, then counts off the entry's
+body (size rounded up to 512-byte blocks) as it streams past, without
+copying it anywhere. At most one partial header is ever buffered, so
+memory does not depend on how large the layer's files are.
+
+When the stream is an uncompressed tar read with Range requests, a body
+need not be read at all: skip_body() jumps the walker to the next
+header and the caller resumes reading there. resume_at() starts a
+walker mid-stream, where an earlier walk left off.
+"""
+
+from typing import List, Optional
+
+from app.modules.finders.tar_entry import CompactTarEntry
+from app.modules.finders.tar_decoder import decode_header, decode_headers
+
+
+TAR_BLOCK = 512
+ZERO_BLOCK = b"\x00" * TAR_BLOCK
+
+
+def is_tar_header(data: bytes) -> bool:
+    """
+    True if data starts with a tar header whose checksum is valid.
+    
+    Used to recognize uncompressed layers, which have no magic bytes of
+    their own (pre-POSIX headers lack the "ustar" magic).
+    """
+    header = data[:TAR_BLOCK]
+    if len(header) < TAR_BLOCK or header == ZERO_BLOCK:
+        return False
+    try:
+        stored = int(header[148:156].replace(b"\x00", b" ").strip(), 8)
+    except ValueError:
+        return False
+    # The checksum is computed with its own field read as spaces
+    return stored == sum(header[:148]) + 8 * ord(" ") + sum(header[156:])
+
+
+class TarHeaderWalker:
+    """
+    Tar state machine: header -> skip body -> header ... -> end marker.
+    
+    Usage:
+        walker = TarHeaderWalker()
+        for piece in decompressed_pieces:
+            for entry in walker.feed(piece):
+                # use entry...
+            if walker.complete:
+                break
+    """
+    
+    def __init__(self):
+        self._header = bytearray()  # Partial header carried across feeds
+        self._skip = 0              # Body bytes still to pass over
+        self.offset = 0             # Stream offset of the next byte fed
+        self.entries_found = 0
+        self.header_offsets: List[int] = []  # Stream offset of each entry's header
+        self.complete = False       # End-of-archive marker seen
+    
+    @classmethod
+    def resume_at(cls, offset: int, pending_header: bytes = b"", body_remaining: int = 0) -> "TarHeaderWalker":
+        """
+        A walker picking up at stream offset offset.
+        
+        Args:
+            offset: Stream offset of the next byte fed
+            pending_header: Start of a header the stream was split in
+            body_remaining: Body bytes (with padding) left before the next header
+        """
+        walker = cls()
+        walker.offset = offset
+        walker._header += pending_header
+        walker._skip = body_remaining
+        return walker
+    
+    @property
+    def pending_header(self) -> bytes:
+        """The partial header carried into the next feed, if any."""
+        return bytes(self._header)
+    
+    @property
+    def in_body(self) -> bool:
+        """True while the walker is passing over an entry's content."""
+        return self._skip > 0
+    
+    @property
+    def body_remaining(self) -> int:
+        """Body bytes (with padding) left before the next header."""
+        return self._skip
+    
+    def skip_body(self) -> int:
+        """
+        Pass over the rest of the current body without it being fed.
+        
+        Returns:
+            Stream offset of the next header, where feeding must resume
+        """
+        self.offset += self._skip
+        self._skip = 0
+        return self.offset
+    
+    def feed(self, data: bytes) -> List[CompactTarEntry]:
+        """
+        Walk the next piece of the decompressed stream.
+        
+        Returns:
+            Entries whose headers completed within this piece. Data after
+            the end-of-archive marker is ignored.
+        """
+        entries: List[CompactTarEntry] = []
+        view = memoryview(data)
+        pos = 0
+        end = len(view)
+        
+        while pos < end and not self.complete:
+            if self._skip:
+                step = min(self._skip, end - pos)
+                self._skip -= step
+                pos += step
+                continue
+            
+            # Every header that lies whole in data, decoded in place in one call
+            if not self._header and end - pos >= TAR_BLOCK:
+                run = decode_headers(view, pos, end)
+                entries.extend(run.entries)
+                self.header_offsets.extend(self.offset + offset for offset in run.offsets)
+                self.entries_found += len(run.entries)
+                if run.complete:
+                    self.complete = True
+                    pos = run.next_offset + TAR_BLOCK
+                elif run.next_offset > end:
+                    self._skip = run.next_offset - end
+                    pos = end
+                else:
+                    pos = run.next_offset
+                continue
+            
+            # A header split across pieces is collected first
+            take = min(TAR_BLOCK - len(self._header), end - pos)
+            self._header += view[pos:pos + take]
+            pos += take
+            if len(self._header) < TAR_BLOCK:
+                break
+            entry = self._parse(bytes(self._header))
+            self._header.clear()
+            if entry is not None:
+                entries.append(entry)
+                self.header_offsets.append(self.offset + pos - TAR_BLOCK)
+        
+        view.release()
+        self.offset += pos
+        return entries
+    
+    def _parse(self, header: bytes) -> Optional[CompactTarEntry]:
+        """Parse one complete header and set up the body skip."""
+        entry, next_offset = decode_header(header, 0)
+        if entry is None:
+            self.complete = True
+            return None
+        self._skip = next_offset - TAR_BLOCK
+        self.entries_found += 1
+        return entry
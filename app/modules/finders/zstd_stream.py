@@ -0,0 +1,105 @@
+"""
+Streaming zstd for OCI layers (application/vnd.oci.image.layer.v1.tar+zstd).
+
+ZstdFrameDecompressor is shaped like zlib's decompressobj(), so
+IncrementalZstdDecompressor can reuse all of IncrementalGzipDecompressor's
+buffering. A zstd layer may hold many frames (zstd:chunked writes one
+per file), and each frame decodes on its own: no window or bit position
+is needed to start at one. Frame starts are therefore recorded as
+checkpoints (GzipCheckpoint with an empty window) for carves to seek to.
+
+Needs the zstandard package (pip install zstandard). Where it is
+missing, zstd_available() is False and zstd layers are reported as
+unreadable instead.
+"""
+
+import importlib.util
+import zlib
+
+from app.modules.finders.gzip_index import GzipCheckpoint
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_INPUT_STEP = 32 * 1024     # Compressed bytes decoded per call (bounds output per step)
+
+
+def zstd_available() -> bool:
+    """True if the zstandard package is installed."""
+    return importlib.util.find_spec("zstandard") is not None
+
+
+class ZstdFrameDecompressor:
+    """
+    zlib.Decompress look-alike over a sequence of zstd frames.
+    
+    zstandard's decompressobj() stops at the end of a frame; this starts
+    a new one for each following frame and notes where frames begin.
+    Output is only bounded per ZSTD_INPUT_STEP of input, so max_length
+    can be overshot by one step's worth.
+    
+    Args:
+        in_offset: Blob offset of the first byte fed (a frame start)
+        out_offset: Decompressed stream offset that frame starts at
+        checkpoint_span: Record a frame start as a checkpoint every this
+                         many decompressed bytes (0 = none)
+    """
+    
+    def __init__(self, in_offset: int = 0, out_offset: int = 0, checkpoint_span: int = 0):
+        import zstandard
+        self._dctx = zstandard.ZstdDecompressor()
+        self._frame = self._dctx.decompressobj()
+        self._error = zstandard.ZstdError
+        self.in_offset = in_offset
+        self.out_offset = out_offset
+        self.checkpoint_span = checkpoint_span
+        self.checkpoints: list[GzipCheckpoint] = []
+        self._last = out_offset  # out_offset of the last checkpoint
+        self.unconsumed_tail = b""
+        self.unused_data = b""
+        self.eof = False  # Never set: another frame may always follow
+    
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        """
+        Decode data; like zlib.Decompress.decompress().
+        
+        Raises:
+            zlib.error: the stream is corrupt (raised as zlib's error so
+            callers handle both formats alike)
+        """
+        view = memoryview(data)
+        output = bytearray()
+        pos = 0
+        while pos < len(view) and (not max_length or len(output) < max_length):
+            step = view[pos:pos + ZSTD_INPUT_STEP]
+            try:
+                output += self._frame.decompress(step)
+            except self._error as e:
+                raise zlib.error(str(e)) from e
+            if not self._frame.eof:
+                pos += len(step)
+                continue
+            
+            # Frame ended inside this step: the next one starts right after it
+            pos += len(step) - len(self._frame.unused_data)
+            self._frame = self._dctx.decompressobj()
+            self._frame_start(self.in_offset + pos, self.out_offset + len(output))
+        
+        self.unconsumed_tail = bytes(view[pos:])
+        self.in_offset += pos
+        self.out_offset += len(output)
+        return bytes(output)
+    
+    def _frame_start(self, in_offset: int, out_offset: int) -> None:
+        if self.checkpoint_span and out_offset - self._last >= self.checkpoint_span:
+            self.checkpoints.append(GzipCheckpoint(
+                out_offset=out_offset,
+                in_offset=in_offset,
+                bits=0,
+                window=b"",
+            ))
+            self._last = out_offset
+
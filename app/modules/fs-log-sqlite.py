@@ -292,28 +292,30 @@ def search_by_name(pattern: str, owner: str = None, repo: str = None, tag: str =
         print(f"Error: Cannot connect to database '{db_path}': {e}")
         sys.exit(1)
     
-    # Build query with optional filters
+    # Build query with optional filters (images find shared layers through layer_links)
     query = """
-        SELECT owner, repo, tag, layer_index, name, size, mode, uid, gid, mtime, linkname, is_dir, is_symlink
-        FROM layer_entries
-        WHERE name LIKE ?
+        SELECT l.owner AS owner, l.repo AS repo, l.tag AS tag, l.layer_index AS layer_index,
+               e.name, e.size, e.mode, e.uid, e.gid, e.mtime, e.linkname, e.is_dir, e.is_symlink
+        FROM layer_links l
+        JOIN layer_entries e ON e.layer_digest = l.layer_digest
+        WHERE e.name LIKE ?
     """
     params = [f'%{pattern}%']
     
     if owner is not None:
-        query += " AND owner = ?"
+        query += " AND l.owner = ?"
         params.append(owner)
     if repo is not None:
-        query += " AND repo = ?"
+        query += " AND l.repo = ?"
         params.append(repo)
     if tag is not None:
-        query += " AND tag = ?"
+        query += " AND l.tag = ?"
         params.append(tag)
     if layer_index is not None:
-        query += " AND layer_index = ?"
+        query += " AND l.layer_index = ?"
         params.append(layer_index)
     
-    query += " ORDER BY owner, repo, tag, layer_index, name"
+    query += " ORDER BY l.owner, l.repo, l.tag, l.layer_index, e.name"
     
     try:
         cursor.execute(query, params)
@@ -371,10 +373,12 @@ def get_merged_layers(owner: str, repo: str, tag: str, target_path: str) -> list
     
     # Query all layers for this image
     query = """
-        SELECT name, size, mode, uid, gid, mtime, linkname, is_dir, is_symlink, layer_index
-        FROM layer_entries
-        WHERE owner = ? AND repo = ? AND tag = ?
-        ORDER BY layer_index ASC, name
+        SELECT e.name, e.size, e.mode, e.uid, e.gid, e.mtime, e.linkname, e.is_dir, e.is_symlink,
+               l.layer_index AS layer_index
+        FROM layer_links l
+        JOIN layer_entries e ON e.layer_digest = l.layer_digest
+        WHERE l.owner = ? AND l.repo = ? AND l.tag = ?
+        ORDER BY l.layer_index ASC, e.name
     """
     
     try:
@@ -551,9 +555,10 @@ Examples:
         
         # Query layer entries
         query = """
-            SELECT name, size, mode, uid, gid, mtime, linkname, is_dir, is_symlink
-            FROM layer_entries
-            WHERE owner = ? AND repo = ? AND tag = ? AND layer_index = ?
+            SELECT e.name, e.size, e.mode, e.uid, e.gid, e.mtime, e.linkname, e.is_dir, e.is_symlink
+            FROM layer_links l
+            JOIN layer_entries e ON e.layer_digest = l.layer_digest
+            WHERE l.owner = ? AND l.repo = ? AND l.tag = ? AND l.layer_index = ?
         """
         
         try:
@@ -1,10 +1,15 @@
 from .downloaders import get_manifest, download_layer_blob, fetch_build_steps
-from .layerSlayerResults import layerslayer, LayerPeekResult
+from .layerSlayerResults import layerslayer, layerslayer_async, LayerPeekResult
 from .carver import carve_file, carve_file_to_bytes, CarveResult
 from . import storage
 from .storage import (
     init_database,
     check_layer_exists,
+    get_indexed_layer,
+    load_layer_result,
+    link_layer,
+    save_peek_continuation,
+    get_peek_continuation,
     save_layer_result,
     save_layer_json,
     save_layer_sqlite,
@@ -4,17 +4,41 @@
 #
 # Based on: https://github.com/thesavant42/dockerdorker/blob/main/app/modules/carve/carve-file-from-layer.py
 
+import asyncio
+import os
 import time
 import zlib
+import httpx
 import requests
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional
 
 from app.modules.formatters import parse_image_ref, registry_base_url
-from app.modules.finders.tar_parser import TarEntry, parse_tar_header
+from app.modules.finders.tar_entry import CompactTarEntry
+from app.modules.finders.tar_decoder import decode_header
 from app.modules.auth import RegistryAuth
-from app.modules.keepers.storage import init_database, find_file_layers, get_cached_layers
+from app.modules.auth.async_auth import AsyncRegistryAuth
+from app.modules.finders.peekers import (
+    IncrementalBlobReader,
+    IncrementalGzipDecompressor,
+    layer_compression,
+    new_decompressor,
+)
+from app.modules.finders.async_peekers import AsyncBlobReader
+from app.modules.finders.prefetch import PrefetchingBlobReader
+from app.modules.finders.chunk_schedule import ChunkSchedule, ADAPTIVE_MAX_CHUNK
+from app.modules.finders.gzip_index import GzipCheckpoint, index_supported
+from app.modules.finders.estargz import has_toc, read_toc, read_file
+from app.modules.keepers.storage import (
+    DEFAULT_DB_PATH,
+    init_database,
+    find_file_layers,
+    get_cached_layers,
+    get_entry_location,
+    get_gzip_checkpoint,
+    get_gzip_read_end,
+)
 
 
 # =============================================================================
@@ -24,6 +48,10 @@ from app.modules.keepers.storage import init_database, find_file_layers, get_cac
 DEFAULT_CHUNK_SIZE = 65536  # 64KB chunks
 DEFAULT_OUTPUT_DIR = "./carved"
 
+# Slack added to the compressed-bytes estimate once the target is found
+CONTENT_HINT_SLACK = 1.1
+CONTENT_HINT_MARGIN = 16 * 1024
+
 
 # =============================================================================
 # Data Classes
@@ -33,12 +61,26 @@ DEFAULT_OUTPUT_DIR = "./carved"
 class ScanResult:
     """Result of scanning for a target file in tar data."""
     found: bool
-    entry: Optional[TarEntry] = None
-    content_offset: int = 0  # Offset in decompressed buffer where content starts
+    entry: Optional[CompactTarEntry] = None
+    content_offset: int = 0  # Offset in decompressed stream where content starts
     content_size: int = 0
     entries_scanned: int = 0
 
 
+@dataclass
+class SeekPlan:
+    """Where a carve of an already-peeked layer reads from, taken from the peek's database rows."""
+    content_offset: int     # Decompressed offset of the target's content
+    content_size: int
+    checkpoint: Optional[GzipCheckpoint] = None  # Inflate from here instead of the layer start
+    read_until: int = 0     # Blob offset by which the content has inflated (0 = unknown)
+    
+    @property
+    def read_from(self) -> int:
+        """Blob offset the carve's reads start at."""
+        return self.checkpoint.read_from if self.checkpoint else 0
+
+
 @dataclass
 class CarveResult:
     """Result of a file carving operation."""
@@ -53,6 +95,8 @@ class CarveResult:
     layer_index: Optional[int] = None  # Which layer the file came from
     layers_searched: int = 0
     error: Optional[str] = None
+    chunk_schedule: list[list[int]] = field(default_factory=list)  # [[chunk size, count], ...]
+    seek_offset: int = 0  # Blob offset reading started at (a gzip checkpoint, or 0)
     
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization."""
@@ -68,6 +112,8 @@ class CarveResult:
             "layer_index": self.layer_index,
             "layers_searched": self.layers_searched,
             "error": self.error,
+            "chunk_schedule": self.chunk_schedule,
+            "seek_offset": self.seek_offset,
         }
 
 
@@ -81,6 +127,7 @@ class LayerInfo:
     digest: str
     size: int
     media_type: str
+    has_toc: bool = False   # Annotated as eStargz, so worth probing for a TOC
 
 
 def _fetch_manifest(auth: RegistryAuth, namespace: str, repo: str, tag: str) -> list[LayerInfo]:
@@ -105,7 +152,22 @@ def _fetch_manifest(auth: RegistryAuth, namespace: str, repo: str, tag: str) ->
         print(f"  [!] Error fetching manifest: {e}")
         return []
     
-    # Handle manifest list (multi-arch) - pick first amd64/linux
+    # Handle manifest list (multi-arch) - fetch the amd64/linux manifest
+    digest = _platform_manifest_digest(manifest)
+    if digest:
+        url = f"{registry_base_url(namespace, repo)}/manifests/{digest}"
+        resp = auth.request_with_retry("GET", url, timeout=30)
+        resp.raise_for_status()
+        manifest = resp.json()
+    
+    return _manifest_layers(manifest)
+
+
+def _platform_manifest_digest(manifest: dict) -> Optional[str]:
+    """
+    For a manifest list (multi-arch), return the digest of the amd64/linux
+    manifest (or the first one). None for a single-platform manifest.
+    """
     media_type = manifest.get("mediaType", "")
     if "manifest.list" in media_type or "image.index" in media_type:
         manifests = manifest.get("manifests", [])
@@ -120,144 +182,24 @@ def _fetch_manifest(auth: RegistryAuth, namespace: str, repo: str, tag: str) ->
             target = manifests[0]  # Fallback to first
         
         if target:
-            # Fetch the actual manifest
-            digest = target.get("digest")
-            url = f"{registry_base_url(namespace, repo)}/manifests/{digest}"
-            resp = auth.request_with_retry("GET", url, timeout=30)
-            resp.raise_for_status()
-            manifest = resp.json()
+            return target.get("digest")
+    return None
     
-    # Extract layers
+
+def _manifest_layers(manifest: dict) -> list[LayerInfo]:
+    """Extract LayerInfo for each layer of an image manifest (base layer first)."""
     layers = []
     for layer in manifest.get("layers", []):
         layers.append(LayerInfo(
             digest=layer.get("digest", ""),
             size=layer.get("size", 0),
             media_type=layer.get("mediaType", ""),
+            has_toc=has_toc(layer),
         ))
     
     return layers
 
 
-# =============================================================================
-# Incremental Gzip Decompressor
-# =============================================================================
-
-class IncrementalGzipDecompressor:
-    """
-    Decompresses gzip data incrementally, maintaining state across chunk feeds.
-    """
-    
-    def __init__(self):
-        # 16 + MAX_WBITS tells zlib to expect gzip format
-        self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
-        self.buffer = b""
-        self.bytes_decompressed = 0
-        self.error: Optional[str] = None
-    
-    def feed(self, compressed_data: bytes) -> bytes:
-        """
-        Feed compressed data and return newly decompressed bytes.
-        Also appends to internal buffer.
-        """
-        if not compressed_data:
-            return b""
-        
-        try:
-            decompressed = self.decompressor.decompress(compressed_data)
-            self.buffer += decompressed
-            self.bytes_decompressed += len(decompressed)
-            return decompressed
-        except zlib.error as e:
-            self.error = str(e)
-            return b""
-    
-    def get_buffer(self) -> bytes:
-        """Return the full decompressed buffer."""
-        return self.buffer
-
-
-# =============================================================================
-# Incremental Blob Reader
-# =============================================================================
-
-class IncrementalBlobReader:
-    """
-    Fetches blob data in chunks using HTTP Range requests.
-    """
-    
-    def __init__(
-        self,
-        auth: RegistryAuth,
-        namespace: str,
-        repo: str,
-        digest: str,
-        chunk_size: int = DEFAULT_CHUNK_SIZE,
-    ):
-        self.auth = auth
-        self.url = f"{registry_base_url(namespace, repo)}/blobs/{digest}"
-        self.chunk_size = chunk_size
-        self.current_offset = 0
-        self.bytes_downloaded = 0
-        self.total_size = 0  # Set after first request
-        self.exhausted = False
-    
-    def fetch_chunk(self) -> bytes:
-        """
-        Fetch the next chunk of data. Returns empty bytes if exhausted.
-        """
-        if self.exhausted:
-            return b""
-        
-        end_offset = self.current_offset + self.chunk_size - 1
-        
-        # Get session and add Range header
-        session = self.auth.get_session()
-        headers = {"Range": f"bytes={self.current_offset}-{end_offset}"}
-        
-        try:
-            resp = session.get(self.url, headers=headers, stream=True, timeout=30)
-            
-            # Check response - 416 means range not satisfiable (past end)
-            if resp.status_code == 416:
-                self.exhausted = True
-                return b""
-            
-            # Handle 401 by refreshing token and retrying
-            if resp.status_code == 401:
-                self.auth._token = None
-                session = self.auth.get_session()
-                resp = session.get(self.url, headers=headers, stream=True, timeout=30)
-            
-            resp.raise_for_status()
-            
-            # Get total size from Content-Range header
-            content_range = resp.headers.get("Content-Range", "")
-            if "/" in content_range:
-                self.total_size = int(content_range.split("/")[-1])
-            
-            data = resp.raw.read(self.chunk_size)
-            resp.close()
-            
-            if not data:
-                self.exhausted = True
-                return b""
-            
-            self.bytes_downloaded += len(data)
-            self.current_offset += len(data)
-            
-            # Check if we've reached the end
-            if self.total_size and self.current_offset >= self.total_size:
-                self.exhausted = True
-            
-            return data
-            
-        except requests.RequestException as e:
-            print(f"  [!] Error fetching chunk: {e}")
-            self.exhausted = True
-            return b""
-
-
 # =============================================================================
 # Tar Scanner
 # =============================================================================
@@ -271,6 +213,15 @@ class TarScanner:
         self.target_path = self._normalize_path(target_path)
         self.entries_scanned = 0
         self.current_offset = 0
+        self.located: Optional[ScanResult] = None  # Set when the peek already found the target
+    
+    def locate(self, content_offset: int, content_size: int) -> None:
+        """Take the target's position from a peek; scan() then parses no headers."""
+        self.located = ScanResult(
+            found=True,
+            content_offset=content_offset,
+            content_size=content_size,
+        )
     
     def _normalize_path(self, path: str) -> str:
         """Normalize path for comparison (remove leading ./ or /)."""
@@ -286,37 +237,47 @@ class TarScanner:
         normalized = self._normalize_path(entry_name)
         return normalized == self.target_path
     
-    def scan(self, data: bytes) -> ScanResult:
+    def scan(self, data: bytes, base: int = 0) -> ScanResult:
         """
         Scan buffer for target file.
         
+        data holds the decompressed stream from offset base on (see
+        IncrementalGzipDecompressor.window_start); current_offset and the
+        returned content_offset are stream offsets.
+        
         Returns ScanResult indicating whether file was found and where.
         Updates internal state to continue scanning from where we left off.
         """
-        while self.current_offset + 512 <= len(data):
-            entry, next_offset = parse_tar_header(data, self.current_offset)
-            
-            if entry is None:
-                # End of archive or invalid header
-                break
-            
-            self.entries_scanned += 1
-            
-            # Check if this is our target
-            if self._matches(entry.name):
-                content_offset = self.current_offset + 512
-                return ScanResult(
-                    found=True,
-                    entry=entry,
-                    content_offset=content_offset,
-                    content_size=entry.size,
-                    entries_scanned=self.entries_scanned,
-                )
-            
-            # Move to next header
-            if next_offset <= self.current_offset:
-                break
-            self.current_offset = next_offset
+        if self.located is not None:
+            return self.located
+        
+        # Headers are decoded in place (data is often the decompressor's buffer)
+        with memoryview(data) as view:
+            while self.current_offset + 512 <= base + len(view):
+                entry, next_offset = decode_header(view, self.current_offset - base)
+                
+                if entry is None:
+                    # End of archive or invalid header
+                    break
+                
+                self.entries_scanned += 1
+                
+                # Check if this is our target
+                if self._matches(entry.name):
+                    content_offset = self.current_offset + 512
+                    return ScanResult(
+                        found=True,
+                        entry=entry,
+                        content_offset=content_offset,
+                        content_size=entry.size,
+                        entries_scanned=self.entries_scanned,
+                    )
+                
+                # Move to next header
+                next_offset += base
+                if next_offset <= self.current_offset:
+                    break
+                self.current_offset = next_offset
         
         return ScanResult(
             found=False,
@@ -364,35 +325,357 @@ def extract_and_save(
 # Main Carving Logic
 # =============================================================================
 
-def carve_file(
-    image_ref: str,
+def _make_reader(
+    auth: RegistryAuth,
+    namespace: str,
+    repo: str,
+    digest: str,
+    chunk_size: int,
+    readahead_bytes: int,
+    adaptive: bool,
+    plan: Optional[SeekPlan] = None,
+):
+    """Build the blob reader (adaptive or fixed chunks, optional read-ahead) for a carve."""
+    schedule = ChunkSchedule.adaptive(maximum=ADAPTIVE_MAX_CHUNK) if adaptive else None
+    reader = IncrementalBlobReader(
+        auth, namespace, repo, digest, chunk_size, schedule=schedule,
+        offset=plan.read_from if plan else 0,
+        limit=plan.read_until if plan else 0,
+    )
+    if readahead_bytes:
+        reader = PrefetchingBlobReader(reader, depth=readahead_bytes)
+    return reader
+
+
+def _seek_plan(digest: str, target_path: str, compression: str) -> Optional[SeekPlan]:
+    """
+    Look up where the target sits in an already-peeked layer.
+    
+    Checkpoints are used for zstd layers (frame starts) and, where libz
+    is available, gzip layers. An uncompressed layer needs none: the
+    content's stream offset is its blob offset.
+    
+    Returns:
+        SeekPlan, or None if the layer was not peeked (the carve then
+        scans headers from the start of the layer)
+    """
+    if not os.path.exists(DEFAULT_DB_PATH):
+        return None
+    conn = init_database(DEFAULT_DB_PATH)
+    try:
+        location = get_entry_location(conn, digest, target_path)
+        if location is None:
+            return None
+        plan = SeekPlan(content_offset=location["content_offset"], content_size=location["size"])
+        if compression == "none":
+            plan.checkpoint = GzipCheckpoint(
+                out_offset=plan.content_offset,
+                in_offset=plan.content_offset,
+                bits=0,
+                window=b"",
+            )
+            plan.read_until = plan.content_offset + plan.content_size
+            return plan
+        if compression == "gzip" and not index_supported():
+            return plan
+        if location["checkpoint_offset"] is not None:
+            plan.checkpoint = get_gzip_checkpoint(conn, digest, location["checkpoint_offset"])
+        plan.read_until = get_gzip_read_end(conn, digest, plan.content_offset + plan.content_size) or 0
+        return plan
+    finally:
+        conn.close()
+
+
+def _start_scan(
     target_path: str,
+    plan: Optional[SeekPlan],
+    compression: str,
+) -> tuple[IncrementalGzipDecompressor, TarScanner]:
+    """
+    Build the decompressor and scanner for a carve.
+    
+    With a plan, no header is parsed: everything before the target's
+    content is dropped as it inflates, starting at the plan's checkpoint
+    if it has one (the reader must start at plan.read_from).
+    
+    Raises:
+        ImportError: zstd layer, but zstandard is not installed
+    """
+    scanner = TarScanner(target_path)
+    if plan is None:
+        return new_decompressor(compression), scanner
+    decompressor = new_decompressor(compression, plan.checkpoint)
+    scanner.locate(plan.content_offset, plan.content_size)
+    decompressor.consume(plan.content_offset)
+    return decompressor, scanner
+
+
+def _carve_from_toc(
+    auth: RegistryAuth,
+    namespace: str,
+    repo: str,
+    layer: LayerInfo,
     layer_index: int,
-    output_dir: str = DEFAULT_OUTPUT_DIR,
-    chunk_size: int = DEFAULT_CHUNK_SIZE,
-    verbose: bool = True,
-) -> CarveResult:
+    target_path: str,
+    start_time: float,
+    verbose: bool,
+) -> tuple[Optional[tuple[Optional[bytes], CarveResult]], int]:
     """
-    Carve a single file from a Docker image layer.
+    Carve from an eStargz layer by fetching only the target's gzip members.
     
-    Uses HTTP Range requests to fetch compressed data incrementally,
-    decompresses on-the-fly, and stops as soon as the target file
-    is fully extracted.
+    Returns:
+        (carved, bytes downloaded). carved is (content, CarveResult), with
+        content None if a member of the target is corrupt; or None if the
+        layer has no TOC or the target is not a regular file in it (the
+        carve then scans as usual, counting the bytes spent here)
+    """
+    url = f"{registry_base_url(namespace, repo)}/blobs/{layer.digest}"
+    toc, probe_bytes = read_toc(auth, url)
+    if toc is None:
+        return None, probe_bytes
+    try:
+        carved = read_file(auth, url, toc, target_path)
+    except zlib.error as e:
+        error = f"Corrupt eStargz chunk: {e}"
+        if verbose:
+            print(f"  [!] {error}")
+        return (None, CarveResult(
+            found=False,
+            target_file=target_path,
+            bytes_downloaded=probe_bytes,
+            elapsed_time=time.time() - start_time,
+            layers_searched=1,
+            error=error,
+        )), probe_bytes
+    if carved is None:
+        return None, probe_bytes
+    content, downloaded = carved
+    downloaded += probe_bytes
+    chunks = toc.file_chunks(target_path)
+    
+    elapsed = time.time() - start_time
+    efficiency = (downloaded / layer.size * 100) if layer.size else 0
+    if verbose:
+        print(f"  FOUND via eStargz TOC: {target_path} ({len(content):,} bytes)")
+        print(f"Stats: Downloaded {downloaded:,} bytes "
+              f"of {layer.size:,} byte layer ({efficiency:.1f}%) in {elapsed:.2f}s")
+    
+    return (content, CarveResult(
+        found=True,
+        target_file=target_path,
+        bytes_downloaded=downloaded,
+        layer_size=layer.size,
+        efficiency_pct=efficiency,
+        elapsed_time=elapsed,
+        layer_digest=layer.digest,
+        layer_index=layer_index,
+        layers_searched=1,
+        seek_offset=chunks[0].offset if chunks else 0,
+    )), downloaded
+
+
+def _hint_content_remaining(reader, decompressor: IncrementalGzipDecompressor, bytes_needed: int):
+    """
+    Tell the reader roughly how many compressed bytes are left to read
+    for the target's content, so the last chunks are not oversized.
     
-    IMPORTANT: layer_index is REQUIRED. Use /peek to discover which layers
-    contain the target file. This prevents accidentally scanning all layers
-    and ensures you get the specific version of the file you need.
+    Estimated from the compression ratio seen so far.
+    """
+    decompressed = decompressor.bytes_decompressed
+    missing = bytes_needed - decompressor.end_offset
+    if missing <= 0 or not decompressed:
+        return
+    ratio = (reader.current_offset - reader.start_offset) / decompressed
+    reader.hint_remaining(int(missing * ratio * CONTENT_HINT_SLACK) + CONTENT_HINT_MARGIN)
+
+
+class LayerCarve:
+    """
+    I/O-free core of a carve: inflate one layer's chunks, find the
+    target's header, and stop once its content has inflated.
     
-    Args:
-        image_ref: Image reference (e.g., "nginx:alpine", "ubuntu:24.04")
-        target_path: Target file path in container (e.g., "/etc/passwd")
-        layer_index: Layer index to extract from (REQUIRED). Use /peek to find layer indices.
-        output_dir: Output directory for carved file (default: ./carved)
-        chunk_size: Fetch chunk size in bytes (default: 64KB)
-        verbose: Whether to show detailed progress output
+    Shared by the sync and async carves, which only differ in how chunks
+    are fetched (as peekers.LayerPeekParser is for peeks).
+    
+    Usage:
+        carve = LayerCarve(target_path, layer, layer_index, compression, plan)
+        try:
+            while carve.wants_more(reader):
+                compressed = reader.fetch_chunk()
+                if not compressed:
+                    break
+                carve.feed(compressed, reader)
+        finally:
+            reader.close()
+        content, result = carve.result(reader, start_time)
+    """
+    
+    def __init__(
+        self,
+        target_path: str,
+        layer: LayerInfo,
+        layer_index: int,
+        compression: str,
+        plan: Optional[SeekPlan] = None,
+        verbose: bool = False,
+        spent: int = 0,
+    ):
+        self.target_path = target_path
+        self.layer = layer
+        self.layer_index = layer_index
+        self.compression = compression
+        self.seek_offset = plan.read_from if plan else 0
+        self.verbose = verbose
+        self.spent = spent      # Bytes downloaded before the scan (an eStargz TOC probe)
+        self.found: Optional[ScanResult] = None
+        self.stopped = False    # Not this compression, or the stream is unreadable
+        self.error: Optional[str] = None
+        self.chunks_fetched = 0
+        try:
+            self.decompressor, self.scanner = _start_scan(target_path, plan, compression)
+        except ImportError as e:
+            self.error = str(e)
+            self.stopped = True
+            self._log(f"  [!] {self.error}")
+    
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+    
+    @property
+    def bytes_needed(self) -> int:
+        """Stream offset the target's content ends at (0 until it is found)."""
+        return self.found.content_offset + self.found.content_size if self.found else 0
+    
+    @property
+    def complete(self) -> bool:
+        """True once the target's whole content has inflated."""
+        return self.found is not None and self.decompressor.end_offset >= self.bytes_needed
+    
+    def wants_more(self, reader) -> bool:
+        """True while another chunk is needed and the reader has one; hints the reader once the target is found."""
+        if self.stopped or self.complete or reader.exhausted:
+            return False
+        if self.found is not None:
+            _hint_content_remaining(reader, self.decompressor, self.bytes_needed)
+        return True
+    
+    def feed(self, compressed: bytes, reader):
+        """Inflate one chunk and scan it for the target (reader only supplies progress figures)."""
+        self.chunks_fetched += 1
+        
+        # Check magic bytes on first chunk (a checkpoint starts mid-stream)
+        if self.chunks_fetched == 1 and not self.seek_offset:
+            if layer_compression(head=compressed) != self.compression:
+                self._log(f"  Layer is not {self.compression} compressed, skipping")
+                self.stopped = True
+                return
+        
+        decompressor = self.decompressor
+        decompressor.feed(compressed)
+        if decompressor.error:
+            self._log(f"  Decompression error: {decompressor.error}")
+            self.stopped = True
+            return
+        
+        if self.found is not None:
+            self._log(f"  Fetching more for file content... "
+                      f"Have {decompressor.end_offset:,} / need {self.bytes_needed:,}")
+        else:
+            # Scan for target, then release the headers already scanned
+            scan = self.scanner.scan(decompressor.get_buffer(), decompressor.window_start)
+            if scan.found:
+                self.found = scan
+            else:
+                decompressor.consume(self.scanner.current_offset)
+            self._log(f"  Downloaded: {reader.bytes_downloaded:,}B -> "
+                      f"Decompressed: {decompressor.bytes_decompressed:,}B -> "
+                      f"Entries: {self.scanner.entries_scanned}")
+        
+        if self.complete:
+            self._log(f"  FOUND: {self.target_path} ({self.found.content_size:,} bytes) "
+                      f"at entry #{self.found.entries_scanned}")
+    
+    def result(self, reader, start_time: float) -> tuple[Optional[bytes], CarveResult]:
+        """
+        The target's content (None if it was not carved) and the CarveResult.
         
+        Call once the reader is closed (or with None if none was opened),
+        so its byte counters are final.
+        """
+        elapsed = time.time() - start_time
+        if self.complete:
+            downloaded = reader.bytes_downloaded + self.spent
+            efficiency = (downloaded / self.layer.size * 100) if self.layer.size else 0
+            self._log(f"Stats: Downloaded {downloaded:,} bytes "
+                      f"of {self.layer.size:,} byte layer ({efficiency:.1f}%) in {elapsed:.2f}s")
+            content = self.decompressor.get_range(self.found.content_offset, self.bytes_needed)
+            return content, CarveResult(
+                found=True,
+                target_file=self.target_path,
+                bytes_downloaded=downloaded,
+                layer_size=self.layer.size,
+                efficiency_pct=efficiency,
+                elapsed_time=elapsed,
+                layer_digest=self.layer.digest,
+                layer_index=self.layer_index,
+                layers_searched=1,
+                chunk_schedule=reader.schedule.runs(),
+                seek_offset=self.seek_offset,
+            )
+        
+        if self.found is not None:
+            self._log("  [!] Found file but couldn't get full content")
+            self._log(f"      Have {self.decompressor.end_offset:,} bytes, need {self.bytes_needed:,}")
+        error = self.error
+        if reader is not None and reader.error:
+            # Retries ran out mid-layer: the file may be there, unread
+            error = f"Blob read failed: {reader.error}"
+            self._log(f"  [!] {error}")
+        self._log(f"\nFile not found: {self.target_path} (searched 1 layers in {elapsed:.2f}s)")
+        
+        return None, CarveResult(
+            found=False,
+            target_file=self.target_path,
+            elapsed_time=elapsed,
+            layers_searched=1,
+            error=error,
+        )
+
+
+def _check_layer_index(layers: list[LayerInfo], layer_index: int, target_path: str) -> Optional[CarveResult]:
+    """A failed CarveResult if the manifest had no layers or layer_index is out of range, else None."""
+    if not layers:
+        return CarveResult(
+            found=False,
+            target_file=target_path,
+            error="No layers found in manifest",
+        )
+    if layer_index < 0 or layer_index >= len(layers):
+        return CarveResult(
+            found=False,
+            target_file=target_path,
+            error=f"Layer index {layer_index} out of range. Valid range: 0-{len(layers)-1}. Use /peek to discover layer indices.",
+        )
+    return None
+
+
+def _carve(
+    image_ref: str,
+    target_path: str,
+    layer_index: int,
+    chunk_size: int,
+    verbose: bool,
+    readahead_bytes: int,
+    adaptive: bool,
+) -> tuple[Optional[bytes], CarveResult]:
+    """
+    Carve a file from one layer and return its content.
+    
+    The sync carve behind carve_file() and carve_file_to_bytes().
+    
     Returns:
-        CarveResult with extraction stats and status
+        Tuple of (file_bytes or None, CarveResult)
     """
     start_time = time.time()
     
@@ -406,148 +689,102 @@ def carve_file(
     auth = RegistryAuth(namespace, repo)
     
     try:
-        # Step 2: Get manifest and layers
+        # Step 2: Get manifest and layers, and validate layer_index (required)
         layers = _fetch_manifest(auth, namespace, repo, tag)
-        if not layers:
-            return CarveResult(
-                found=False,
-                target_file=target_path,
-                error="No layers found in manifest",
-            )
-        
-        # Validate layer_index (required parameter)
-        if layer_index < 0 or layer_index >= len(layers):
-            return CarveResult(
-                found=False,
-                target_file=target_path,
-                error=f"Layer index {layer_index} out of range. Valid range: 0-{len(layers)-1}. Use /peek to discover layer indices.",
-            )
-        layers_to_search = [(layer_index, layers[layer_index])]
+        failed = _check_layer_index(layers, layer_index, target_path)
+        if failed is not None:
+            return None, failed
+        layer = layers[layer_index]
         
         if verbose:
             print(f"Found {len(layers)} layer(s). Searching for {target_path}...\n")
+            print(f"Scanning layer {layer_index+1}/{len(layers)}: {layer.digest[:20]}...")
+            print(f"  Layer size: {layer.size:,} bytes")
+        
+        # Step 3: Initialize components; a peeked layer needs no header scan
+        compression = layer_compression(layer.media_type) or "gzip"
+        plan = _seek_plan(layer.digest, target_path, compression)
+        spent = 0
+        if plan is None and compression == "gzip" and layer.has_toc:
+            carved, spent = _carve_from_toc(
+                auth, namespace, repo, layer, layer_index, target_path, start_time, verbose,
+            )
+            if carved is not None:
+                return carved
+        carve = LayerCarve(target_path, layer, layer_index, compression, plan, verbose, spent)
+        if carve.stopped:
+            return carve.result(None, start_time)
         
-        # Step 3: Scan each layer
-        for i, layer in layers_to_search:
-            if verbose:
-                print(f"Scanning layer {i+1}/{len(layers)}: {layer.digest[:20]}...")
-                print(f"  Layer size: {layer.size:,} bytes")
-            
-            # Initialize components
-            reader = IncrementalBlobReader(auth, namespace, repo, layer.digest, chunk_size)
-            decompressor = IncrementalGzipDecompressor()
-            scanner = TarScanner(target_path)
-            
-            # Stream and scan
-            chunks_fetched = 0
-            while not reader.exhausted:
-                # Fetch next chunk
+        reader = _make_reader(
+            auth, namespace, repo, layer.digest,
+            chunk_size, readahead_bytes, adaptive, plan,
+        )
+        if plan and verbose:
+            read_until = f"{plan.read_until:,}" if plan.read_until else "end"
+            print(f"  Known from peek: content at {plan.content_offset:,}, "
+                  f"reading blob bytes {carve.seek_offset:,}-{read_until}")
+        
+        # Step 4: Stream and scan, dropping the connection once done
+        try:
+            while carve.wants_more(reader):
                 compressed = reader.fetch_chunk()
                 if not compressed:
                     break
-                
-                chunks_fetched += 1
-                
-                # Check gzip magic on first chunk
-                if chunks_fetched == 1:
-                    if len(compressed) < 2 or compressed[0:2] != b'\x1f\x8b':
-                        if verbose:
-                            print(f"  Layer is not gzip compressed, skipping")
-                        break
-                
-                # Decompress
-                decompressor.feed(compressed)
-                
-                if decompressor.error:
-                    if verbose:
-                        print(f"  Decompression error: {decompressor.error}")
-                    break
-                
-                # Scan for target
-                result = scanner.scan(decompressor.get_buffer())
-                
-                if verbose:
-                    print(f"  Downloaded: {reader.bytes_downloaded:,}B -> "
-                          f"Decompressed: {decompressor.bytes_decompressed:,}B -> "
-                          f"Entries: {scanner.entries_scanned}")
-                
-                if result.found:
-                    # Check if we have enough data for the file content
-                    buffer = decompressor.get_buffer()
-                    bytes_needed = result.content_offset + result.content_size
-                    
-                    # Fetch more if needed
-                    while len(buffer) < bytes_needed and not reader.exhausted:
-                        compressed = reader.fetch_chunk()
-                        if not compressed:
-                            break
-                        decompressor.feed(compressed)
-                        buffer = decompressor.get_buffer()
-                        if verbose:
-                            print(f"  Fetching more for file content... "
-                                  f"Have {len(buffer):,} / need {bytes_needed:,}")
-                    
-                    buffer = decompressor.get_buffer()
-                    if len(buffer) >= bytes_needed:
-                        # Found and have full content!
-                        if verbose:
-                            print(f"  FOUND: {target_path} ({result.content_size:,} bytes) "
-                                  f"at entry #{result.entries_scanned}")
-                        
-                        # Extract and save
-                        saved_path = extract_and_save(
-                            buffer,
-                            result.content_offset,
-                            result.content_size,
-                            target_path,
-                            output_dir,
-                        )
-                        
-                        elapsed = time.time() - start_time
-                        efficiency = (reader.bytes_downloaded / layer.size * 100) if layer.size else 0
-                        
-                        if verbose:
-                            print(f"\nDone! File saved to: {saved_path}")
-                            print(f"Stats: Downloaded {reader.bytes_downloaded:,} bytes "
-                                  f"of {layer.size:,} byte layer ({efficiency:.1f}%) "
-                                  f"in {elapsed:.2f}s")
-                        
-                        return CarveResult(
-                            found=True,
-                            saved_path=saved_path,
-                            target_file=target_path,
-                            bytes_downloaded=reader.bytes_downloaded,
-                            layer_size=layer.size,
-                            efficiency_pct=efficiency,
-                            elapsed_time=elapsed,
-                            layer_digest=layer.digest,
-                            layer_index=i,
-                            layers_searched=len(layers_to_search),
-                        )
-                    else:
-                        if verbose:
-                            print(f"  [!] Found file but couldn't get full content")
-                            print(f"      Have {len(buffer):,} bytes, need {bytes_needed:,}")
-            
-            if verbose:
-                print()  # Blank line between layers
-        
-        elapsed = time.time() - start_time
-        if verbose:
-            print(f"File not found: {target_path} (searched {len(layers_to_search)} layers in {elapsed:.2f}s)")
-        
-        return CarveResult(
-            found=False,
-            target_file=target_path,
-            elapsed_time=elapsed,
-            layers_searched=len(layers_to_search),
-        )
+                carve.feed(compressed, reader)
+        finally:
+            reader.close()
+        return carve.result(reader, start_time)
     
     finally:
         # Always invalidate auth session when done
         auth.invalidate()
 
 
+def carve_file(
+    image_ref: str,
+    target_path: str,
+    layer_index: int,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    verbose: bool = True,
+    readahead_bytes: int = 0,
+    adaptive: bool = True,
+) -> CarveResult:
+    """
+    Carve a single file from a Docker image layer.
+    
+    Uses HTTP Range requests to fetch compressed data incrementally,
+    decompresses on-the-fly, and stops as soon as the target file
+    is fully extracted.
+    
+    IMPORTANT: layer_index is REQUIRED. Use /peek to discover which layers
+    contain the target file. This prevents accidentally scanning all layers
+    and ensures you get the specific version of the file you need.
+    
+    Args:
+        image_ref: Image reference (e.g., "nginx:alpine", "ubuntu:24.04")
+        target_path: Target file path in container (e.g., "/etc/passwd")
+        layer_index: Layer index to extract from (REQUIRED). Use /peek to find layer indices.
+        output_dir: Output directory for carved file (default: ./carved)
+        chunk_size: Fetch chunk size in bytes when adaptive=False (default: 64KB)
+        verbose: Whether to show detailed progress output
+        readahead_bytes: Bytes to prefetch on a background thread while
+                         the current chunk is inflated (default 0: read-ahead
+                         fetches past where the carve stops, and is counted)
+        adaptive: Start with small chunks and grow them, shrinking again
+                  to fit once the target's content size is known
+        
+    Returns:
+        CarveResult with extraction stats and status
+    """
+    content, result = _carve(image_ref, target_path, layer_index, chunk_size, verbose, readahead_bytes, adaptive)
+    if content is not None:
+        result.saved_path = extract_and_save(content, 0, len(content), target_path, output_dir)
+        if verbose:
+            print(f"\nDone! File saved to: {result.saved_path}")
+    return result
+
+
 # =============================================================================
 # Browser-Friendly Carving (returns bytes instead of saving to disk)
 # =============================================================================
@@ -558,6 +795,8 @@ def carve_file_to_bytes(
     layer_index: int,
     chunk_size: int = DEFAULT_CHUNK_SIZE,
     verbose: bool = False,
+    readahead_bytes: int = 0,
+    adaptive: bool = True,
 ) -> tuple[Optional[bytes], CarveResult]:
     """
     Carve a single file from a Docker image layer and return as bytes.
@@ -573,152 +812,110 @@ def carve_file_to_bytes(
         image_ref: Image reference (e.g., "nginx:alpine", "ubuntu:24.04")
         target_path: Target file path in container (e.g., "/etc/passwd")
         layer_index: Layer index to extract from (REQUIRED). Use /peek to find layer indices.
-        chunk_size: Fetch chunk size in bytes (default: 64KB)
+        chunk_size: Fetch chunk size in bytes when adaptive=False (default: 64KB)
         verbose: Whether to show detailed progress output
+        readahead_bytes: Bytes to prefetch on a background thread while
+                         the current chunk is inflated (default 0: read-ahead
+                         fetches past where the carve stops, and is counted)
+        adaptive: Start with small chunks and grow them, shrinking again
+                  to fit once the target's content size is known
         
     Returns:
         Tuple of (file_bytes, CarveResult). file_bytes is None if not found.
     """
-    start_time = time.time()
+    content, result = _carve(image_ref, target_path, layer_index, chunk_size, verbose, readahead_bytes, adaptive)
+    if content is not None and verbose:
+        print(f"\nDone! Extracted {len(content):,} bytes in {result.elapsed_time:.2f}s")
+    return content, result
+
+
+# =============================================================================
+# Async Carving (event loop friendly, for the API)
+# =============================================================================
+
+async def _fetch_manifest_async(
+    auth: AsyncRegistryAuth,
+    namespace: str,
+    repo: str,
+    tag: str,
+) -> list[LayerInfo]:
+    """Async _fetch_manifest(). Returns [] if the manifest can't be fetched."""
+    url = f"{registry_base_url(namespace, repo)}/manifests/{tag}"
     
-    # Parse image reference
-    namespace, repo, tag = parse_image_ref(image_ref)
+    try:
+        resp = await auth.request_with_retry("GET", url, timeout=30)
+        resp.raise_for_status()
+        manifest = resp.json()
+        
+        digest = _platform_manifest_digest(manifest)
+        if digest:
+            url = f"{registry_base_url(namespace, repo)}/manifests/{digest}"
+            resp = await auth.request_with_retry("GET", url, timeout=30)
+            resp.raise_for_status()
+            manifest = resp.json()
+    except httpx.HTTPError:
+        return []
     
-    if verbose:
-        print(f"Fetching manifest for {namespace}/{repo}:{tag}...")
+    return _manifest_layers(manifest)
+
+
+async def carve_file_to_bytes_async(
+    image_ref: str,
+    target_path: str,
+    layer_index: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    adaptive: bool = True,
+) -> tuple[Optional[bytes], CarveResult]:
+    """
+    Async carve_file_to_bytes(): extract a file on the event loop.
     
-    auth = RegistryAuth(namespace, repo)
+    Same lookup and early stop as the sync version (the same LayerCarve),
+    without progress output. Many carves can run concurrently on one loop.
+    
+    Args:
+        image_ref: Image reference (e.g., "nginx:alpine", "ubuntu:24.04")
+        target_path: Target file path in container (e.g., "/etc/passwd")
+        layer_index: Layer index to extract from (REQUIRED)
+        chunk_size: Fetch chunk size in bytes when adaptive=False (default: 64KB)
+        adaptive: Start with small chunks and grow them, shrinking again
+                  to fit once the target's content size is known
+    
+    Returns:
+        Tuple of (file_content_bytes or None, CarveResult)
+    """
+    start_time = time.time()
+    namespace, repo, tag = parse_image_ref(image_ref)
+    auth = AsyncRegistryAuth(namespace, repo)
     
     try:
-        # Get manifest and layers
-        layers = _fetch_manifest(auth, namespace, repo, tag)
-        if not layers:
-            return None, CarveResult(
-                found=False,
-                target_file=target_path,
-                error="No layers found in manifest",
-            )
+        layers = await _fetch_manifest_async(auth, namespace, repo, tag)
+        failed = _check_layer_index(layers, layer_index, target_path)
+        if failed is not None:
+            return None, failed
+        layer = layers[layer_index]
         
-        # Validate layer_index (required parameter)
-        if layer_index < 0 or layer_index >= len(layers):
-            return None, CarveResult(
-                found=False,
-                target_file=target_path,
-                error=f"Layer index {layer_index} out of range. Valid range: 0-{len(layers)-1}. Use /peek to discover layer indices.",
-            )
-        layers_to_search = [(layer_index, layers[layer_index])]
+        compression = layer_compression(layer.media_type) or "gzip"
+        plan = await asyncio.to_thread(_seek_plan, layer.digest, target_path, compression)
+        carve = LayerCarve(target_path, layer, layer_index, compression, plan)
+        if carve.stopped:
+            return carve.result(None, start_time)
         
-        if verbose:
-            print(f"Found {len(layers)} layer(s). Searching for {target_path}...\n")
+        schedule = ChunkSchedule.adaptive(maximum=ADAPTIVE_MAX_CHUNK) if adaptive else None
+        reader = AsyncBlobReader(
+            auth, namespace, repo, layer.digest, chunk_size,
+            schedule=schedule, offset=carve.seek_offset, limit=plan.read_until if plan else 0,
+        )
         
-        # Scan each layer
-        for i, layer in layers_to_search:
-            if verbose:
-                print(f"Scanning layer {i+1}/{len(layers)}: {layer.digest[:20]}...")
-                print(f"  Layer size: {layer.size:,} bytes")
-            
-            # Initialize components
-            reader = IncrementalBlobReader(auth, namespace, repo, layer.digest, chunk_size)
-            decompressor = IncrementalGzipDecompressor()
-            scanner = TarScanner(target_path)
-            
-            # Stream and scan
-            chunks_fetched = 0
-            while not reader.exhausted:
-                # Fetch next chunk
-                compressed = reader.fetch_chunk()
+        try:
+            while carve.wants_more(reader):
+                compressed = await reader.fetch_chunk()
                 if not compressed:
                     break
-                
-                chunks_fetched += 1
-                
-                # Check gzip magic on first chunk
-                if chunks_fetched == 1:
-                    if len(compressed) < 2 or compressed[0:2] != b'\x1f\x8b':
-                        if verbose:
-                            print(f"  Layer is not gzip compressed, skipping")
-                        break
-                
-                # Decompress
-                decompressor.feed(compressed)
-                
-                if decompressor.error:
-                    if verbose:
-                        print(f"  Decompression error: {decompressor.error}")
-                    break
-                
-                # Scan for target
-                result = scanner.scan(decompressor.get_buffer())
-                
-                if verbose:
-                    print(f"  Downloaded: {reader.bytes_downloaded:,}B -> "
-                          f"Decompressed: {decompressor.bytes_decompressed:,}B -> "
-                          f"Entries: {scanner.entries_scanned}")
-                
-                if result.found:
-                    # Check if we have enough data for the file content
-                    buffer = decompressor.get_buffer()
-                    bytes_needed = result.content_offset + result.content_size
-                    
-                    # Fetch more if needed
-                    while len(buffer) < bytes_needed and not reader.exhausted:
-                        compressed = reader.fetch_chunk()
-                        if not compressed:
-                            break
-                        decompressor.feed(compressed)
-                        buffer = decompressor.get_buffer()
-                        if verbose:
-                            print(f"  Fetching more for file content... "
-                                  f"Have {len(buffer):,} / need {bytes_needed:,}")
-                    
-                    buffer = decompressor.get_buffer()
-                    if len(buffer) >= bytes_needed:
-                        # Found and have full content - extract to bytes!
-                        if verbose:
-                            print(f"  FOUND: {target_path} ({result.content_size:,} bytes) "
-                                  f"at entry #{result.entries_scanned}")
-                        
-                        # Extract content directly to bytes (NO DISK I/O)
-                        content = buffer[result.content_offset:result.content_offset + result.content_size]
-                        
-                        elapsed = time.time() - start_time
-                        efficiency = (reader.bytes_downloaded / layer.size * 100) if layer.size else 0
-                        
-                        if verbose:
-                            print(f"\nDone! Extracted {len(content):,} bytes in {elapsed:.2f}s")
-                            print(f"Stats: Downloaded {reader.bytes_downloaded:,} bytes "
-                                  f"of {layer.size:,} byte layer ({efficiency:.1f}%)")
-                        
-                        return content, CarveResult(
-                            found=True,
-                            saved_path=None,  # Not saved to disk
-                            target_file=target_path,
-                            bytes_downloaded=reader.bytes_downloaded,
-                            layer_size=layer.size,
-                            efficiency_pct=efficiency,
-                            elapsed_time=elapsed,
-                            layer_digest=layer.digest,
-                            layer_index=i,
-                            layers_searched=len(layers_to_search),
-                        )
-                    else:
-                        if verbose:
-                            print(f"  [!] Found file but couldn't get full content")
-                            print(f"      Have {len(buffer):,} bytes, need {bytes_needed:,}")
-            
-            if verbose:
-                print()  # Blank line between layers
-        
-        elapsed = time.time() - start_time
-        if verbose:
-            print(f"File not found: {target_path} (searched {len(layers_to_search)} layers in {elapsed:.2f}s)")
-        
-        return None, CarveResult(
-            found=False,
-            target_file=target_path,
-            elapsed_time=elapsed,
-            layers_searched=len(layers_to_search),
-        )
+                carve.feed(compressed, reader)
+                await asyncio.sleep(0)
+        finally:
+            await reader.close()
+        return carve.result(reader, start_time)
     
     finally:
         auth.invalidate()
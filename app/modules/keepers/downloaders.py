@@ -1,12 +1,16 @@
 import os
+import requests
 from app.modules.formatters import parse_image_ref, registry_base_url
 from app.modules.auth import RegistryAuth
+from app.modules.finders.peekers import IncrementalBlobReader
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB reads for full-layer downloads
 
 # =============================================================================
 # Layer Download (Full)
 # =============================================================================
 
-def download_layer_blob(auth: RegistryAuth, image_ref: str, digest: str, size: int):
+def download_layer_blob(auth: RegistryAuth, image_ref: str, digest: str, size: int, use_cache: bool = False):
     """
     Stream a layer blob to disk as a .tar.gz file.
     
@@ -15,12 +19,11 @@ def download_layer_blob(auth: RegistryAuth, image_ref: str, digest: str, size: i
         image_ref: Image reference (e.g., "nginx:alpine")
         digest: Layer digest
         size: Layer size (for info only)
+        use_cache: Read through (and fill) the local blob cache. Off by
+                   default: the saved file already holds the whole layer,
+                   so caching it too would take its size twice on disk
     """
     user, repo, _ = parse_image_ref(image_ref)
-    url = f"{registry_base_url(user, repo)}/blobs/{digest}"
-
-    resp = auth.request_with_retry("GET", url, stream=True)
-    resp.raise_for_status()
 
     user_repo = f"{user}_{repo}"
     output_dir = os.path.join("downloads", user_repo, "latest")
@@ -29,10 +32,18 @@ def download_layer_blob(auth: RegistryAuth, image_ref: str, digest: str, size: i
     filename = digest.replace(":", "_") + ".tar.gz"
     path = os.path.join(output_dir, filename)
 
-    with open(path, "wb") as f:
-        for chunk in resp.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
+    reader = IncrementalBlobReader(auth, user, repo, digest, chunk_size=DOWNLOAD_CHUNK_SIZE, use_cache=use_cache)
+    try:
+        with open(path, "wb") as f:
+            while not reader.exhausted:
+                chunk = reader.fetch_chunk()
+                if chunk:
+                    f.write(chunk)
+    finally:
+        reader.close()
+
+    if reader.error:
+        raise requests.RequestException(f"Download of {digest} failed: {reader.error}")
 
     print(f"[+] Saved layer {digest} to {path}")
 
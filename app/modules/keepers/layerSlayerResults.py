@@ -1,11 +1,17 @@
+import asyncio
+import functools
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
-from typing import Optional, Callable
+from typing import Optional, Callable, Iterator
 
-from app.modules.finders.tar_parser import TarEntry
+from app.modules.finders.entry_columns import Entries, EntryColumns, entry_dicts
 from app.modules.formatters import parse_image_ref
-from app.modules.auth import RegistryAuth
-from app.modules.finders.peekers import peek_layer_streaming
-from app.modules.finders.layerPeekResult import LayerPeekResult
+from app.modules.auth import RegistryAuth, AsyncRegistryAuth
+from app.modules.finders.peekers import peek_layer_streaming, continue_peek, layer_compression
+from app.modules.finders.async_peekers import peek_layer_streaming_async
+from app.modules.finders.estargz import has_toc
+from app.modules.finders.layerPeekResult import LayerPeekResult, PeekContinuation
 from app.modules.keepers import storage
 
 # Copiped from fetcher.py
@@ -18,11 +24,11 @@ from app.modules.keepers import storage
 class LayerSlayerResult:
     """Result of peeking into ALL layers of an image."""
     image_digest: str
-    layers_peeked: int
-    layers_from_cache: int
+    layers_peeked: int          # Layers fetched (or attempted) from the registry
+    layers_from_cache: int      # Layers loaded from the index instead
     total_bytes_downloaded: int
     total_entries: int
-    all_entries: list[TarEntry]  # Merged from all layers
+    all_entries: Entries  # Merged from all layers (EntryColumns if columnar)
     layer_results: list[LayerPeekResult] = field(default_factory=list)
     error: Optional[str] = None
 
@@ -34,13 +40,187 @@ class LayerSlayerResult:
             "layers_from_cache": self.layers_from_cache,
             "total_bytes_downloaded": self.total_bytes_downloaded,
             "total_entries": self.total_entries,
-            "all_entries": [e.to_dict() for e in self.all_entries],
+            "all_entries": entry_dicts(self.all_entries),
             "layer_results": [r.to_dict() for r in self.layer_results],
             "error": self.error,
         }
 
 ## Copied from fetcher.py
 
+# =============================================================================
+# Concurrent Layer Peeks
+# =============================================================================
+
+DEFAULT_PEEK_WORKERS = 4    # Layers peeked at once by layerslayer_async()
+
+
+def peek_failed(result: LayerPeekResult) -> bool:
+    """True if a peek errored without listing anything (nothing worth saving)."""
+    return bool(result.error) and not result.entries_found
+
+
+def _failed_result(digest: str, error: Exception, columnar: bool = False) -> LayerPeekResult:
+    return LayerPeekResult(
+        digest=digest,
+        partial=False,
+        bytes_downloaded=0,
+        bytes_decompressed=0,
+        entries_found=0,
+        entries=EntryColumns() if columnar else [],
+        error=f"Peek failed: {error}",
+    )
+
+
+# peek_layer_streaming() options that continue_peek() also takes
+_CONTINUE_OPTIONS = ("chunk_size", "max_bytes", "streaming", "adaptive", "checkpoint_span")
+
+
+def _peek_one(
+    auth: RegistryAuth,
+    image_ref: str,
+    layer: dict,
+    options: dict,
+    continuation: Optional[PeekContinuation] = None,
+) -> LayerPeekResult:
+    """Peek one manifest layer (or continue a partial one); an exception becomes an error result."""
+    digest = layer.get("digest")
+    try:
+        if continuation is not None:
+            return continue_peek(
+                auth=auth,
+                image_ref=image_ref,
+                continuation=continuation,
+                **{name: options[name] for name in _CONTINUE_OPTIONS if name in options},
+            )
+        return peek_layer_streaming(
+            auth=auth,
+            image_ref=image_ref,
+            digest=digest,
+            layer_size=layer.get("size", 0),
+            media_type=layer.get("mediaType", ""),
+            use_toc=has_toc(layer),
+            **options,
+        )
+    except Exception as e:
+        return _failed_result(digest, e, options.get("columnar", False))
+
+
+def _indexed_layers(conn: Optional[sqlite3.Connection], layers: list[dict]) -> set[int]:
+    """Positions of the layers whose complete listing is already stored in conn."""
+    if conn is None:
+        return set()
+    return {i for i, layer in enumerate(layers) if storage.get_indexed_layer(conn, layer.get("digest"))}
+
+
+def _stored_continuations(
+    conn: Optional[sqlite3.Connection],
+    layers: list[dict],
+    skip: set[int],
+    columnar: bool,
+) -> dict[int, PeekContinuation]:
+    """Where the partial listings stored in conn can be resumed, by layer position."""
+    if conn is None:
+        return {}
+    continuations = {}
+    for i, layer in enumerate(layers):
+        continuation = None if i in skip else storage.get_peek_continuation(conn, layer.get("digest"), columnar)
+        if continuation is not None:
+            continuations[i] = continuation
+    return continuations
+
+
+def peek_layers(
+    auth: RegistryAuth,
+    image_ref: str,
+    layers: list[dict],
+    workers: int = 1,
+    progress_callback: Optional[Callable[[str, int, int], None]] = None,
+    conn: Optional[sqlite3.Connection] = None,
+    **options,
+) -> Iterator[tuple[int, LayerPeekResult]]:
+    """
+    Peek several layers, up to workers at a time on a thread pool.
+    
+    Results are yielded in layer order, whatever order the peeks finish
+    in, so callers can display and save them exactly as they would a
+    sequential run. A layer whose peek raises yields an error result
+    (see peek_failed()) instead of stopping the others.
+    
+    With conn, a layer whose complete listing is already stored there
+    (under any image) is not fetched: its result is loaded from the
+    database and has from_index set. Callers link such layers to the
+    image (storage.link_layer()) instead of saving them. A layer whose
+    stored listing is partial but resumable is continued with
+    continue_peek(): its result holds the stored entries followed by
+    the new ones, and is saved in place of the stored listing.
+    
+    Each worker thread peeks with its own auth.fork(): connections,
+    tokens and the retry budget are shared, sessions are not.
+    
+    Args:
+        auth: RegistryAuth for the image's repository
+        image_ref: Image reference (e.g., "nginx:latest")
+        layers: Layer dicts from manifest["layers"]
+        workers: Layers peeked at once (1 = one after another, no threads)
+        progress_callback: Optional callback(message, current, total), called
+                           on this thread: before each layer when sequential,
+                           as each layer finishes when concurrent
+        conn: Optional SQLite connection to reuse (or continue) stored
+              listings from (used on this thread only)
+        **options: Passed on to peek_layer_streaming() (max_bytes, checkpoint_span, ...)
+    
+    Yields:
+        (position in layers, LayerPeekResult)
+    """
+    total = len(layers)
+    columnar = options.get("columnar", False)
+    indexed = _indexed_layers(conn, layers)
+    continuations = _stored_continuations(conn, layers, indexed, columnar)
+    
+    def load(i: int) -> LayerPeekResult:
+        if progress_callback:
+            progress_callback(f"Layer {i+1}/{total} already indexed", i, total)
+        result = storage.load_layer_result(conn, layers[i].get("digest"), columnar)
+        return result or _peek_one(auth, image_ref, layers[i], options)
+    
+    if workers <= 1 or total - len(indexed) <= 1:
+        for i, layer in enumerate(layers):
+            if i in indexed:
+                yield i, load(i)
+                continue
+            if progress_callback:
+                progress_callback(f"Peeking layer {i+1}/{total}", i, total)
+            yield i, _peek_one(auth, image_ref, layer, options, continuations.get(i))
+        return
+    
+    executor = ThreadPoolExecutor(max_workers=min(workers, total - len(indexed)), thread_name_prefix="layer-peek")
+    try:
+        futures = {
+            executor.submit(_peek_one, auth.fork(), image_ref, layer, options, continuations.get(i)): i
+            for i, layer in enumerate(layers)
+            if i not in indexed
+        }
+        completions = enumerate(as_completed(futures), start=len(indexed))
+        finished: dict[int, LayerPeekResult] = {}
+        next_index = 0
+        while next_index < total:
+            if next_index in indexed:
+                yield next_index, load(next_index)
+            elif next_index in finished:
+                yield next_index, finished.pop(next_index)
+            else:
+                done, future = next(completions)
+                i = futures[future]
+                finished[i] = future.result()
+                if progress_callback:
+                    progress_callback(f"Peeked layer {i+1}/{total}", done, total)
+                continue
+            next_index += 1
+    finally:
+        # Stop queued peeks if the caller stopped early
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
 # =============================================================================
 # Layer Slayer: Bulk Layer Peek
 # =============================================================================
@@ -51,37 +231,51 @@ def layerslayer(
     auth: Optional[RegistryAuth] = None,
     progress_callback: Optional[Callable[[str, int, int], None]] = None,
     max_bytes: int = 0,
+    checkpoint_span: int = 0,
+    columnar: bool = False,
+    workers: int = 1,
+    refresh: bool = False,
 ) -> LayerSlayerResult:
     """
     Peek ALL layers for an image.
     
+    Layers whose complete listing is already in the database (saved
+    while peeking any image) are not fetched: they are linked to this
+    image and counted in layers_from_cache. With max_bytes, a layer cut
+    short by the budget is saved with where to resume it, and the next
+    run continues from there instead of starting over.
+    
     Args:
         image_ref: Image reference (e.g., "nginx:latest")
         layers: List of layer dicts from manifest["layers"]
         auth: Optional RegistryAuth instance (created if not provided)
         progress_callback: Optional callback(message, current, total)
         max_bytes: Maximum bytes to download per layer (0 = complete enumeration)
+        checkpoint_span: Record a gzip checkpoint every this many decompressed
+                         bytes, for later carves (0 = no index)
+        columnar: Keep each layer's entries, and the merged listing, in
+                  EntryColumns instead of lists of objects
+        workers: Layers peeked at once on a thread pool (1 = one after
+                 another). Results are still merged and saved in layer order
+        refresh: Peek every layer, even those already indexed
         
     Returns:
-        LayerSlayerResult with all layer entries and stats
+        LayerSlayerResult with all layer entries and stats. A layer whose
+        peek failed is kept in layer_results with its error, and is not saved
     """
     user, repo, _ = parse_image_ref(image_ref)
     
     # Filter to layers with digests only
-    layer_info = [
-        (layer.get("digest"), layer.get("size", 0))
-        for layer in layers
-        if layer.get("digest")
-    ]
+    layers = [layer for layer in layers if layer.get("digest")]
     
-    if not layer_info:
+    if not layers:
         return LayerSlayerResult(
             image_digest="",
             layers_peeked=0,
             layers_from_cache=0,
             total_bytes_downloaded=0,
             total_entries=0,
-            all_entries=[],
+            all_entries=EntryColumns() if columnar else [],
             error="No layers with digests found",
         )
     
@@ -92,50 +286,203 @@ def layerslayer(
     # Initialize database connection for storage
     conn = storage.init_database()
     
-    all_entries: list[TarEntry] = []
+    all_entries: Entries = EntryColumns() if columnar else []
     layer_results: list[LayerPeekResult] = []
     total_bytes = 0
-    layers_from_cache = 0
     
     try:
-        for i, (digest, layer_size) in enumerate(layer_info):
-            if progress_callback:
-                progress_callback(f"Peeking layer {i+1}/{len(layer_info)}", i, len(layer_info))
-            
-            # Use incremental streaming enumeration
-            result = peek_layer_streaming(
-                auth=auth,
-                image_ref=image_ref,
-                digest=digest,
-                layer_size=layer_size,
-                max_bytes=max_bytes,
-            )
-            
-            layer_results.append(result)
+        # Use incremental streaming enumeration
+        peeks = peek_layers(
+            auth, image_ref, layers,
+            workers=workers,
+            progress_callback=progress_callback,
+            conn=None if refresh else conn,
+            max_bytes=max_bytes,
+            checkpoint_span=checkpoint_span,
+            columnar=columnar,
+            resumable=max_bytes > 0,
+        )
+        for i, result in peeks:
+            _collect(result, image_ref, i, layers[i], conn, layer_results, all_entries)
             total_bytes += result.bytes_downloaded
             
-            if not result.error:
-                all_entries.extend(result.entries)
-            
-            # Save layer result to JSON and SQLite
-            storage.save_layer_result(result, image_ref, i, layer_size, conn)
-        
         if progress_callback:
-            progress_callback("Done", len(layer_info), len(layer_info))
+            progress_callback("Done", len(layers), len(layers))
     finally:
         conn.close()
         # Invalidate auth session when done with all layers
         auth.invalidate()
     
+    return _slayer_result(layers, total_bytes, all_entries, layer_results)
+
+
+def _collect(
+    result: LayerPeekResult,
+    image_ref: str,
+    layer_index: int,
+    layer: dict,
+    conn: sqlite3.Connection,
+    layer_results: list[LayerPeekResult],
+    all_entries: Entries,
+    force_overwrite: bool = False,
+):
+    """
+    Merge one layer's result (in layer order) and save it (or link it, if
+    loaded from the index). force_overwrite replaces a stored complete
+    listing without prompting.
+    """
+    layer_results.append(result)
+    
+    # Truncated listings still carry every entry parsed before the failure
+    if not result.error or result.truncated:
+        all_entries.extend(result.entries)
+    
+    # Save layer result to JSON and SQLite
+    if result.from_index:
+        storage.link_layer(conn, result.digest, image_ref, layer_index)
+    elif not peek_failed(result):
+        storage.save_layer_result(
+            result, image_ref, layer_index, layer.get("size", 0), conn,
+            force_overwrite=force_overwrite,
+        )
+
+
+def _slayer_result(
+    layers: list[dict],
+    total_bytes: int,
+    all_entries: Entries,
+    layer_results: list[LayerPeekResult],
+) -> LayerSlayerResult:
     # Use the first layer's digest as image reference (or empty if none)
-    image_digest = layer_info[0][0] if layer_info else ""
+    image_digest = layers[0]["digest"] if layers else ""
+    from_cache = sum(result.from_index for result in layer_results)
     
     return LayerSlayerResult(
         image_digest=image_digest,
-        layers_peeked=len(layer_info),
-        layers_from_cache=layers_from_cache,
+        layers_peeked=len(layer_results) - from_cache,
+        layers_from_cache=from_cache,
         total_bytes_downloaded=total_bytes,
         total_entries=len(all_entries),
         all_entries=all_entries,
         layer_results=layer_results,
     )
+
+
+def _needs_sync_peek(layer: dict) -> bool:
+    """True for layers only the sync peek handles well: eStargz (TOC) and uncompressed tar (header hopping)."""
+    return has_toc(layer) or layer_compression(layer.get("mediaType", "")) == "none"
+
+
+async def layerslayer_async(
+    image_ref: str,
+    layers: list[dict],
+    auth: Optional[AsyncRegistryAuth] = None,
+    progress_callback: Optional[Callable[[str, int, int], None]] = None,
+    max_bytes: int = 0,
+    checkpoint_span: int = 0,
+    columnar: bool = False,
+    workers: int = DEFAULT_PEEK_WORKERS,
+    refresh: bool = False,
+) -> LayerSlayerResult:
+    """
+    Async layerslayer(): peek up to workers layers at once as tasks on the loop.
+    
+    Layers are peeked with peek_layer_streaming_async(), except eStargz
+    and uncompressed tar layers: their TOC and header hopping are only in
+    the sync peek, so those run through _peek_one() on a worker thread,
+    as in peek_layers(). Results are merged and saved in layer order, and
+    already indexed layers are linked rather than fetched, as in
+    layerslayer(). progress_callback is called as each layer finishes,
+    and a layer whose peek raises is kept as an error result and not saved.
+    
+    Storage calls run on one worker thread of their own (the SQLite
+    connection is bound to it), never on the loop. Nothing prompts: with
+    refresh, a stored complete listing is replaced.
+    
+    Args:
+        As layerslayer(), with auth an AsyncRegistryAuth
+    
+    Returns:
+        LayerSlayerResult with all layer entries and stats
+    """
+    user, repo, _ = parse_image_ref(image_ref)
+    layers = [layer for layer in layers if layer.get("digest")]
+    if not layers:
+        return LayerSlayerResult(
+            image_digest="",
+            layers_peeked=0,
+            layers_from_cache=0,
+            total_bytes_downloaded=0,
+            total_entries=0,
+            all_entries=EntryColumns() if columnar else [],
+            error="No layers with digests found",
+        )
+    
+    auth = auth or AsyncRegistryAuth(user, repo)
+    sync_auth = RegistryAuth(user, repo) if any(map(_needs_sync_peek, layers)) else None
+    options = {"max_bytes": max_bytes, "checkpoint_span": checkpoint_span, "columnar": columnar}
+    slots = asyncio.Semaphore(max(workers, 1))
+    
+    async def peek(i: int, layer: dict) -> tuple[int, LayerPeekResult]:
+        async with slots:
+            if _needs_sync_peek(layer):
+                # Each thread peeks with its own fork, as in peek_layers()
+                return i, await asyncio.to_thread(_peek_one, sync_auth.fork(), image_ref, layer, options)
+            try:
+                result = await peek_layer_streaming_async(
+                    auth, image_ref, layer["digest"], layer.get("size", 0), **options,
+                )
+            except Exception as e:
+                result = _failed_result(layer["digest"], e, columnar)
+        return i, result
+    
+    store = ThreadPoolExecutor(max_workers=1, thread_name_prefix="layer-store")
+    loop = asyncio.get_running_loop()
+    
+    def stored(func, *args):
+        return loop.run_in_executor(store, functools.partial(func, *args))
+    
+    conn = await stored(storage.init_database)
+    all_entries: Entries = EntryColumns() if columnar else []
+    layer_results: list[LayerPeekResult] = []
+    total_bytes = 0
+    tasks = []
+    
+    try:
+        indexed = await stored(_indexed_layers, None if refresh else conn, layers)
+        tasks = [asyncio.ensure_future(peek(i, layer)) for i, layer in enumerate(layers) if i not in indexed]
+        completions = enumerate(asyncio.as_completed(tasks), start=len(indexed))
+        finished: dict[int, LayerPeekResult] = {}
+        next_index = 0
+        while next_index < len(layers):
+            if next_index in indexed:
+                result = await stored(storage.load_layer_result, conn, layers[next_index]["digest"], columnar)
+                result = result or (await peek(next_index, layers[next_index]))[1]
+            elif next_index in finished:
+                result = finished.pop(next_index)
+            else:
+                done, next_done = next(completions)
+                i, result = await next_done
+                finished[i] = result
+                if progress_callback:
+                    progress_callback(f"Peeked layer {i+1}/{len(layers)}", done, len(layers))
+                continue
+            await stored(
+                _collect, result, image_ref, next_index, layers[next_index],
+                conn, layer_results, all_entries, True,
+            )
+            total_bytes += result.bytes_downloaded
+            next_index += 1
+        
+        if progress_callback:
+            progress_callback("Done", len(layers), len(layers))
+    finally:
+        for task in tasks:
+            task.cancel()
+        await stored(conn.close)
+        store.shutdown(wait=False)
+        auth.invalidate()
+        if sync_auth is not None:
+            sync_auth.invalidate()
+    
+    return _slayer_result(layers, total_bytes, all_entries, layer_results)
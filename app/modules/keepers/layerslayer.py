@@ -71,14 +71,21 @@ def display_peek_result(result: LayerPeekResult, layer_size: int, verbose: bool
     """
     if result.error:
         print(f"  [!] Error: {result.error}")
-        return
+        if not result.truncated:
+            return
     
     # Show efficiency stats
     if verbose or result.bytes_downloaded > 0:
         pct = (result.bytes_downloaded / layer_size * 100) if layer_size > 0 else 0
         print(f"\n  [Stats] Downloaded: {human_readable_size(result.bytes_downloaded)} "
               f"of {human_readable_size(layer_size)} ({pct:.2f}%)")
-        if result.partial:
+        if result.from_index:
+            print(f"  [Stats] Files found: {result.entries_found} (already indexed, nothing fetched)")
+        elif result.truncated:
+            print(f"  [Stats] Files found: {result.entries_found} (truncated, re-run to complete)")
+        elif result.continuation:
+            print(f"  [Stats] Files found: {result.entries_found} (partial, peek again to continue)")
+        elif result.partial:
             print(f"  [Stats] Files found: {result.entries_found} (partial)")
         else:
             print(f"  [Stats] Files found: {result.entries_found} (complete)")
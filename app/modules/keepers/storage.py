@@ -6,11 +6,18 @@
 import os
 import json
 import sqlite3
+import zlib
+from bisect import bisect_right
 from datetime import datetime
 from typing import Optional
 
-from app.modules.finders.layerPeekResult import LayerPeekResult
+from app.modules.finders.layerPeekResult import LayerPeekResult, PeekContinuation
+from app.modules.finders.gzip_index import GzipCheckpoint
+from app.modules.finders.entry_columns import entry_dicts, entry_rows
+from app.modules.finders.entry_columns import EntryColumns
+from app.modules.finders.tar_entry import CompactTarEntry
 from app.modules.finders.tar_parser import TarEntry
+from app.modules.finders.tar_walker import TAR_BLOCK
 from app.modules.formatters import parse_image_ref
 
 
@@ -26,6 +33,13 @@ DEFAULT_JSON_DIR = "app/loot"
 # Database Initialization
 # =============================================================================
 
+def _add_missing_column(cursor: sqlite3.Cursor, table: str, column: str, decl: str) -> None:
+    """Add a column to a table created by an older schema, if it is missing."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
 def init_database(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
     """
     Initialize SQLite database with schema for layer storage.
@@ -72,9 +86,17 @@ def init_database(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
             linkname TEXT,
             is_symlink BOOLEAN DEFAULT 0,
             
+            -- Position in the decompressed stream, recorded by the peek
+            header_offset INTEGER,
+            content_offset INTEGER,
+            checkpoint_offset INTEGER,  -- out_offset of the gzip checkpoint before content
+            
             UNIQUE(layer_digest, name)
         )
     """)
+    _add_missing_column(cursor, "layer_entries", "header_offset", "INTEGER")
+    _add_missing_column(cursor, "layer_entries", "content_offset", "INTEGER")
+    _add_missing_column(cursor, "layer_entries", "checkpoint_offset", "INTEGER")
     
     # Create layer_metadata table - stores summary per layer
     cursor.execute("""
@@ -90,7 +112,70 @@ def init_database(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
             bytes_downloaded INTEGER,
             bytes_decompressed INTEGER,
             scraped_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            json_filename TEXT
+            json_filename TEXT,
+            truncated BOOLEAN,
+            partial BOOLEAN
+        )
+    """)
+    # Rows saved before these columns existed get NULL: whether their
+    # listing is complete is not known (older peeks stopped at a byte
+    # budget without saying so), so they are never reused as indexed
+    _add_missing_column(cursor, "layer_metadata", "truncated", "BOOLEAN")
+    _add_missing_column(cursor, "layer_metadata", "partial", "BOOLEAN")
+    
+    # Create layer_links table - which layer each image/tag/layer_index holds.
+    # A digest's entries are stored once (under the image that peeked it);
+    # every image using the layer links to them here.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS layer_links (
+            owner TEXT NOT NULL,
+            repo TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            layer_index INTEGER NOT NULL,
+            image_ref TEXT,
+            layer_digest TEXT NOT NULL,
+            linked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (owner, repo, tag, layer_index)
+        )
+    """)
+    # Layers saved before links existed are linked to the image that peeked them
+    cursor.execute("""
+        INSERT OR IGNORE INTO layer_links (
+            owner, repo, tag, layer_index, image_ref, layer_digest, linked_at
+        )
+        SELECT owner, repo, tag, layer_index, image_ref, layer_digest, scraped_at
+        FROM layer_metadata
+        WHERE owner IS NOT NULL AND repo IS NOT NULL AND tag IS NOT NULL
+        AND layer_index IS NOT NULL
+    """)
+    
+    # Create gzip_checkpoints table - seek points into a layer's gzip stream.
+    # Keyed by digest only: they describe the blob, not the image it came from.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS gzip_checkpoints (
+            layer_digest TEXT NOT NULL,
+            out_offset INTEGER NOT NULL,
+            in_offset INTEGER NOT NULL,
+            bits INTEGER NOT NULL,
+            window BLOB NOT NULL,
+            PRIMARY KEY (layer_digest, out_offset)
+        )
+    """)
+    
+    # Create peek_continuations table - where a partial listing can be resumed.
+    # The entries before the resume point are those saved in layer_entries.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS peek_continuations (
+            layer_digest TEXT PRIMARY KEY,
+            compression TEXT NOT NULL,
+            out_offset INTEGER NOT NULL,
+            in_offset INTEGER NOT NULL,
+            bits INTEGER NOT NULL,
+            window BLOB NOT NULL,
+            pending_header BLOB NOT NULL,
+            body_remaining INTEGER NOT NULL,
+            entries_before INTEGER NOT NULL,
+            saved_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     """)
     
@@ -140,6 +225,11 @@ def init_database(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
         ON layer_entries(image_ref)
     """)
     
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_link_digest 
+        ON layer_links(layer_digest)
+    """)
+    
     conn.commit()
     return conn
 
@@ -227,6 +317,9 @@ def delete_layer_data(conn: sqlite3.Connection, digest: str) -> None:
     """
     Delete existing layer data before overwriting.
     
+    Links to the layer are kept: they name the digest, whose listing
+    is about to be saved again.
+    
     Args:
         conn: SQLite connection
         digest: Layer digest to delete
@@ -237,6 +330,104 @@ def delete_layer_data(conn: sqlite3.Connection, digest: str) -> None:
     conn.commit()
 
 
+# =============================================================================
+# Layer Reuse
+# =============================================================================
+
+def get_indexed_layer(conn: sqlite3.Connection, digest: str) -> Optional[dict]:
+    """
+    Get a layer's metadata if its complete listing is already stored.
+    
+    Layers are content-addressed, so a listing saved while peeking one
+    image holds for every image with that layer digest.
+    
+    Args:
+        conn: SQLite connection
+        digest: Layer digest (sha256:...)
+    
+    Returns:
+        Dict with layer metadata, or None if the layer is not stored or
+        its listing is truncated, partial, or was saved before that was
+        recorded (NULL)
+    """
+    info = get_layer_info(conn, digest)
+    if info and info.get("truncated") == 0 and info.get("partial") == 0:
+        return info
+    return None
+
+
+def load_layer_result(
+    conn: sqlite3.Connection,
+    digest: str,
+    columnar: bool = False,
+) -> Optional[LayerPeekResult]:
+    """
+    Build a LayerPeekResult from a stored complete listing, without fetching.
+    
+    Entries come back in the order they were saved, as CompactTarEntry
+    (or EntryColumns with columnar). The result has from_index set and
+    no byte counts.
+    
+    Args:
+        conn: SQLite connection
+        digest: Layer digest (sha256:...)
+        columnar: Return the entries as EntryColumns
+    
+    Returns:
+        LayerPeekResult, or None if the layer has no complete listing stored
+    """
+    if get_indexed_layer(conn, digest) is None:
+        return None
+    
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT name, size, typeflag, is_dir, mode, uid, gid, mtime, linkname
+        FROM layer_entries
+        WHERE layer_digest = ?
+        ORDER BY id ASC
+    """, (digest,))
+    entries = (CompactTarEntry.from_dict(row) for row in cursor)
+    entries = EntryColumns.from_entries(entries) if columnar else list(entries)
+    
+    return LayerPeekResult(
+        digest=digest,
+        partial=False,
+        bytes_downloaded=0,
+        bytes_decompressed=0,
+        entries_found=len(entries),
+        entries=entries,
+        from_index=True,
+    )
+
+
+def link_layer(
+    conn: sqlite3.Connection,
+    digest: str,
+    image_ref: str,
+    layer_index: int,
+) -> None:
+    """
+    Record that an image holds a layer at layer_index.
+    
+    Queries by owner/repo/tag then find the layer's stored entries
+    without them being saved again.
+    
+    Args:
+        conn: SQLite connection
+        digest: Layer digest (sha256:...)
+        image_ref: Image reference (e.g., "nginx:latest")
+        layer_index: Zero-based layer number in that image
+    """
+    owner, repo, tag = parse_image_ref(image_ref)
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT OR REPLACE INTO layer_links (
+            owner, repo, tag, layer_index, image_ref, layer_digest, linked_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (owner, repo, tag, layer_index, image_ref, digest, datetime.now().isoformat()))
+    conn.commit()
+
+
 # =============================================================================
 # SQLite Storage
 # =============================================================================
@@ -270,8 +461,8 @@ def save_layer_sqlite(
         INSERT OR REPLACE INTO layer_metadata (
             layer_digest, image_ref, owner, repo, tag, layer_index,
             layer_size, entries_count, bytes_downloaded, bytes_decompressed,
-            scraped_at, json_filename
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            scraped_at, json_filename, truncated, partial
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     """, (
         result.digest,
         image_ref,
@@ -285,37 +476,223 @@ def save_layer_sqlite(
         result.bytes_decompressed,
         scraped_at,
         json_filename,
+        result.truncated,
+        result.partial,
+    ))
+    cursor.execute("""
+        INSERT OR REPLACE INTO layer_links (
+            owner, repo, tag, layer_index, image_ref, layer_digest, linked_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (owner, repo, tag, layer_index, image_ref, result.digest, scraped_at))
+    
+    # Insert all entries in one batch, with where each one sits in the layer
+    header_offsets = result.header_offsets
+    checkpoint_offsets = [cp.out_offset for cp in result.checkpoints]
+    rows = (
+        (result.digest, image_ref, owner, repo, tag, layer_index, scraped_at, *fields,
+         *_entry_offsets(i, header_offsets, checkpoint_offsets))
+        for i, fields in enumerate(entry_rows(result.entries))
+    )
+    cursor.executemany("""
+        INSERT OR REPLACE INTO layer_entries (
+            layer_digest, image_ref, owner, repo, tag, layer_index,
+            scraped_at, name, size, typeflag, is_dir, mode,
+            uid, gid, mtime, linkname, is_symlink,
+            header_offset, content_offset, checkpoint_offset
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    
+    save_gzip_checkpoints(conn, result.digest, result.checkpoints)
+    save_peek_continuation(conn, result.digest, result.continuation)
+    conn.commit()
+
+
+def _entry_offsets(index: int, header_offsets, checkpoint_offsets: list[int]) -> tuple:
+    """(header_offset, content_offset, checkpoint_offset) of entry index (None if unknown)."""
+    if index >= len(header_offsets):
+        return None, None, None
+    header_offset = header_offsets[index]
+    content_offset = header_offset + TAR_BLOCK
+    preceding = bisect_right(checkpoint_offsets, content_offset)
+    return header_offset, content_offset, checkpoint_offsets[preceding - 1] if preceding else None
+
+
+def save_gzip_checkpoints(
+    conn: sqlite3.Connection,
+    digest: str,
+    checkpoints: list[GzipCheckpoint],
+) -> None:
+    """
+    Store a layer's gzip checkpoints (windows are stored compressed).
+    
+    Kept when the layer's entries are overwritten: the blob behind a
+    digest never changes, so its checkpoints stay valid.
+    
+    Args:
+        conn: SQLite connection
+        digest: Layer digest the checkpoints were recorded for
+        checkpoints: GzipCheckpoint list from a peek (may be empty)
+    """
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT OR REPLACE INTO gzip_checkpoints (
+            layer_digest, out_offset, in_offset, bits, window
+        ) VALUES (?, ?, ?, ?, ?)
+    """, [
+        (digest, cp.out_offset, cp.in_offset, cp.bits, zlib.compress(cp.window))
+        for cp in checkpoints
+    ])
+
+
+def get_gzip_checkpoint(
+    conn: sqlite3.Connection,
+    digest: str,
+    before_offset: int,
+) -> Optional[GzipCheckpoint]:
+    """
+    Get the last checkpoint at or before a decompressed stream offset.
+    
+    Args:
+        conn: SQLite connection
+        digest: Layer digest
+        before_offset: Decompressed offset the caller needs to reach
+    
+    Returns:
+        GzipCheckpoint, or None if the layer has no checkpoint that early
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT out_offset, in_offset, bits, window
+        FROM gzip_checkpoints
+        WHERE layer_digest = ? AND out_offset <= ?
+        ORDER BY out_offset DESC
+        LIMIT 1
+    """, (digest, before_offset))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return GzipCheckpoint(
+        out_offset=row["out_offset"],
+        in_offset=row["in_offset"],
+        bits=row["bits"],
+        window=zlib.decompress(row["window"]),
+    )
+
+
+def save_peek_continuation(
+    conn: sqlite3.Connection,
+    digest: str,
+    continuation: Optional[PeekContinuation],
+) -> None:
+    """
+    Store where a layer's partial listing can be resumed (or forget it).
+    
+    Only the resume state is stored; the entries before the resume point
+    are the layer's saved entries.
+    
+    Args:
+        conn: SQLite connection
+        digest: Layer digest
+        continuation: From a partial LayerPeekResult, or None to remove
+                      any stored one (the listing is complete, or cannot
+                      be resumed)
+    """
+    cursor = conn.cursor()
+    if continuation is None:
+        cursor.execute("DELETE FROM peek_continuations WHERE layer_digest = ?", (digest,))
+        return
+    checkpoint = continuation.checkpoint
+    cursor.execute("""
+        INSERT OR REPLACE INTO peek_continuations (
+            layer_digest, compression, out_offset, in_offset, bits, window,
+            pending_header, body_remaining, entries_before, saved_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        digest,
+        continuation.compression,
+        checkpoint.out_offset,
+        checkpoint.in_offset,
+        checkpoint.bits,
+        zlib.compress(checkpoint.window),
+        continuation.pending_header,
+        continuation.body_remaining,
+        continuation.entries_before,
+        datetime.now().isoformat(),
     ))
+
+
+def get_peek_continuation(
+    conn: sqlite3.Connection,
+    digest: str,
+    columnar: bool = False,
+) -> Optional[PeekContinuation]:
+    """
+    Load where a layer's partial listing can be resumed, with its entries.
     
-    # Insert all entries
-    for entry in result.entries:
-        cursor.execute("""
-            INSERT OR REPLACE INTO layer_entries (
-                layer_digest, image_ref, owner, repo, tag, layer_index,
-                scraped_at, name, size, typeflag, is_dir, mode,
-                uid, gid, mtime, linkname, is_symlink
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            result.digest,
-            image_ref,
-            owner,
-            repo,
-            tag,
-            layer_index,
-            scraped_at,
-            entry.name,
-            entry.size,
-            entry.typeflag,
-            entry.is_dir,
-            entry.mode,
-            entry.uid,
-            entry.gid,
-            entry.mtime,
-            entry.linkname,
-            entry.is_symlink,
-        ))
+    Args:
+        conn: SQLite connection
+        digest: Layer digest
+        columnar: Load the entries before the resume point as EntryColumns
     
-    conn.commit()
+    Returns:
+        PeekContinuation for peekers.continue_peek(), or None if none is
+        stored or the saved entries no longer match it
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM peek_continuations WHERE layer_digest = ?", (digest,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    
+    # The entries whose headers end before the resume point, in stream order
+    cursor.execute("""
+        SELECT name, size, typeflag, is_dir, mode, uid, gid, mtime, linkname, header_offset
+        FROM layer_entries
+        WHERE layer_digest = ? AND header_offset IS NOT NULL AND header_offset + ? <= ?
+        ORDER BY header_offset ASC
+    """, (digest, TAR_BLOCK, row["out_offset"]))
+    rows = cursor.fetchall()
+    if len(rows) != row["entries_before"]:
+        return None  # Overwritten since, or duplicate names collapsed on save
+    entries = (CompactTarEntry.from_dict(entry) for entry in rows)
+    
+    return PeekContinuation(
+        digest=digest,
+        compression=row["compression"],
+        checkpoint=GzipCheckpoint(
+            out_offset=row["out_offset"],
+            in_offset=row["in_offset"],
+            bits=row["bits"],
+            window=zlib.decompress(row["window"]),
+        ),
+        pending_header=row["pending_header"],
+        body_remaining=row["body_remaining"],
+        entries_before=row["entries_before"],
+        entries=EntryColumns.from_entries(entries) if columnar else list(entries),
+        header_offsets=[entry["header_offset"] for entry in rows],
+    )
+
+
+def get_gzip_read_end(conn: sqlite3.Connection, digest: str, out_offset: int) -> Optional[int]:
+    """
+    Get a blob offset by which a layer has inflated at least out_offset bytes.
+    
+    This is the compressed offset of the first checkpoint at or after
+    out_offset: reading up to it is enough to produce everything before.
+    
+    Returns:
+        Blob offset, or None if no checkpoint lies that far in
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT in_offset
+        FROM gzip_checkpoints
+        WHERE layer_digest = ? AND out_offset >= ?
+        ORDER BY out_offset ASC
+        LIMIT 1
+    """, (digest, out_offset))
+    row = cursor.fetchone()
+    return row["in_offset"] if row else None
 
 
 # =============================================================================
@@ -399,9 +776,10 @@ def save_layer_json(
             "bytes_downloaded": result.bytes_downloaded,
             "bytes_decompressed": result.bytes_decompressed,
             "partial": result.partial,
+            "truncated": result.truncated,
             "error": result.error,
         },
-        "entries": [entry.to_dict() for entry in result.entries],
+        "entries": entry_dicts(result.entries),
     }
     
     with open(filepath, "w", encoding="utf-8") as f:
@@ -428,7 +806,9 @@ def save_layer_result(
     """
     Save layer result to both JSON and SQLite.
     
-    Handles cache checking and user prompts.
+    Handles cache checking and user prompts. Listings saved from a
+    truncated or partial peek are marked as such and get replaced by the
+    next peek.
     
     Args:
         result: LayerPeekResult from peek operation
@@ -453,7 +833,12 @@ def save_layer_result(
     try:
         # Check for existing data
         if check_exists and check_layer_exists(conn, result.digest):
-            if not prompt_overwrite(result.digest, conn, force=force_overwrite):
+            # An incomplete (truncated or partial) listing is replaced without
+            # asking, but never replaces a complete one
+            existing_complete = get_indexed_layer(conn, result.digest) is not None
+            if (result.truncated or result.partial) and existing_complete:
+                return (False, "Skipped - incomplete listing would replace a complete one")
+            if existing_complete and not prompt_overwrite(result.digest, conn, force=force_overwrite):
                 return (False, "Skipped - user chose not to overwrite")
             # Delete existing data before re-inserting
             delete_layer_data(conn, result.digest)
@@ -875,13 +1260,14 @@ def find_file_layers(
     if normalized.startswith("/"):
         normalized = normalized[1:]
     
-    # Query for all matches on normalized name
+    # Query for all matches on normalized name, in every layer linked to the image
     cursor.execute("""
-        SELECT layer_index, size, mtime, layer_digest
-        FROM layer_entries
-        WHERE owner = ? AND repo = ? AND tag = ?
-        AND (name = ? OR name = ?)
-        ORDER BY layer_index ASC
+        SELECT l.layer_index, e.size, e.mtime, e.layer_digest
+        FROM layer_links l
+        JOIN layer_entries e ON e.layer_digest = l.layer_digest
+        WHERE l.owner = ? AND l.repo = ? AND l.tag = ?
+        AND (e.name = ? OR e.name = ?)
+        ORDER BY l.layer_index ASC
     """, (owner, repo, tag, normalized, file_path.lstrip("/")))
     
     results = []
@@ -950,6 +1336,37 @@ def get_cached_layers(
     return layers if layers else None
 
 
+def get_entry_location(conn: sqlite3.Connection, digest: str, file_path: str) -> Optional[dict]:
+    """
+    Get where a file sits in a layer's decompressed stream.
+    
+    Args:
+        conn: SQLite connection
+        digest: Layer digest
+        file_path: Target file path (e.g., "/etc/passwd")
+    
+    Returns:
+        Dict with header_offset, content_offset, size and checkpoint_offset
+        (None if the layer had no checkpoint before the content), or None
+        if the layer was not peeked (or was peeked before offsets were
+        recorded)
+    """
+    normalized = file_path.strip()
+    if normalized.startswith("./"):
+        normalized = normalized[2:]
+    normalized = normalized.lstrip("/")
+    
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT header_offset, content_offset, size, checkpoint_offset
+        FROM layer_entries
+        WHERE layer_digest = ? AND name IN (?, ?, ?)
+        AND content_offset IS NOT NULL
+    """, (digest, normalized, f"./{normalized}", f"/{normalized}"))
+    row = cursor.fetchone()
+    return dict(row) if row else None
+
+
 # =============================================================================
 # History Query
 # =============================================================================
@@ -989,10 +1406,13 @@ def get_history(
     
     cursor = conn.cursor()
     
-    # Build query
+    # Build query (one row per image layer, including layers linked from
+    # another image's peek, dated when the image got them)
     base_query = """
-        SELECT scraped_at, owner, repo, tag, layer_index, layer_size
-        FROM layer_metadata
+        SELECT l.linked_at AS scraped_at, l.owner AS owner, l.repo AS repo,
+               l.tag AS tag, l.layer_index AS layer_index, m.layer_size AS layer_size
+        FROM layer_links l
+        JOIN layer_metadata m ON m.layer_digest = l.layer_digest
     """
     
     params = []
@@ -1000,7 +1420,7 @@ def get_history(
     # Add filter if search query provided
     if q:
         base_query += """
-        WHERE owner LIKE ? OR repo LIKE ? OR tag LIKE ?
+        WHERE l.owner LIKE ? OR l.repo LIKE ? OR l.tag LIKE ?
         """
         search_pattern = f"%{q}%"
         params.extend([search_pattern, search_pattern, search_pattern])
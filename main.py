@@ -5,8 +5,10 @@ import os
 import sys
 
 from app.modules.keepers.downloaders import get_manifest, download_layer_blob, fetch_build_steps
-from app.modules.finders.peekers import peek_layer_streaming
-from app.modules.keepers.layerSlayerResults import layerslayer as layerslayer_bulk, LayerPeekResult
+from app.modules.finders.peekers import peek_layer_streaming, continue_peek
+from app.modules.finders.inflate import configure_inflate_backend
+from app.modules.finders.estargz import has_toc
+from app.modules.keepers.layerSlayerResults import layerslayer as layerslayer_bulk, LayerPeekResult, peek_layers, peek_failed
 from app.modules.keepers import storage
 from app.modules.formatters import (
     parse_image_ref,
@@ -37,6 +39,12 @@ def main():
 
     #print(" Welcome to Layerslayer \n")
 
+    # Inflate backend override (auto-selected at import otherwise)
+    try:
+        configure_inflate_backend(args.inflate)
+    except ImportError:
+        print(f"[!] Inflate backend {args.inflate} is not installed, using {configure_inflate_backend().name}")
+
     # choose image from CLI or prompt
     if args.image_ref:
         image_ref = args.image_ref
@@ -123,10 +131,15 @@ def main():
                 layers=layers,
                 auth=auth,
                 progress_callback=progress,
+                checkpoint_span=args.index_span * 1024 * 1024,
+                columnar=args.columnar,
+                workers=args.workers,
+                refresh=args.refresh,
             )
             
             print(f"\n[*] Bulk peek complete:")
             print(f"    Layers peeked: {bulk_result.layers_peeked}")
+            print(f"    Layers already indexed: {bulk_result.layers_from_cache}")
             print(f"    Total downloaded: {human_readable_size(bulk_result.total_bytes_downloaded)}")
             print(f"    Total files found: {bulk_result.total_entries}")
             
@@ -155,23 +168,32 @@ def main():
             conn = storage.init_database()
             
             try:
-                for idx in indices:
-                    layer = layers[idx]
-                    layer_size = layer.get("size", 0)
-                    print(f"\n[Layer {idx}] {layer['digest']}")
+                # Complete enumeration using incremental streaming (--workers layers
+                # at a time); results arrive in layer order. Layers already
+                # indexed are loaded from the database, and partial ones
+                # continued where the last peek stopped, unless --refresh
+                peeks = peek_layers(
+                    auth,
+                    image_ref,
+                    [layers[idx] for idx in indices],
+                    workers=args.workers,
+                    conn=None if args.refresh else conn,
+                    max_bytes=args.budget * 1024,
+                    checkpoint_span=args.index_span * 1024 * 1024,
+                    resumable=True,
+                )
+                for position, result in peeks:
+                    idx = indices[position]
+                    layer_size = layers[idx].get("size", 0)
+                    print(f"\n[Layer {idx}] {layers[idx]['digest']}")
                     print(f"           Size: {human_readable_size(layer_size)}")
-                    
-                    # Complete enumeration using incremental streaming
-                    result = peek_layer_streaming(
-                        auth,
-                        image_ref,
-                        layer["digest"],
-                        layer_size,
-                    )
                     display_peek_result(result, layer_size, verbose=True)
                     
-                    # Save layer result to JSON and SQLite
-                    storage.save_layer_result(result, image_ref, idx, layer_size, conn, force_overwrite=args.force)
+                    # Save layer result to JSON and SQLite (or link the stored one)
+                    if result.from_index:
+                        storage.link_layer(conn, result.digest, image_ref, idx)
+                    elif not peek_failed(result):
+                        storage.save_layer_result(result, image_ref, idx, layer_size, conn, force_overwrite=args.force)
             finally:
                 conn.close()
             return
@@ -211,17 +233,39 @@ def main():
                 print(f"\n[Layer {idx}] {layer['digest']}")
                 print(f"           Size: {human_readable_size(layer_size)}")
                 
-                # Complete enumeration using incremental streaming
-                result = peek_layer_streaming(
-                    auth,
-                    image_ref,
-                    layer["digest"],
-                    layer_size,
-                )
+                # Stored complete listing, the continuation of a partial one,
+                # or enumeration using incremental streaming
+                result = continuation = None
+                if not args.refresh:
+                    result = storage.load_layer_result(conn, layer["digest"])
+                    continuation = result is None and storage.get_peek_continuation(conn, layer["digest"])
+                if continuation:
+                    result = continue_peek(
+                        auth,
+                        image_ref,
+                        continuation,
+                        max_bytes=args.budget * 1024,
+                        checkpoint_span=args.index_span * 1024 * 1024,
+                    )
+                elif result is None:
+                    result = peek_layer_streaming(
+                        auth,
+                        image_ref,
+                        layer["digest"],
+                        layer_size,
+                        max_bytes=args.budget * 1024,
+                        checkpoint_span=args.index_span * 1024 * 1024,
+                        media_type=layer.get("mediaType", ""),
+                        use_toc=has_toc(layer),
+                        resumable=True,
+                    )
                 display_peek_result(result, layer_size, verbose=True)
                 
-                # Save layer result to JSON and SQLite
-                storage.save_layer_result(result, image_ref, idx, layer_size, conn, force_overwrite=args.force)
+                # Save layer result to JSON and SQLite (or link the stored one)
+                if result.from_index:
+                    storage.link_layer(conn, result.digest, image_ref, idx)
+                else:
+                    storage.save_layer_result(result, image_ref, idx, layer_size, conn, force_overwrite=args.force)
                 
                 if input("Download this layer? (y/N) ").strip().lower() == "y":
                     download_layer_blob(auth, image_ref, layer["digest"], layer["size"])
@@ -0,0 +1,278 @@
+"""
+Benchmark: HTTP/1.1 connection pools vs HTTP/2 multiplexing for concurrent peeks.
+
+Starts a local stand-in registry (hypercorn over TLS, HTTP/1.1 and
+HTTP/2 via ALPN) holding synthetic gzip layers, then peeks every layer
+concurrently, as a bulk peek of one image does, through:
+
+    requests-h1   RegistryAuth + peek_layer_streaming() on a thread pool
+    httpx-h1      AsyncRegistryAuth + peek_layer_streaming_async(), HTTP/1.1
+    httpx-h2      same, HTTP/2
+
+The stand-in adds a fixed delay to every new connection (standing in for
+TCP+TLS setup to a remote host) and to every request (round trip), and
+optionally redirects blob reads to a /cdn/ path like Docker Hub does.
+
+With --tar the layers are uncompressed tars of many small files (sizes
+spread over 0..--file-size), the case where the sync peek hops from
+header to header; compare the MB read per transport.
+
+Needs h2, hypercorn and openssl (for a throwaway certificate):
+    pip install 'httpx[http2]' hypercorn
+
+Usage (from the repository root):
+    python utils/bench_transport.py
+    python utils/bench_transport.py --layers 32 --handshake-ms 150 --rtt-ms 40 --redirect
+    python utils/bench_transport.py --tar --files 2000 --file-size 51200
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import io
+import logging
+import os
+import random
+import re
+import socket
+import ssl
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+
+from app.modules.auth import RegistryAuth, AsyncRegistryAuth, configure_pool, get_token_cache
+from app.modules.auth.async_auth import new_async_client
+from app.modules.auth.blob_locations import get_blob_locations
+from app.modules.finders import async_peekers, peekers
+from app.modules.finders.blob_cache import configure_blob_cache
+
+
+# =============================================================================
+# Stand-in Registry
+# =============================================================================
+
+class StandInRegistry:
+    """ASGI app serving tokens and Range reads of in-memory blobs."""
+
+    def __init__(self, blobs: dict[str, bytes], handshake: float, rtt: float, redirect: bool):
+        self.blobs = blobs
+        self.handshake = handshake
+        self.rtt = rtt
+        self.redirect = redirect
+        self.reset()
+
+    def reset(self):
+        self.connections = set()
+        self.requests = 0
+        self.versions = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        self.requests += 1
+        self.versions.add(scope["http_version"])
+
+        # First request on a connection pays the setup cost
+        delay = self.rtt
+        if scope["client"] not in self.connections:
+            self.connections.add(scope["client"])
+            delay += self.handshake
+        await asyncio.sleep(delay)
+
+        path = scope["path"]
+        if path == "/token":
+            return await self._send(send, 200, b'{"token": "bench", "expires_in": 300}')
+
+        match = re.match(r"/(v2/.+/blobs|cdn)/(sha256:[0-9a-f]+)$", path)
+        if not match or match.group(2) not in self.blobs:
+            return await self._send(send, 404, b"")
+        if match.group(1) != "cdn" and self.redirect:
+            return await self._send(send, 307, b"", [(b"location", f"/cdn/{match.group(2)}".encode())])
+
+        blob = self.blobs[match.group(2)]
+        headers = dict(scope["headers"])
+        start, end = 0, len(blob) - 1
+        range_match = re.match(rb"bytes=(\d+)-(\d*)", headers.get(b"range", b""))
+        if range_match:
+            start = int(range_match.group(1))
+            if range_match.group(2):
+                end = min(int(range_match.group(2)), end)
+        if start > end:
+            return await self._send(send, 416, b"")
+        content_range = f"bytes {start}-{end}/{len(blob)}".encode()
+        await self._send(send, 206, blob[start:end + 1], [(b"content-range", content_range)])
+
+    @staticmethod
+    async def _send(send, status: int, body: bytes, headers: list = ()):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-length", str(len(body)).encode()), *headers],
+        })
+        # Stream the body in pieces so large reads interleave on a shared connection
+        for i in range(0, len(body), 65536):
+            await send({"type": "http.response.body", "body": body[i:i + 65536], "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def make_layer(files: int, file_size: int, rng: random.Random, uncompressed: bool = False) -> bytes:
+    """Build a gzipped tar of text-ish files, or a plain tar of files sized 0..file_size."""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for i in range(files):
+            size = rng.randint(0, file_size) if uncompressed else file_size
+            words = [f"{rng.getrandbits(32):08x}" for _ in range(size // 9 + 1)]
+            data = " ".join(words).encode()[:size]
+            info = tarfile.TarInfo(f"usr/share/bench/{i // 100}/file{i}.txt")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue() if uncompressed else gzip.compress(buf.getvalue())
+
+
+def make_certificate(directory: str) -> tuple[str, str]:
+    """Create a self-signed certificate for 127.0.0.1 with openssl."""
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-keyout", keyfile, "-out", certfile,
+            "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return certfile, keyfile
+
+
+def start_registry(app: StandInRegistry, certfile: str, keyfile: str) -> int:
+    """Serve app on a free local port from a background thread."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.certfile = certfile
+    config.keyfile = keyfile
+    config.alpn_protocols = ["h2", "http/1.1"]
+    config.accesslog = None
+    config.errorlog = None
+    config.h2_max_concurrent_streams = 256
+    # Peeks hang up mid-body once they have enough; that is expected here
+    logging.getLogger("asyncio").setLevel(logging.ERROR)
+
+    started = threading.Event()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.5, started.set)
+        await serve(app, config, shutdown_trigger=asyncio.Future)
+
+    threading.Thread(target=asyncio.run, args=(run(),), daemon=True).start()
+    started.wait()
+    return port
+
+
+# =============================================================================
+# Scenarios
+# =============================================================================
+
+def run_requests(digests: list[str], max_bytes: int, workers: int, media_type: str) -> list:
+    auth = RegistryAuth("library", "bench")
+
+    def peek(digest):
+        return peekers.peek_layer_streaming(
+            auth, "library/bench:latest", digest, max_bytes=max_bytes, media_type=media_type,
+        )
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(peek, digests))
+
+
+async def run_httpx(digests: list[str], max_bytes: int, http2: bool, ssl_context) -> list:
+    async with new_async_client(http2=http2, verify=ssl_context) as client:
+        auth = AsyncRegistryAuth("library", "bench", client=client)
+        return await asyncio.gather(*[
+            async_peekers.peek_layer_streaming_async(auth, "library/bench:latest", digest, max_bytes=max_bytes)
+            for digest in digests
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--layers", type=int, default=16, help="Layers peeked concurrently")
+    parser.add_argument("--files", type=int, default=1500, help="Files per layer")
+    parser.add_argument("--file-size", type=int, default=4096, help="Bytes per file")
+    parser.add_argument("--max-bytes", type=int, default=0, help="Peek budget per layer (0 = whole layer)")
+    parser.add_argument("--handshake-ms", type=float, default=100.0, help="Added delay per new connection")
+    parser.add_argument("--rtt-ms", type=float, default=30.0, help="Added delay per request")
+    parser.add_argument("--redirect", action="store_true", help="Redirect blob reads to /cdn/")
+    parser.add_argument("--rounds", type=int, default=3, help="Runs per transport (best is reported)")
+    parser.add_argument("--tar", action="store_true", help="Uncompressed layers of files sized 0..--file-size")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    blobs = {}
+    for _ in range(args.layers):
+        blob = make_layer(args.files, args.file_size, rng, uncompressed=args.tar)
+        blobs["sha256:" + hashlib.sha256(blob).hexdigest()] = blob
+    digests = list(blobs)
+    media_type = "application/vnd.oci.image.layer.v1.tar" if args.tar else ""
+    print(f"[*] {len(digests)} layers, {sum(map(len, blobs.values())) / 1e6:.1f} MB "
+          f"{'uncompressed' if args.tar else 'compressed'}")
+
+    app = StandInRegistry(blobs, args.handshake_ms / 1000, args.rtt_ms / 1000, args.redirect)
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile, keyfile = make_certificate(tmp)
+        port = start_registry(app, certfile, keyfile)
+
+        # Point the client stack at the stand-in (requests honors REQUESTS_CA_BUNDLE)
+        base = f"https://127.0.0.1:{port}"
+        registry_base_url = lambda user, repo, registry=None: f"{base}/v2/{user}/{repo}"
+        peekers.registry_base_url = async_peekers.registry_base_url = registry_base_url
+        RegistryAuth.AUTH_URL = AsyncRegistryAuth.AUTH_URL = f"{base}/token"
+        os.environ["REQUESTS_CA_BUNDLE"] = certfile
+        ssl_context = ssl.create_default_context(cafile=certfile)
+        configure_blob_cache(max_bytes=0)
+
+        scenarios = {
+            "requests-h1": lambda: run_requests(digests, args.max_bytes, args.layers, media_type),
+            "httpx-h1": lambda: asyncio.run(run_httpx(digests, args.max_bytes, False, ssl_context)),
+            "httpx-h2": lambda: asyncio.run(run_httpx(digests, args.max_bytes, True, ssl_context)),
+        }
+
+        print(f"{'transport':<12} {'best s':>8} {'conns':>6} {'requests':>9} {'MB read':>8} {'entries':>8}  protocol")
+        for name, run in scenarios.items():
+            best = None
+            for _ in range(args.rounds):
+                # Every round starts cold: new connections, token and redirects
+                get_token_cache().clear()
+                get_blob_locations().clear()
+                configure_pool()
+                app.reset()
+                started = time.perf_counter()
+                results = run()
+                elapsed = time.perf_counter() - started
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, len(app.connections), app.requests, sorted(app.versions))
+                errors = [r.error for r in results if r.error]
+                if errors:
+                    print(f"[!] {name}: {errors[0]}")
+            entries = sum(r.entries_found for r in results)
+            read = sum(r.bytes_downloaded for r in results) / 1e6
+            print(f"{name:<12} {best[0]:>8.3f} {best[1]:>6} {best[2]:>9} {read:>8.1f} {entries:>8}  {','.join(best[3])}")
+
+
+if __name__ == "__main__":
+    main()